@@ -0,0 +1,154 @@
+import re
+import threading
+from config import BASE_URL
+
+# === CONFIG ===
+INDEX_URL = f"{BASE_URL}/user-finance-account/index"
+DEPOSIT_CAPTION = "Deposit Account"
+# Index table columns by header text, so a reordered table still reads
+# right. Balance and Available Funds are optional.
+COLUMNS = {
+    "branch": ("branch",),
+    "owner": ("owner", "owners"),
+    "caption": ("caption",),
+    "balance": ("balance",),
+    "available": ("available funds", "available"),
+}
+REQUIRED_COLUMNS = ("branch", "owner", "caption")
+
+# One round trip per index page: the header texts, every row id with its
+# cell texts, plus the pagination "next" link if there is one.
+ROWS_JS = """
+var header = [], rows = [];
+document.querySelectorAll('table.table thead th').forEach(function (th) { header.push(th.innerText.trim()); });
+document.querySelectorAll('table.table tbody tr').forEach(function (tr) {
+    var cells = [];
+    tr.querySelectorAll('td').forEach(function (td) { cells.push(td.innerText.trim()); });
+    rows.push([tr.id || '', cells]);
+});
+var next = document.querySelector('.pagination li.next:not(.disabled) a, a[rel=next]');
+return {header: header, rows: rows, next: next ? next.href : null};
+"""
+
+
+def fetch_rows_selenium(driver, url):
+    driver.get(url)
+    result = driver.execute_script(ROWS_JS)
+    return result["rows"], result["next"], result["header"]
+
+
+def index_columns(header):
+    # {field: cell position} from the index's <th> texts
+    positions = {" ".join(text.lower().split()): i for i, text in enumerate(header)}
+    columns = {}
+    for field, names in COLUMNS.items():
+        found = [positions[name] for name in names if name in positions]
+        if found:
+            columns[field] = found[0]
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        raise ValueError(f"Finance-account index has no {', '.join(missing)} column (header: {header})")
+    return columns
+
+
+def owner_key(name):
+    return " ".join(name.lower().split())
+
+
+def owner_names(cell):
+    # Joint accounts list their owners comma- or line-separated in one cell
+    return [name for name in re.split(r"[,;\n]", cell) if name.strip()]
+
+
+class AccountIndex:
+    """Finance accounts of the logged-in user, scraped once and kept current.
+
+    Maps (branch, owner, caption) to account id along with the Balance and
+    Available Funds columns. Owners are compared as whole normalized names:
+    the full owner cell first, then each name of a joint account. The index
+    table shows branch names, so branches ({branch value: name}) translates
+    the values the scripts pass around. fetch(url) -> (rows, next_url,
+    header) comes from the transport, so the same index works over Selenium
+    or plain HTTP.
+    """
+
+    def __init__(self, url=INDEX_URL, branches=None):
+        self.url = url
+        self.branches = {str(value): name for value, name in (branches or {}).items()}
+        self.by_id = {}
+        self.by_key = {}
+        self.by_owner = {}
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def add_rows(self, rows, header):
+        columns = index_columns(header)
+        needed = max(columns[field] for field in REQUIRED_COLUMNS)
+        added = []
+        for row_id, cells in rows:
+            account_id = row_id.replace("ufa_", "")
+            if not account_id or account_id in self.by_id or len(cells) <= needed:
+                continue
+            account = {field: cells[i] if i < len(cells) else "" for field, i in columns.items()}
+            account.setdefault("balance", "")
+            account.setdefault("available", "")
+            account["id"] = account_id
+            self.by_id[account_id] = account
+            branch = owner_key(account["branch"])
+            self.by_key.setdefault((branch, owner_key(account["owner"]), account["caption"]), account)
+            for name in owner_names(account["owner"]):
+                self.by_owner.setdefault((branch, owner_key(name), account["caption"]), account)
+            added.append(account)
+        return added
+
+    def load(self, fetch):
+        url = self.url
+        with self.lock:
+            while url:
+                rows, url, header = fetch(url)
+                self.add_rows(rows, header)
+        return self
+
+    def refresh(self, fetch):
+        # The newest accounts are listed first, so read pages only until a
+        # page holds nothing we have not seen.
+        url = self.url
+        added = []
+        with self.lock:
+            while url:
+                rows, url, header = fetch(url)
+                new = self.add_rows(rows, header)
+                added.extend(new)
+                if len(new) < len(rows):
+                    break
+        return added
+
+    def branch_key(self, branch_value):
+        name = self.branches.get(str(branch_value))
+        return owner_key(name) if name else None
+
+    def find(self, owner, branch_value, caption=DEPOSIT_CAPTION):
+        # Without the branch's name no account can be told apart from a
+        # namesake's in another branch, so nothing is reused
+        branch = self.branch_key(branch_value)
+        if branch is None:
+            return None
+        key = (branch, owner_key(owner), caption)
+        with self.lock:
+            account = self.by_key.get(key) or self.by_owner.get(key)
+        return account["id"] if account else None
+
+    def get(self, account_id):
+        return self.by_id.get(str(account_id))
+
+    def account_id_after_create(self, fetch, owner, branch_value, caption=DEPOSIT_CAPTION):
+        added = self.refresh(fetch)
+        account_id = self.find(owner, branch_value, caption)
+        if account_id is None and len(added) == 1 and caption in added[0]["caption"] \
+                and owner_key(added[0]["branch"]) == self.branch_key(branch_value):
+            # Owner column did not match the select2 text; the single new
+            # row can only be the account we just created.
+            account_id = added[0]["id"]
+        return account_id
@@ -0,0 +1,141 @@
+import argparse
+import csv
+import json
+import os
+import threading
+from datetime import datetime
+from accounts import owner_key
+
+# === CONFIG ===
+ALIAS_FILE = os.path.join("data", "aliases.json")
+EXPORT_HEADER = ["Branch", "CSV Name", "Billpayer", "Billpayer ID", "Decision", "Decided At"]
+CONFIRMED = "confirmed"
+SKIPPED = "skipped"
+
+
+def billpayer_id(element_id):
+    # select2 option ids carry a per-page token; the billpayer id is the tail
+    return str(element_id).split('-')[-1]
+
+
+class AliasStore:
+    """Operator match decisions kept across runs, per branch and CSV name.
+
+    A confirmed entry maps a CSV spelling to a billpayer and its id; a
+    skipped entry remembers that the name is not a billpayer. Lookups are
+    one dict access on (branch, normalized name), so known names never
+    reach the fuzzy matcher. prune() drops confirmed entries whose billpayer
+    is gone from the branch and follows renames by id. Every change is
+    written through, so a decision survives a crash mid-run.
+    """
+
+    def __init__(self, path=ALIAS_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        try:
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.entries = {}
+
+    def __len__(self):
+        return sum(len(names) for names in self.entries.values())
+
+    def lookup(self, branch, name):
+        # -> entry dict or None
+        return self.entries.get(str(branch), {}).get(owner_key(name))
+
+    def _put(self, branch, name, billpayer, bp_id, decided_at=None):
+        self.entries.setdefault(str(branch), {})[owner_key(name)] = {
+            "name": name,
+            "billpayer": billpayer,
+            "id": billpayer_id(bp_id) if bp_id is not None else None,
+            "decision": CONFIRMED if billpayer else SKIPPED,
+            "at": decided_at or datetime.now().isoformat(timespec="seconds"),
+        }
+
+    def record(self, branch, name, billpayer=None, bp_id=None):
+        # billpayer=None records an explicit skip
+        with self.lock:
+            self._put(branch, name, billpayer, bp_id)
+            self._save()
+
+    def prune(self, branch, billpayers):
+        # billpayers: the branch's current (name, select2 option id) list.
+        # -> number of entries dropped
+        current = {billpayer_id(element_id): name for name, element_id in billpayers}
+        dropped = changed = 0
+        with self.lock:
+            names = self.entries.get(str(branch), {})
+            for key, entry in list(names.items()):
+                if entry["decision"] != CONFIRMED:
+                    continue
+                if entry["id"] not in current:
+                    del names[key]
+                    dropped += 1
+                elif entry["billpayer"] != current[entry["id"]]:
+                    entry["billpayer"] = current[entry["id"]]
+                    changed += 1
+            if dropped or changed:
+                self._save()
+        return dropped
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+    def export_csv(self, path):
+        with self.lock:
+            rows = [[branch, e["name"], e["billpayer"] or "", e["id"] or "", e["decision"], e["at"]]
+                    for branch, names in sorted(self.entries.items()) for e in names.values()]
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_HEADER)
+            writer.writerows(rows)
+        return len(rows)
+
+    def import_csv(self, path):
+        # Rows from export_csv (or written by hand) replace entries for the
+        # same branch and name. A blank Billpayer is a skip; a confirmed row
+        # needs its Billpayer ID, or prune() could not check it.
+        count = 0
+        with open(path, newline="", encoding="utf-8-sig") as f, self.lock:
+            for row in csv.DictReader(f):
+                row = {k: (v or "").strip() for k, v in row.items() if k}
+                if not row.get("Branch") or not row.get("CSV Name"):
+                    continue
+                if row.get("Billpayer") and not row.get("Billpayer ID"):
+                    continue
+                self._put(row["Branch"], row["CSV Name"], row.get("Billpayer") or None,
+                          row.get("Billpayer ID") or None, row.get("Decided At") or None)
+                count += 1
+            self._save()
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import remembered billpayer match decisions.")
+    parser.add_argument("action", choices=["export", "import", "show"])
+    parser.add_argument("csv", nargs="?", help="file to export to or import from")
+    parser.add_argument("--aliases", default=ALIAS_FILE, help=f"alias store (default: {ALIAS_FILE})")
+    args = parser.parse_args()
+    store = AliasStore(args.aliases)
+    if args.action == "show":
+        for branch, names in sorted(store.entries.items()):
+            for entry in names.values():
+                target = f"{entry['billpayer']} [ID: {entry['id']}]" if entry["billpayer"] else "(skip)"
+                print(f"{branch}: {entry['name']} → {target}")
+        print(f"🔖 {len(store)} decisions in {args.aliases}")
+    elif not args.csv:
+        parser.error(f"{args.action} needs a CSV path")
+    elif args.action == "export":
+        print(f"✅ Exported {store.export_csv(args.csv)} decisions to {args.csv}")
+    else:
+        print(f"✅ Imported {store.import_csv(args.csv)} decisions into {args.aliases}")
+
+
+if __name__ == "__main__":
+    main()
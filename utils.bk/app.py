@@ -1,179 +1,297 @@
 import csv
-import time
-from datetime import datetime
-from difflib import SequenceMatcher
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
+import io
+import os
+import threading
+from functools import partial
 import streamlit as st
+from matcher import BillpayerMatcher
+from aliases import AliasStore, billpayer_id
+from executor import group_by_billpayer, run_sharded
+from accounts import AccountIndex
+from journal import Journal
+from pipeline import REPORT_HEADER
+from posting import RowPoster
+from retries import DEAD_LETTER_FILE, DeadLetter, RetryPolicy
+from transport import HttpTransport, SeleniumTransport, ThrottledTransport
+from throttle import controller
+from waits import wait_report
+from cache import get_billpayers
+from logger import RunLogger
+from drivers import POOL_SIZE, DriverPool, driver_rss_mb
+from branches import list_branches
+from forms import create_account, make_transaction
+from jobs import JobRunner
+from login import signed_in
 
 # === CONFIG ===
-CSV_FILE = "transactions.csv"
 REPORT_FILE = "transaction_report.csv"
 LOG_FILE = "transaction_debug.log"
+STATS_FILE = "scheduler_stats.json"
+# Browsers the host can afford across every user's jobs together
+MAX_BROWSERS = int(os.getenv("CHILDPATHS_MAX_BROWSERS", "4"))
+LEASE_TIMEOUT = 120  # seconds the page waits for a browser to list branches
+POLL_INTERVAL = 1.0  # seconds between job panel refreshes
+_local = threading.local()
 
 # === UTILS ===
-def fuzzy_match(name, options):
-    scores = [(SequenceMatcher(None, name.lower(), o[0].lower()).ratio(), *o) for o in options]
-    scores.sort(reverse=True, key=lambda x: x[0])
-    return scores[0] if scores else (0, None, None)
-
-def log_debug(msg):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {msg}\n")
-    st.text(msg)
-
-def load_driver():
-    options = Options()
-    options.add_argument("--window-size=1920,1080")
-    return webdriver.Chrome(options=options)
-
-def login(driver, wait, email, password):
-    driver.get("https://app.childpaths.ie/auth/login")
-    wait.until(EC.presence_of_element_located((By.ID, "email"))).send_keys(email)
-    driver.find_element(By.ID, "password").send_keys(password)
-    driver.find_element(By.CSS_SELECTOR, "#signin-form button").click()
-    wait.until(EC.url_contains("/dashboard"))
-    log_debug("✅ Logged in")
-
-def select_branch(driver, wait):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    wait.until(EC.presence_of_element_located((By.NAME, "branch")))
-    branches = driver.find_elements(By.CSS_SELECTOR, "select[name='branch'] option")
-    branch_map = {b.text.strip(): b.get_attribute("value") for b in branches if b.get_attribute("value")}
-    selected_branch = st.selectbox("Select Branch:", list(branch_map.keys()))
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(branch_map[selected_branch])
-    log_debug(f"✅ Branch selected: {selected_branch}")
-    return branch_map[selected_branch]
-
-def extract_billpayers(driver):
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    WebDriverWait(driver, 5).until(EC.presence_of_all_elements_located((By.CSS_SELECTOR, ".select2-results__option")))
-    options = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
-    return [(option.text.strip(), option.get_attribute("id")) for option in options if option.text.strip()]
-
-def create_account(driver, wait, owner_name, branch_value):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(branch_value)
-    driver.find_element(By.ID, "display_name").send_keys("Deposit Account")
-    Select(driver.find_element(By.NAME, "currency")).select_by_value("EUR")
-    try:
-        switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
-        if "bootstrap-switch-on" in switch_wrapper.get_attribute("class"):
-            switch_wrapper.click()
-    except: pass
-
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(0.5)
-    driver.switch_to.active_element.send_keys(owner_name)
-    time.sleep(1)
-    driver.switch_to.active_element.send_keys(Keys.ENTER)
-    driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Create"]').click()
-    WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-
-    errors = driver.find_elements(By.CSS_SELECTOR, ".alert-danger li, .alert-warning li")
-    if errors:
-        for e in errors:
-            log_debug("❌ Form error: " + e.text)
-        return False
-    log_debug(f"✅ Account created for {owner_name}")
-    return True
-
-def get_account_id(driver):
-    driver.get("https://app.childpaths.ie/user-finance-account/index")
-    WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.table tbody tr")))
-    rows = driver.find_elements(By.CSS_SELECTOR, "table.table tbody tr")
-    for row in rows:
-        caption = row.find_elements(By.TAG_NAME, "td")[3].text
-        if "Deposit Account" in caption:
-            return row.get_attribute("id").replace("ufa_", "")
-    return None
-
-def make_transaction(driver, wait, account_id, tx_type, amount, note, date):
+def bind(job, logger=None):
+    # Log lines from this thread go to job; sharded workers bind too
+    _local.job, _local.logger = job, logger
+
+def log_debug(msg, **fields):
+    job = getattr(_local, "job", None)
+    logger = getattr(_local, "logger", None)
+    if logger:
+        logger.log(msg, job=job.id if job else None, **fields)
+    if job:
+        job.log(msg)
+
+@st.cache_resource
+def run_logger():
+    return RunLogger(LOG_FILE)
+
+@st.cache_resource
+def driver_pool():
+    # Shared by every user: at most MAX_BROWSERS live at once, reused between jobs
+    return DriverPool(POOL_SIZE, limit=MAX_BROWSERS)
+
+def job_memory(job):
+    return sum(driver_rss_mb(driver) or 0.0 for driver in list(job.drivers))
+
+@st.cache_resource
+def job_runner():
+    # Every job's sessions share one throttle, allowed as far as the browsers go
+    controller.configure(maximum=MAX_BROWSERS)
+    return JobRunner(MAX_BROWSERS, measure=job_memory, stats_file=STATS_FILE)
+
+class BrowserSession:
+    """One user's credentials, branches and billpayers, kept across reruns.
+
+    Browsers are leased from the shared pool per job and handed back with
+    their cookies cleared, so the next user's job can reuse them.
+    """
+
+    def __init__(self, email, password):
+        self.email = email
+        self.password = password
+        self.pool = driver_pool()
+        self.lock = threading.Lock()
+        self.billpayers = {}
+        driver, _ = self.lease(timeout=LEASE_TIMEOUT)
+        try:
+            self.branches = list_branches(driver)
+        finally:
+            self.release(driver)
+
+    def lease(self, job=None, timeout=None):
+        driver = self.pool.get(timeout)
+        try:
+            wait = signed_in(driver, self.email, self.password, log=log_debug)
+        except Exception:
+            self.release(driver)
+            raise
+        if job:
+            job.track(driver)
+        return driver, wait
+
+    def release(self, driver):
+        try:
+            driver.delete_all_cookies()
+        except Exception:
+            pass
+        self.pool.release(driver)
+
+    def get_billpayers(self, driver, branch_value, refresh=False):
+        with self.lock:
+            cached = None if refresh else self.billpayers.get(branch_value)
+        if cached is None:
+            cached = get_billpayers(driver, branch_value, refresh=refresh, log=log_debug)
+            with self.lock:
+                self.billpayers[branch_value] = cached
+        return cached
+
+@st.cache_resource
+def browser_session(email, password):
+    return BrowserSession(email, password)
+
+def make_transport(driver, wait, kind, release=None):
+    selenium = SeleniumTransport(driver, wait, partial(create_account, log=log_debug),
+                                 partial(make_transaction, log=log_debug), release)
+    if kind == "http":
+        return ThrottledTransport(HttpTransport.from_transport(selenium, log=log_debug))
+    return ThrottledTransport(selenium)
+
+def read_csv(text):
+    reader = csv.DictReader(io.StringIO(text))
+    reader.fieldnames = [h.strip() for h in reader.fieldnames]
+    # Short rows leave trailing columns as None, extra cells sit under a None key
+    return [{k.strip(): (v or "").strip() for k, v in row.items() if k is not None} for row in reader]
+
+def job_cost(workers):
+    # The job's own browser plus one per shard when it shards
+    return 1 if workers == 1 else workers + 1
+
+def job_file(path, job_id):
+    stem, ext = os.path.splitext(path)
+    return f"{stem}_{job_id}{ext}"
+
+def report_file(job_id):
+    return job_file(REPORT_FILE, job_id)
+
+def run_job(current, session, logger, data, branch_value, workers, transport_kind, refresh):
+    # Runs on a job runner thread: no st.* calls from here on
+    bind(current, logger)
+    report = []
+    transport = None
+    dead_letter = DeadLetter(job_file(DEAD_LETTER_FILE, current.id))
     try:
-        url = f"https://app.childpaths.ie/user-finance-account/{account_id}/transaction/{tx_type}"
-        driver.get(url)
-        wait.until(EC.presence_of_element_located((By.NAME, "value")))
-        driver.find_element(By.NAME, "value").send_keys(str(amount))
-        if note:
-            driver.find_element(By.NAME, "description").send_keys(note)
-        if date:
-            driver.find_element(By.NAME, "received_at").send_keys(date)
-        driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Add"]').click()
-        WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-        log_debug(f"✅ {tx_type.capitalize()} successful for €{amount}")
-        return True
-    except Exception as e:
-        log_debug(f"❌ {tx_type.capitalize()} failed for €{amount}: {str(e)}")
-        return False
+        driver, wait = session.lease(current)
+        transport = make_transport(driver, wait, transport_kind, session.release)
+        log_debug("--- TRANSACTION RUN ---", workers=workers, transport=transport_kind, branch=branch_value)
+        billpayers = session.get_billpayers(driver, branch_value, refresh)
+        matcher = BillpayerMatcher(billpayers)
+        owner_ids = {name: billpayer_id(element_id) for name, element_id in billpayers}
+        # Decisions made at the depositCSV prompt apply here too
+        aliases = AliasStore()
+        aliases.prune(branch_value, billpayers)
+
+        jobs = []
+        for seq, row in enumerate(data):
+            name = row.get('Bill Payer', '')
+            entry = aliases.lookup(branch_value, name)
+            if entry:
+                matched_name = entry["billpayer"]
+                if not matched_name:
+                    log_debug(f"❌ Skipped: {name} (skipped in an earlier run)")
+                jobs.append((seq, matched_name, row))
+                continue
+            score, matched_name, _ = matcher.best(name)
+            if score < 0.6:
+                log_debug(f"❌ Skipped: {name} (no good match)")
+                matched_name = None
+            jobs.append((seq, matched_name, row))
+        resolved = [j for j in jobs if j[1]]
+        current.skip(len(jobs) - len(resolved))
+        current.start(len(resolved))
+
+        def run_group(t, a, group):
+            results = poster.process_rows(t, a, group, owner_ids.get(group[0][1]))
+            for rows in results.values():
+                current.advance("FAILED" if any(row[3] == "FAILED" for row in rows) else "OK")
+            return results
+
+        def start_session():
+            session_driver, session_wait = session.lease(current)
+            return make_transport(session_driver, session_wait, transport_kind, session.release)
+
+        index = AccountIndex(branches=session.branches).load(transport.fetch_index)
+        # Same posting path as depositCSV: retries, dead letters and the
+        # deposit-before-withdrawal rule, with a journal kept in memory
+        poster = RowPoster(index, Journal(None), branch_value, RetryPolicy(log=log_debug), dead_letter,
+                           log=log_debug, logger=logger)
+        if workers > 1:
+            results = run_sharded(resolved, workers, start_session, run_group,
+                                  initializer=lambda: bind(current, logger), grouped=True)
+        else:
+            accounts = {}
+            results = {}
+            for group in group_by_billpayer(resolved):
+                results.update(run_group(transport, accounts, group))
+
+        for seq, matched_name, row in jobs:
+            if not matched_name:
+                amount_str = row.get('Amount', '0')
+                amount = float(amount_str) if amount_str else 0.0
+                report.append([row.get('Bill Payer', ''), "N/A", amount, "FAILED", "Billpayer not matched"])
+                continue
+            report.extend(results.get(seq, []))
+
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(REPORT_HEADER)
+        writer.writerows(report)
+        with open(report_file(current.id), 'w', newline='', encoding='utf-8') as f:
+            f.write(out.getvalue())
+        log_debug(f"✅ Report saved to {report_file(current.id)}")
+        if dead_letter.count:
+            log_debug(f"☠️ {dead_letter.count} rows still failing saved to {dead_letter.path}")
+        log_debug(wait_report())
+        return out.getvalue()
+    finally:
+        dead_letter.close()
+        if transport:
+            transport.quit()
+        bind(None)
+
+@st.fragment(run_every=POLL_INTERVAL)
+def scheduler_panel():
+    stats = job_runner().stats()
+    st.sidebar.subheader("Scheduler")
+    st.sidebar.metric("Browsers in use", f"{stats['in_use']}/{stats['slots']}")
+    st.sidebar.metric("Jobs queued", stats["queued"])
+    st.sidebar.metric("Jobs running", stats["running"])
+    st.sidebar.metric("Mean wait", f"{stats['mean_wait']:.0f}s")
+    st.sidebar.metric("Max wait", f"{stats['max_wait']:.0f}s")
+    st.sidebar.metric("Oldest queued", f"{stats['oldest_wait']:.0f}s")
+    st.sidebar.metric("Steps in flight", f"{controller.in_flight}/{controller.limit:.0f}")
+
+@st.fragment(run_every=POLL_INTERVAL)
+def job_panel():
+    runner = job_runner()
+    ids = st.session_state.get("jobs", [])
+    if not ids:
+        return
+    st.caption(f"{runner.pending()} job(s) waiting")
+    for job_id in reversed(ids):
+        current = runner.get(job_id)
+        if current is None:
+            continue
+        with st.container(border=True):
+            memory = f" · peak {current.peak_rss_mb:.0f} MB" if current.peak_rss_mb else ""
+            st.markdown(f"**#{current.id} {current.name}** · {current.status} · waited {current.waited:.0f}s"
+                        f" · ran {current.elapsed:.0f}s{memory}")
+            st.progress(current.fraction, text=f"{current.done}/{current.total} rows")
+            ok, failed, skipped = st.columns(3)
+            ok.metric("OK", current.counts["OK"])
+            failed.metric("Failed", current.counts["FAILED"])
+            skipped.metric("Skipped", current.counts["SKIPPED"])
+            with st.expander("Log", expanded=current.status == "running"):
+                st.code("\n".join(current.lines))
+            if current.status == "done":
+                st.success(f"✅ Done. Report saved to {report_file(current.id)}")
+                st.download_button("Download report", current.result, file_name=f"transaction_report_{current.id}.csv",
+                                   mime="text/csv", key=f"download-{current.id}")
+            elif current.status == "failed":
+                st.error(f"❌ {current.error}")
 
 def run_batch():
     email = st.text_input("Email")
     password = st.text_input("Password", type="password")
-    if st.button("Run Batch") and email and password:
-        driver = load_driver()
-        wait = WebDriverWait(driver, 10)
-        report = []
-        with open(LOG_FILE, "w", encoding="utf-8") as f:
-            f.write("--- TRANSACTION DEBUG LOG ---\n")
+    if email and password:
         try:
-            login(driver, wait, email, password)
-            branch_value = select_branch(driver, wait)
-            billpayers = extract_billpayers(driver)
-            accounts = {}
-
-            with open(CSV_FILE, newline='', encoding='utf-8-sig') as f:
-                reader = csv.DictReader(f)
-                reader.fieldnames = [h.strip() for h in reader.fieldnames]
-                for row in reader:
-                    row = {k.strip(): v.strip() for k, v in row.items()}
-                    name = row.get('Bill Payer', '')
-                    date = row.get('Date', '')
-                    note = row.get('Note', '')
-                    returned = row.get('Is Returned', '').lower() == 'yes'
-                    amount_str = row.get('Amount', '0')
-                    amount = float(amount_str) if amount_str else 0.0
-                    tx_amount = 0.01 if amount == 0 else amount
-
-                    score, matched_name, _ = fuzzy_match(name, billpayers)
-                    if score < 0.6:
-                        log_debug(f"❌ Skipped: {name} (no good match)")
-                        report.append([name, "N/A", amount, "FAILED", "Billpayer not matched"])
-                        continue
-
-                    if matched_name not in accounts:
-                        if not create_account(driver, wait, matched_name, branch_value):
-                            report.append([matched_name, "Account", amount, "FAILED", "Account creation failed"])
-                            continue
-                        account_id = get_account_id(driver)
-                        accounts[matched_name] = account_id
-                    else:
-                        account_id = accounts[matched_name]
-
-                    if not make_transaction(driver, wait, account_id, "deposit", tx_amount, note, date):
-                        report.append([matched_name, "Deposit", tx_amount, "FAILED", "Error during deposit"])
-                        continue
-                    report.append([matched_name, "Deposit", tx_amount, "OK", ""])
-
-                    if returned or amount == 0:
-                        if not make_transaction(driver, wait, account_id, "withdrawal", tx_amount, note, date):
-                            report.append([matched_name, "Withdrawal", tx_amount, "FAILED", "Error during withdrawal"])
-                        else:
-                            report.append([matched_name, "Withdrawal", tx_amount, "OK", ""])
-
-            with open(REPORT_FILE, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.writer(f)
-                writer.writerow(["Bill Payer", "Type", "Amount", "Status", "Notes"])
-                writer.writerows(report)
-            st.success(f"✅ Done. Report saved to {REPORT_FILE}")
-        finally:
-            driver.quit()
+            session = browser_session(email, password)
+        except Exception as e:
+            st.error(f"❌ Login failed: {e}")
+            session = None
+        if session:
+            branch_names = {name: value for value, name in session.branches.items()}
+            selected_branch = st.selectbox("Select Branch:", list(branch_names))
+            upload = st.file_uploader("Transactions CSV", type="csv")
+            workers = st.number_input("Parallel sessions", min_value=1, max_value=max(1, MAX_BROWSERS - 1), value=1)
+            transport_kind = st.radio("Transport", ["selenium", "http"], horizontal=True)
+            refresh = st.checkbox("Refresh billpayer list")
+            if st.button("Queue Batch", disabled=upload is None):
+                queued = job_runner().submit(
+                    f"{upload.name} → {selected_branch} ({transport_kind}, {workers} session(s))", run_job,
+                    user=email, cost=job_cost(int(workers)),
+                    session=session, logger=run_logger(), data=read_csv(upload.getvalue().decode("utf-8-sig")),
+                    branch_value=branch_names[selected_branch], workers=int(workers),
+                    transport_kind=transport_kind, refresh=refresh)
+                st.session_state.setdefault("jobs", []).append(queued.id)
+    scheduler_panel()
+    job_panel()
 
 if __name__ == "__main__":
     st.title("💳 ChildPaths Deposit Dashboard")
-    st.markdown("Upload your CSV as 'transactions.csv' and run batch transactions.")
+    st.markdown("Upload a transactions CSV and queue it; jobs from everyone share one pool of browsers.")
     run_batch()
@@ -0,0 +1,258 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from drivers import tree_rss_bytes
+from matcher import BillpayerMatcher
+from standin import EMAIL, PASSWORD, build_state, start_server, synthetic_billpayers, write_synthetic_csv
+
+# === CONFIG ===
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_FILE = "bench_results.json"
+ROW_SIZES = [100, 1000, 10000, 50000]
+BILLPAYER_SIZES = [10, 100, 1000, 5000]
+REGRESSION = 0.10  # flag throughput drops beyond 10%
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    values = sorted(values)
+    k = (len(values) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+    return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+
+def summarize(durations):
+    return {
+        "count": len(durations),
+        "p50": percentile(durations, 50),
+        "p95": percentile(durations, 95),
+        "mean": statistics.fmean(durations) if durations else None,
+    }
+
+
+def self_peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class RssSampler(threading.Thread):
+    def __init__(self, pid, interval=0.2):
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.peak = 0
+        self.stopped = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self.stopped.is_set():
+            self.peak = max(self.peak, tree_rss_bytes(self.pid))
+            self.stopped.wait(self.interval)
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        return self.peak / (1024 * 1024)
+
+
+def run_script(script, args, stdin_text, env, cwd):
+    started = time.monotonic()
+    proc = subprocess.Popen([sys.executable, os.path.join(HERE, script), *args], cwd=cwd, env=env,
+                            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    sampler = RssSampler(proc.pid)
+    sampler.start()
+    output, _ = proc.communicate(stdin_text)
+    seconds = time.monotonic() - started
+    peak = sampler.stop()
+    if not peak:
+        peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+    return proc.returncode, seconds, peak, output
+
+
+def step_latencies(log_path):
+    steps = {}
+    try:
+        with open(log_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "step" in entry and "duration" in entry:
+                    steps.setdefault(entry["step"], []).append(entry["duration"])
+    except FileNotFoundError:
+        pass
+    return {step: summarize(durations) for step, durations in steps.items()}
+
+
+# === TARGETS ===
+def bench_matcher(rows, billpayers, seed=0, **_):
+    synthetic = synthetic_billpayers(billpayers, seed)
+    pool = [(name, f"select2--result-bench-{bp_id}") for bp_id, name in synthetic]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "transactions.csv")
+        write_synthetic_csv(path, rows, synthetic, seed)
+        with open(path, newline="", encoding="utf-8") as f:
+            names = [row["Bill Payer"] for row in csv.DictReader(f)]
+    started = time.monotonic()
+    matcher = BillpayerMatcher(pool)
+    build = time.monotonic() - started
+    latencies = []
+    for name in dict.fromkeys(names):
+        t = time.monotonic()
+        matcher.match(name)
+        latencies.append(time.monotonic() - t)
+    seconds = time.monotonic() - started
+    return {
+        "seconds": seconds,
+        "rows_per_s": rows / seconds if seconds else None,
+        "build_seconds": build,
+        "unique_names": len(latencies),
+        "steps": {"match": summarize(latencies)},
+        "peak_rss_mb": self_peak_rss_mb(),
+    }
+
+
+def bench_deposit(rows, billpayers, seed=0, latency=0.0, failure_rate=0.0, transport="selenium", workers=1, **_):
+    state = build_state(1, billpayers, latency, failure_rate, seed)
+    server = start_server(state)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "transactions.csv")
+            write_synthetic_csv(path, rows, state.billpayers["1"], seed)
+            env = {**os.environ, "EMAIL": EMAIL, "PASSWORD": PASSWORD,
+                   "CHILDPATHS_URL": f"http://127.0.0.1:{server.server_port}"}
+            code, seconds, peak, output = run_script(
+                "depositCSV.py", ["--input", path, "--transport", transport, "--workers", str(workers)],
+                "0\n", env, tmp)
+            result = {
+                "seconds": seconds,
+                "rows_per_s": rows / seconds if seconds else None,
+                "steps": step_latencies(os.path.join(tmp, "transaction_debug.log")),
+                "peak_rss_mb": peak,
+                "server_requests": state.requests,
+            }
+            if code:
+                result["rows_per_s"] = None
+                result["error"] = f"exit code {code}: {output.strip().splitlines()[-1] if output.strip() else ''}"
+            return result
+    finally:
+        server.shutdown()
+
+
+def bench_toggle(rows, billpayers, seed=0, latency=0.0, failure_rate=0.0, **_):
+    # rows is unused: the branch toggle visits every billpayer once
+    state = build_state(1, billpayers, latency, failure_rate, seed)
+    server = start_server(state)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {**os.environ, "CHILDPATHS_URL": f"http://127.0.0.1:{server.server_port}"}
+            code, seconds, peak, output = run_script(
+                "toggleAllBillpayersByBranch.py", [], f"{EMAIL}\n{PASSWORD}\n0\n", env, tmp)
+            disabled = sum(1 for enabled in state.guardians.values() if not enabled)
+            result = {
+                "seconds": seconds,
+                "rows_per_s": billpayers / seconds if seconds else None,
+                "disabled": disabled,
+                "peak_rss_mb": peak,
+                "server_requests": state.requests,
+            }
+            if code:
+                result["rows_per_s"] = None
+                result["error"] = f"exit code {code}: {output.strip().splitlines()[-1] if output.strip() else ''}"
+            return result
+    finally:
+        server.shutdown()
+
+
+TARGETS = {"matcher": bench_matcher, "deposit": bench_deposit, "toggle": bench_toggle}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, previous_path):
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)
+    baseline = {(r["target"], r["rows"], r["billpayers"]): r for r in previous["results"]}
+    print(f"\n📊 Compared with {previous_path} ({previous.get('commit')}):")
+    regressions = 0
+    for r in results:
+        old = baseline.get((r["target"], r["rows"], r["billpayers"]))
+        if not old or not old.get("rows_per_s") or not r.get("rows_per_s"):
+            continue
+        change = r["rows_per_s"] / old["rows_per_s"] - 1
+        flag = "🔻" if change < -REGRESSION else "  "
+        regressions += change < -REGRESSION
+        print(f"{flag} {r['target']:8} rows={r['rows']:<6} billpayers={r['billpayers']:<5} "
+              f"{old['rows_per_s']:10.1f} → {r['rows_per_s']:10.1f} rows/s ({change:+.1%})")
+    return regressions
+
+
+def parse_sizes(text):
+    return [int(x) for x in text.split(",") if x]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scripts against the local stand-in server.")
+    parser.add_argument("--targets", default="matcher", help="comma list of: " + ", ".join(TARGETS))
+    parser.add_argument("--rows", type=parse_sizes, default=ROW_SIZES, help="CSV row counts, e.g. 100,1000")
+    parser.add_argument("--billpayers", type=parse_sizes, default=BILLPAYER_SIZES, help="billpayer counts")
+    parser.add_argument("--latency", type=float, default=0.0, help="stand-in latency per request, seconds")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="stand-in share of 500 responses")
+    parser.add_argument("--transport", choices=["selenium", "fetch", "http"], default="selenium")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--compare", metavar="RESULTS", help="earlier results JSON to diff against")
+    args = parser.parse_args()
+
+    options = {"seed": args.seed, "latency": args.latency, "failure_rate": args.failure_rate,
+               "transport": args.transport, "workers": args.workers}
+    results = []
+    for target in args.targets.split(","):
+        for billpayers in args.billpayers:
+            for rows in ([0] if target == "toggle" else args.rows):
+                print(f"⏱️ {target}: rows={rows} billpayers={billpayers}")
+                result = {"target": target, "rows": rows, "billpayers": billpayers,
+                          **TARGETS[target](rows, billpayers, **options)}
+                results.append(result)
+                if "error" in result:
+                    print(f"   ❌ {result['error']}")
+                else:
+                    print(f"   {result['rows_per_s']:.1f} rows/s, {result['seconds']:.2f}s, "
+                          f"peak {result['peak_rss_mb']:.0f} MB")
+
+    report = {
+        "started": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "options": options,
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results saved to {args.output}")
+    if args.compare and compare(results, args.compare):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import csv
+import threading
+import time
+from cache import CACHE_TTL, get_billpayers
+from config import BASE_URL
+from pipeline import open_input
+
+# === CONFIG ===
+BRANCH_COLUMN = "Branch"
+
+
+# Selenium is imported by the browser helpers themselves, so routing and
+# planning never pay for it.
+def list_branches(driver):
+    # {branch value: branch name} from the create form's branch picker
+    from selenium.webdriver.common.by import By
+    from waits import wait_element
+    driver.get(f"{BASE_URL}/user-finance-account/create")
+    wait_element(driver, (By.NAME, "branch"))
+    return {o.get_attribute("value"): o.text.strip()
+            for o in driver.find_elements(By.CSS_SELECTOR, "select[name='branch'] option")
+            if o.get_attribute("value")}
+
+
+def open_branch(driver, branch_value):
+    # Leaves the create form on the branch so its billpayers can be scraped
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import Select
+    from waits import wait_element
+    driver.get(f"{BASE_URL}/user-finance-account/create")
+    wait_element(driver, (By.NAME, "branch"))
+    Select(driver.find_element(By.NAME, "branch")).select_by_value(branch_value)
+
+
+def select_branch(driver, log=print, prompt=input):
+    # Branch picker prompt; leaves the create form on the chosen branch
+    branches = list(list_branches(driver).items())
+    print("\nSelect a branch:")
+    for i, (value, name) in enumerate(branches):
+        print(f"{i}: {name} [{value}]")
+    value, name = branches[int(prompt("Branch number: "))]
+    open_branch(driver, value)
+    log(f"✅ Branch selected: {name}")
+    return value
+
+
+def extract_billpayers(driver, branch_value, ttl=CACHE_TTL, refresh=False, log=print):
+    # Lists the branch's billpayers as (name, billpayer id); cached per branch
+    billpayers = []
+    print("\n📋 Billpayers loaded:")
+    for i, (name, element_id) in enumerate(get_billpayers(driver, branch_value, ttl, refresh, log=log)):
+        billpayer_id = element_id.split('-')[-1]
+        billpayers.append((name, billpayer_id))
+        print(f"{i}: {name} [ID: {billpayer_id}]")
+    return billpayers
+
+
+def has_branch_column(path):
+    with open_input(path) as f:
+        header = next(csv.reader(f), [])
+    return BRANCH_COLUMN in [h.strip() for h in header]
+
+
+def load_branch_map(path):
+    # Mapping file: one "Bill Payer,Branch" row per billpayer
+    with open_input(path) as f:
+        return {" ".join(row["Bill Payer"].lower().split()): row[BRANCH_COLUMN].strip()
+                for row in csv.DictReader(f) if row.get("Bill Payer") and row.get(BRANCH_COLUMN)}
+
+
+def branch_router(branches, branch_map=None):
+    # row -> branch value. The CSV's Branch column wins over the mapping
+    # file; either may hold the branch value or its name.
+    by_label = {name.lower(): value for value, name in branches.items()}
+    by_label.update({value.lower(): value for value in branches})
+    branch_map = branch_map or {}
+
+    def route(row):
+        label = row.get(BRANCH_COLUMN) or branch_map.get(" ".join(row.get("Bill Payer", "").lower().split()), "")
+        return by_label.get(label.strip().lower())
+    return route
+
+
+class BranchStats:
+    """Per-branch row, failure and busy-time counters for the run summary."""
+
+    def __init__(self, branches):
+        self.branches = branches
+        self.lock = threading.Lock()
+        self.counts = {}
+
+    def add(self, branch, rows=0, failed=0, seconds=0.0):
+        with self.lock:
+            stat = self.counts.setdefault(branch, {"rows": 0, "failed": 0, "seconds": 0.0})
+            stat["rows"] += rows
+            stat["failed"] += failed
+            stat["seconds"] += seconds
+
+    def timed(self, branch, run, jobs):
+        started = time.monotonic()
+        results = run(jobs)
+        failed = sum(1 for rows in results.values() if any(r[3] == "FAILED" for r in rows))
+        self.add(branch, rows=len(jobs), failed=failed, seconds=time.monotonic() - started)
+        return results
+
+    def report(self):
+        lines = ["🏢 Branch summary:"]
+        for branch, stat in sorted(self.counts.items(), key=lambda item: self.branches.get(item[0], "")):
+            rate = stat["rows"] / stat["seconds"] if stat["seconds"] else 0.0
+            lines.append(f"  {self.branches.get(branch, '(no branch)')}: {stat['rows']} rows, "
+                         f"{stat['failed']} failed, {rate:.2f} rows/s")
+        return "\n".join(lines)
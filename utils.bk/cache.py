@@ -0,0 +1,95 @@
+import json
+import os
+import time
+
+# === CONFIG ===
+CACHE_FILE = os.path.join("data", "billpayers_cache.json")
+CACHE_TTL = 24 * 60 * 60  # seconds
+
+# Reads every rendered select2 option in one round trip. The checksum is a
+# 32-bit rolling hash over "name|billpayer id" lines, so a probe can tell
+# whether the list changed without shipping the options back. Option element
+# ids carry a per-page-load token, so only their trailing billpayer id (as
+# aliases.billpayer_id) goes into the hash. The selected branch's name
+# comes along for matching the finance-account index, which shows names.
+SCRAPE_JS = """
+var full = arguments[0];
+var branch = document.querySelector("select[name='branch']");
+var nodes = document.querySelectorAll('.select2-results__option');
+var options = [], hash = 0;
+for (var i = 0; i < nodes.length; i++) {
+    var name = (nodes[i].innerText || '').trim();
+    var id = nodes[i].id || '';
+    if (!name || !id) continue;
+    options.push([name, id]);
+    var line = name + '|' + id.split('-').pop() + '\\n';
+    for (var j = 0; j < line.length; j++) hash = (hash * 31 + line.charCodeAt(j)) | 0;
+}
+return {count: options.length, checksum: String(hash >>> 0), options: full ? options : null,
+        branch: branch && branch.selectedIndex >= 0 ? branch.options[branch.selectedIndex].text.trim() : null};
+"""
+
+
+def load_cache(path=CACHE_FILE):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_cache(cache, path=CACHE_FILE):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def branch_name(branch_value, path=CACHE_FILE):
+    # Name of a branch seen by get_billpayers, or None
+    return load_cache(path).get(str(branch_value), {}).get("branch")
+
+
+def scrape(driver, full=True):
+    # Imported here so reading the cache does not load Selenium
+    from selenium.webdriver.common.by import By
+    from waits import wait_select2_results
+    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
+    wait_select2_results(driver)
+    return driver.execute_script(SCRAPE_JS, full)
+
+
+def get_billpayers(driver, branch_value, ttl=CACHE_TTL, refresh=False, path=CACHE_FILE, log=print):
+    # Billpayers for the branch as (name, select2 option id). A fresh cache
+    # entry is returned without touching the page; a stale one is probed and
+    # only re-scraped when the option count or checksum changed.
+    key = str(branch_value)
+    cache = load_cache(path)
+    entry = cache.get(key)
+    # Entries from before branch names were kept are scraped again
+    if entry and entry.get("branch") and not refresh:
+        if time.time() - entry["fetched_at"] < ttl:
+            log(f"📦 Using {len(entry['billpayers'])} cached billpayers for branch {key}")
+            return [tuple(bp) for bp in entry["billpayers"]]
+        probe = scrape(driver, full=False)
+        if probe["count"] == entry["count"] and probe["checksum"] == entry["checksum"]:
+            entry["fetched_at"] = time.time()
+            entry["branch"] = probe["branch"] or entry["branch"]
+            save_cache(cache, path)
+            log(f"📦 Billpayer list unchanged for branch {key}, cache renewed")
+            return [tuple(bp) for bp in entry["billpayers"]]
+        result = driver.execute_script(SCRAPE_JS, True)
+    else:
+        result = scrape(driver)
+    billpayers = [tuple(bp) for bp in result["options"]]
+    cache[key] = {
+        "fetched_at": time.time(),
+        "count": result["count"],
+        "checksum": result["checksum"],
+        "branch": result["branch"],
+        "billpayers": billpayers,
+    }
+    save_cache(cache, path)
+    log(f"📋 Extracted {len(billpayers)} billpayers.")
+    return billpayers
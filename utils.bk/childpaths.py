@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import argparse
+import importlib
+import sys
+
+# === CONFIG ===
+# subcommand -> (module, arguments put in front, help). A module is only
+# imported once its subcommand runs, so --help, plan and validate never
+# load Selenium, and nothing here loads Streamlit.
+COMMANDS = {
+    "deposit": ("deposit", [], "create one billpayer's deposit account and post to it"),
+    "batch": ("depositCSV", [], "post a transactions CSV"),
+    "plan": ("depositCSV", ["--dry-run"], "save the execution plan for a transactions CSV without posting"),
+    "reconcile": ("reconcile", [], "compare account balances with a transactions CSV"),
+    "toggle": ("toggleBillPayers", [], "disable one guardian"),
+    "toggle-branch": ("toggleAllBillpayersByBranch", [], "enable or disable every billpayer of a branch"),
+    "list-billpayers": ("billpayers", [], "list the billpayers of a branch"),
+    "aliases": ("aliases", [], "show, export or import remembered match decisions"),
+}
+CSV_FILE = "transactions.csv"
+SHOW_LIMIT = 20
+
+
+def validate(argv, prog):
+    from pipeline import read_rows
+    from planner import row_problems
+    parser = argparse.ArgumentParser(prog=prog, description="Check a transactions CSV offline before posting it.")
+    parser.add_argument("input", nargs="?", default=CSV_FILE, help=f"CSV, .gz or - (default: {CSV_FILE})")
+    args = parser.parse_args(argv)
+    rows = bad = 0
+    for seq, row in enumerate(read_rows(args.input)):
+        rows += 1
+        problems = row_problems(row)
+        if problems:
+            bad += 1
+            if bad <= SHOW_LIMIT:
+                print(f"  ❌ line {seq + 2}: " + "; ".join(problems))
+    if bad > SHOW_LIMIT:
+        print(f"  … {bad - SHOW_LIMIT} more")
+    if bad:
+        sys.exit(f"❌ {bad} of {rows} rows would not post")
+    print(f"✅ {rows} rows look fine")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="childpaths", description="ChildPaths deposit and billpayer tools.",
+                                     epilog="childpaths <command> --help shows the options of a command.")
+    commands = parser.add_subparsers(dest="command", metavar="command", required=True)
+    # Each command parses its own options; here they are only passed on
+    for name, (_, _, help_text) in COMMANDS.items():
+        commands.add_parser(name, help=help_text, add_help=False)
+    commands.add_parser("validate", help="check a transactions CSV offline", add_help=False)
+    args, rest = parser.parse_known_args(argv)
+    prog = f"childpaths {args.command}"
+    if args.command == "validate":
+        return validate(rest, prog)
+    module, before, _ = COMMANDS[args.command]
+    sys.argv = [prog] + before + rest
+    importlib.import_module(module).main()
+
+
+if __name__ == "__main__":
+    main()
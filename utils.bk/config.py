@@ -0,0 +1,5 @@
+import os
+
+# === CONFIG ===
+# CHILDPATHS_URL points every script at another server, e.g. the local stand-in
+BASE_URL = os.getenv("CHILDPATHS_URL", "https://app.childpaths.ie").rstrip("/")
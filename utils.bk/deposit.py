@@ -1,147 +1,77 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from difflib import SequenceMatcher
-import time
-
-def login(driver, wait, email, password):
-    driver.get("https://app.childpaths.ie/auth/login")
-    wait.until(EC.presence_of_element_located((By.ID, "email"))).send_keys(email)
-    driver.find_element(By.ID, "password").send_keys(password)
-    driver.find_element(By.CSS_SELECTOR, "#signin-form button").click()
-    wait.until(EC.url_contains("/dashboard"))
-    print("✅ Logged in")
-
-def select_branch(driver, wait):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    wait.until(EC.presence_of_element_located((By.NAME, "branch")))
-    branches = driver.find_elements(By.CSS_SELECTOR, "select[name='branch'] option")
-    print("\nSelect a branch:")
-    for i, b in enumerate(branches):
-        print(f"{i}: {b.text.strip()} [{b.get_attribute('value')}]")
-    index = int(input("Branch number: "))
-    selected = branches[index]
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(selected.get_attribute("value"))
-    print(f"\n✅ Branch selected: {selected.text.strip()}")
-    time.sleep(1)
-
-def extract_billpayers(driver):
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(2)
-    options = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
-    billpayers = []
-    print("\n📋 Billpayers loaded:")
-    for i, option in enumerate(options):
-        name = option.text.strip()
-        element_id = option.get_attribute("id")
-        if name and element_id:
-            billpayer_id = element_id.split('-')[-1]
-            billpayers.append((name, billpayer_id))
-            print(f"{i}: {name} [ID: {billpayer_id}]")
-    return billpayers
+import argparse
+from matcher import BillpayerMatcher
+from accounts import AccountIndex, fetch_rows_selenium
+from branches import extract_billpayers, select_branch
+from cache import branch_name
+from drivers import new_driver
+from forms import create_account
+from forms import make_transaction as post_transaction
+from login import signed_in
 
 def match_billpayer(billpayers, user_input):
-    matches = []
-    for name, billpayer_id in billpayers:
-        score = SequenceMatcher(None, user_input.lower(), name.lower()).ratio()
-        matches.append((score, name, billpayer_id))
-    matches.sort(reverse=True, key=lambda x: x[0])
+    matches = BillpayerMatcher(billpayers).match(user_input)
     best = matches[0]
     if best[0] >= 0.95:
         print(f"✅ Auto-selected match: {best[1]} [ID: {best[2]}] (Score: {round(best[0]*100)}%)")
-        return best[1]
+        return best[1], best[2]
     else:
         print("\n⚠️ No perfect match. Top 5:")
         for i, (score, name, billpayer_id) in enumerate(matches[:5]):
             print(f"{i}: {name} [ID: {billpayer_id}] (Score: {round(score*100)}%)")
         choice = int(input("Choose correct number: "))
-        return matches[choice][1]
+        return matches[choice][1], matches[choice][2]
 
-def select_owner(driver, matched_name):
-    # Reopen Select2 field
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(1)
-    driver.switch_to.active_element.send_keys(matched_name)
-    time.sleep(1)
-    driver.switch_to.active_element.send_keys(Keys.ENTER)
-    print(f"✅ Typed and selected: {matched_name}")
+def load_index(driver, branch_value):
+    # Finance accounts of the branch; its name comes from the billpayer cache
+    index = AccountIndex(branches={branch_value: branch_name(branch_value)})
+    return index.load(lambda url: fetch_rows_selenium(driver, url))
 
-def create_finance_account(driver, wait):
-    driver.find_element(By.ID, "display_name").send_keys("Deposit Account")
-    Select(driver.find_element(By.NAME, "currency")).select_by_value("EUR")
-    try:
-        switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
-        if "bootstrap-switch-on" in switch_wrapper.get_attribute("class"):
-            switch_wrapper.click()
-            print("🔁 Switched 'Set as default' to OFF")
-    except Exception as e:
-        print(f"⚠️ Switch error: {e}")
-    time.sleep(1)
-    driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Create"]').click()
-    print("✅ Finance account created")
+def show_account(account):
+    print("\n🧾 Deposit Account:")
+    print(f"Account ID: {account['id']}")
+    print(f"Balance: {account['balance']}")
+    print(f"Available Funds: {account['available']}")
 
-def extract_latest_deposit_account(driver, wait):
-    driver.get("https://app.childpaths.ie/user-finance-account/index")
-    wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, "table.table tbody tr")))
-    rows = driver.find_elements(By.CSS_SELECTOR, "table.table tbody tr")
-    for row in rows:
-        caption_cell = row.find_elements(By.TAG_NAME, "td")[3]
-        if "Deposit Account" in caption_cell.text:
-            cells = row.find_elements(By.TAG_NAME, "td")
-            account_id = row.get_attribute("id").replace("ufa_", "")
-            details = {
-                "Account ID": account_id,
-                "Balance": cells[6].text.strip(),
-                "Available Funds": cells[7].text.strip()
-            }
-            print("\n🧾 Latest Deposit Account:")
-            for k, v in details.items():
-                print(f"{k}: {v}")
-            return account_id
-    print("❌ Deposit Account not found")
-    return None
+def deposit_account(driver, wait, index, matched_name, branch_value, billpayer_id):
+    # The billpayer's existing deposit account, or a new one found by owner
+    # in the rows that appeared since the index was read
+    account_id = index.find(matched_name, branch_value)
+    if account_id:
+        print(f"♻️ Reusing account {account_id} for {matched_name}")
+        return account_id
+    if not create_account(driver, wait, matched_name, branch_value, billpayer_id):
+        return None
+    account_id = index.account_id_after_create(lambda url: fetch_rows_selenium(driver, url), matched_name,
+                                               branch_value)
+    if not account_id:
+        print(f"❌ Deposit Account for {matched_name} not found")
+    return account_id
 
 def make_transaction(driver, wait, account_id, tx_type):
-    url = f"https://app.childpaths.ie/user-finance-account/{account_id}/transaction/{tx_type}"
-    driver.get(url)
-    wait.until(EC.presence_of_element_located((By.NAME, "value")))
     amount = input(f"{'💰' if tx_type == 'deposit' else '💸'} Amount: ")
     description = input("📝 Description (optional): ")
     received_at = input("📅 Received at (dd/mm/yyyy, optional): ")
-
-    driver.find_element(By.NAME, "value").send_keys(amount)
-    if description:
-        driver.find_element(By.NAME, "description").send_keys(description)
-    if received_at:
-        driver.find_element(By.NAME, "received_at").send_keys(received_at)
-
-    driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Add"]').click()
-    print(f"✅ {tx_type.capitalize()} submitted")
-    time.sleep(2)
+    post_transaction(driver, wait, account_id, tx_type, amount, description, received_at)
 
 def main():
+    parser = argparse.ArgumentParser(description="Create a deposit account for one billpayer and post to it.")
+    parser.add_argument("name", nargs="?", help="billpayer name to match (prompted when left out)")
+    args = parser.parse_args()
     email = input("Email: ")
     password = input("Password: ")
-    input_name = input("Billpayer name to match: ")
+    input_name = args.name or input("Billpayer name to match: ")
 
-    options = Options()
-    options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 10)
+    driver = new_driver()
 
     try:
-        login(driver, wait, email, password)
-        select_branch(driver, wait)
-        billpayers = extract_billpayers(driver)
-        matched_name = match_billpayer(billpayers, input_name)
-        select_owner(driver, matched_name)
-        create_finance_account(driver, wait)
-
-        account_id = extract_latest_deposit_account(driver, wait)
+        wait = signed_in(driver, email, password)
+        branch_value = select_branch(driver)
+        billpayers = extract_billpayers(driver, branch_value)
+        matched_name, billpayer_id = match_billpayer(billpayers, input_name)
+        index = load_index(driver, branch_value)
+        account_id = deposit_account(driver, wait, index, matched_name, branch_value, billpayer_id)
         if account_id:
+            show_account(index.get(account_id))
             while True:
                 print("\nActions:")
                 print("1. Deposit")
@@ -154,7 +84,7 @@ def main():
                 elif action == "2":
                     make_transaction(driver, wait, account_id, "withdrawal")
                 elif action == "3":
-                    extract_latest_deposit_account(driver, wait)
+                    show_account(load_index(driver, branch_value).get(account_id))
                 elif action == "4":
                     break
                 else:
@@ -1,229 +1,578 @@
-import csv
-import time
-from datetime import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.keys import Keys
-from difflib import SequenceMatcher
+import argparse
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from dotenv import load_dotenv
 import os
+from matcher import BillpayerMatcher
+from executor import ShardedExecutor, group_by_billpayer
+from accounts import AccountIndex
+from aliases import ALIAS_FILE, AliasStore, billpayer_id
+from config import BASE_URL
+from throttle import MAX_RPS, controller
+from cache import CACHE_TTL, branch_name, get_billpayers, load_cache
+from logger import RunLogger
+from journal import JOURNAL_FILE, Journal, UncheckedSteps
+from pipeline import REPORT_HEADER, WINDOW, ReportWriter, bill_payer_names, match_rows, read_rows, windows
+from branches import (BranchStats, branch_router, has_branch_column, list_branches, load_branch_map, open_branch,
+                      select_branch)
+from retries import ATTEMPTS, DEAD_LETTER_FILE, DeadLetter, RetryPolicy
+from metrics import PROFILE_FILE, count, run_profiled, timed
+from metrics import export as export_metrics, summary as metrics_summary
+from planner import (PLAN_FILE, compile_plan, load_plan, measured_costs, plan_is_stale, plan_jobs, plan_steps,
+                     plan_summary, save_plan)
+from posting import RowPoster
 
 # === CONFIG ===
 CSV_FILE = "transactions.csv"
 REPORT_FILE = "transaction_report.csv"
 LOG_FILE = "transaction_debug.log"
+AUTO_WORKERS = 4  # sessions opened by --workers auto
+TTY = "CON" if os.name == "nt" else "/dev/tty"
+logger = None
+retry_policy = RetryPolicy(log=print)
+dead_letter = DeadLetter()
+aliases = None
+SKIP = "skip"
+UNANSWERED = "unanswered"
+PROMPT_OPTIONS = 5  # candidates shown at the match prompt, and all a pre-pass keeps
+prompts_on_tty = False  # rows come from stdin, so questions go to the terminal
+terminal = None
+unanswered = set()  # (branch, name) whose match prompt nobody could answer
 
 # === UTILS ===
-def fuzzy_match(name, options):
-    scores = [(SequenceMatcher(None, name.lower(), o[0].lower()).ratio(), *o) for o in options if o[0].strip()]
-    scores.sort(reverse=True, key=lambda x: x[0])
-    return scores
-
-def log_debug(msg):
-    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {msg}\n")
+def log_debug(msg, **fields):
+    if logger:
+        logger.log(msg, **fields)
     print(msg)
 
-def load_driver():
-    options = Options()
-    options.add_argument("--window-size=1920,1080")
-    return webdriver.Chrome(options=options)
-
-def login(driver, wait, email, password):
-    driver.get("https://app.childpaths.ie/auth/login")
-    wait.until(EC.presence_of_element_located((By.ID, "email"))).send_keys(email)
-    driver.find_element(By.ID, "password").send_keys(password)
-    driver.find_element(By.CSS_SELECTOR, "#signin-form button").click()
-    wait.until(EC.url_contains("/dashboard"))
-    log_debug("✅ Logged in")
-
-def select_branch(driver, wait):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    wait.until(EC.presence_of_element_located((By.NAME, "branch")))
-    branches = driver.find_elements(By.CSS_SELECTOR, "select[name='branch'] option")
-    print("\nSelect a branch:")
-    for i, b in enumerate(branches):
-        print(f"{i}: {b.text.strip()} [{b.get_attribute('value')}]")
-    index = int(input("Branch number: "))
-    selected = branches[index]
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(selected.get_attribute("value"))
-    log_debug(f"✅ Branch selected: {selected.text.strip()}")
-    time.sleep(1)
-    return selected.get_attribute("value")
-
-def extract_billpayers(driver):
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(2)
-    options = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
-    billpayers = []
-    for option in options:
-        name = option.text.strip()
-        element_id = option.get_attribute("id")
-        if name and element_id:
-            billpayers.append((name, element_id))
-    log_debug(f"📋 Extracted {len(billpayers)} billpayers.")
-    return billpayers
+def ask(prompt):
+    # -> the stripped answer, or None when there is nobody to answer. The
+    # terminal is only opened once a question comes up, so runs that need
+    # none work without one (cron, CI, Windows).
+    global terminal
+    if not prompts_on_tty:
+        try:
+            return input(prompt).strip()
+        except EOFError:
+            return None
+    if terminal is None:
+        try:
+            terminal = open(TTY, encoding="utf-8")
+        except OSError:
+            terminal = False
+            log_debug("⚠️ No terminal to ask: unclear matches are skipped to the dead-letter file, "
+                      "unchecked steps are held")
+    if not terminal:
+        return None
+    print(prompt, end="", flush=True)
+    line = terminal.readline()
+    return line.strip() if line else None
 
 def prompt_fuzzy_choice(name, matches):
     print(f"⚠️ No strong match for '{name}'. Select the best match or type 's' to skip:")
-    for i, (score, match_name, _) in enumerate(matches[:5]):
+    for i, (score, match_name, _) in enumerate(matches[:PROMPT_OPTIONS]):
         print(f"{i}: {match_name} (score: {int(score*100)}%)")
-    choice = input("Pick option number (or 's' to skip): ").strip()
+    # -> the chosen (score, name, id), SKIP, UNANSWERED, or None when the
+    # answer was no option
+    choice = ask("Pick option number (or 's' to skip): ")
+    if choice is None:
+        return UNANSWERED
     if choice == 's':
-        return None
+        return SKIP
     try:
-        return matches[int(choice)][1]
-    except:
+        return matches[int(choice)]
+    except (ValueError, IndexError):
         return None
 
-def create_account(driver, wait, owner_name, branch_value):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(branch_value)
-    driver.find_element(By.ID, "display_name").send_keys("Deposit Account")
-    Select(driver.find_element(By.NAME, "currency")).select_by_value("EUR")
+def make_transport(driver, wait, kind):
+    # Browser and HTTP modules load with the first session, keeping them
+    # out of --help and the start of planning
+    from forms import create_account, make_transaction
+    from transport import FetchTransport, HttpTransport, SeleniumTransport, ThrottledTransport
+    selenium = SeleniumTransport(driver, wait, partial(create_account, log=log_debug),
+                                 partial(make_transaction, log=log_debug))
+    if kind == "http":
+        return ThrottledTransport(HttpTransport.from_transport(selenium, log=log_debug))
+    if kind == "fetch":
+        return ThrottledTransport(FetchTransport(selenium, log=log_debug))
+    return ThrottledTransport(selenium)
+
+def make_poster(index, journal, branch_value):
+    return RowPoster(index, journal, branch_value, retry_policy, dead_letter, log=log_debug, logger=logger)
+
+def check_uncertain(journal):
+    # Steps that were posting when the last run stopped, or came back
+    # uncertain, may be booked already. Each is put to the operator; what
+    # nobody confirms stays held and ends up in the dead-letter file.
+    pending = journal.unchecked()
+    if not pending:
+        return
+    log_debug(f"⚠️ {len(pending)} step(s) may have posted before the last run stopped; check each account first")
+    for entry in pending:
+        print(f"❓ {entry['step'].capitalize()} of €{entry['amount']} for {entry['billpayer']}: "
+              f"{BASE_URL}/user-finance-account/{entry['account_id']}")
+        answer = (ask("Is it on the account? [y]es / [n]o, post it / Enter to hold it back: ") or "").lower()
+        if answer == "y":
+            journal.finished(entry["key"], "OK")
+            log_debug(f"✅ {entry['key']} confirmed as posted")
+        elif answer == "n":
+            journal.finished(entry["key"], "FAILED")
+            log_debug(f"🔁 {entry['key']} confirmed missing; posting it again")
+
+def skipped_row(row):
+    return [[row.get('Bill Payer', ''), "N/A", row.get('Amount', '0'), "FAILED", "Skipped"]]
+
+def unmatched_row(branch_value, row):
+    # A row nobody could confirm a match for is not a decision to skip it,
+    # so it goes to the dead-letter file to be fed again from a terminal
+    name = row.get('Bill Payer', '')
+    if (branch_value, name) not in unanswered:
+        return skipped_row(row)
+    dead_letter.write(row, f"No answer to the match prompt for {name!r}", row.get('Step', ''))
+    return [[name, "N/A", row.get('Amount', '0'), "FAILED", "Skipped: no answer to the match prompt"]]
+
+def unrouted_row(row):
+    return [[row.get('Bill Payer', ''), "N/A", row.get('Amount', '0'), "FAILED", "No branch"]]
+
+def remembered(branch_value, name):
+    return aliases.lookup(branch_value, name) if aliases is not None else None
+
+def unknown_names(branch_value, names, journal, prefix=""):
+    # Names the alias store or a resumed journal already decides never go
+    # through fuzzy scoring. prefix is the resolver's journal key prefix.
+    return [name for name in names if prefix + name not in journal.matches and not remembered(branch_value, name)]
+
+def prune_aliases(branch_value, billpayers):
+    if aliases is not None:
+        dropped = aliases.prune(branch_value, billpayers)
+        if dropped:
+            log_debug(f"🗑️ Forgot {dropped} remembered matches for billpayers no longer in branch {branch_value}")
+
+def make_resolver(matcher, journal, scored, branch_value, prefix=""):
+    # Decisions, including skips, are journaled under prefix + name so a
+    # resume never re-prompts, and answers to prompts go to the alias store
+    # so later runs do not ask again. scored holds pre-pass matches.
+    def resolve(name):
+        key = prefix + name
+        if key in journal.matches:
+            return journal.matches[key]
+        if (branch_value, name) in unanswered:
+            return None
+        known = remembered(branch_value, name)
+        if known:
+            count("alias_hits")
+            selected = known["billpayer"]
+            if not selected:
+                log_debug(f"❌ Skipped: {name} (skipped in an earlier run)")
+            journal.record_match(key, selected)
+            return selected
+        matches = scored.pop(name, None) or matcher.match(name)
+        if not matches:
+            log_debug(f"❌ Skipped: {name} (no billpayers found)")
+            selected = None
+        elif matches[0][0] >= 0.95:
+            selected = matches[0][1]
+        else:
+            choice = prompt_fuzzy_choice(name, matches)
+            if choice == UNANSWERED:
+                # Not journaled or remembered: the next run asks again
+                log_debug(f"❌ Skipped: {name} (nobody to answer the prompt)")
+                unanswered.add((branch_value, name))
+                return None
+            if choice == SKIP:
+                selected = None
+                log_debug(f"❌ Skipped: {name} (manual skip)")
+            elif choice is None:
+                selected = None
+                log_debug(f"❌ Skipped: {name} (no option picked)")
+            else:
+                selected = choice[1]
+            if aliases is not None and choice:
+                aliases.record(branch_value, name, selected, choice[2] if selected else None)
+        journal.record_match(key, selected)
+        return selected
+    return resolve
+
+def run_jobs(args, jobs, branch_value, owner_ids, transport, journal, start_session, planned=None, known=None,
+             index=None):
+    if index is None:
+        index = load_index(transport, branch_value)
+    accounts = {}
+    poster = make_poster(index, journal, branch_value)
+
+    def process(t, a, group):
+        return poster.process_rows(t, a, group, owner_ids.get(group[0][1]), planned, known)
+
+    def run_here(jobs):
+        results = {}
+        for group in group_by_billpayer(jobs):
+            results.update(process(transport, accounts, group))
+        return results
+
+    executor = None
+    if args.workers > 1:
+        log_debug(f"🚀 Running across {args.workers} sessions, {args.window} rows at a time")
+        executor = ShardedExecutor(args.workers, start_session, process, grouped=True)
+    try:
+        with ReportWriter(REPORT_FILE) as report:
+            for window in windows(jobs, args.window):
+                resolved = [job for job in window if job[1]]
+                results = executor.run(resolved) if executor else run_here(resolved)
+                for seq, matched_name, row in window:
+                    report.write(results.get(seq, []) if matched_name else unmatched_row(branch_value, row))
+    finally:
+        if executor:
+            executor.close()
+
+def load_branch(args, driver, wait):
+    with timed("select_branch"):
+        if args.branch:
+            branch_value = str(args.branch)
+            open_branch(driver, branch_value)
+        else:
+            try:
+                branch_value = select_branch(driver, log=log_debug, prompt=lambda text: ask(text) or "")
+            except (ValueError, IndexError):
+                sys.exit("❌ No branch picked; pass --branch when there is no terminal to ask")
+    with timed("extract_billpayers"):
+        billpayers = get_billpayers(driver, branch_value, args.cache_ttl, args.refresh_billpayers, log=log_debug)
+    return branch_value, billpayers
+
+def resolver_for(billpayers, branch_value, source, journal):
+    matcher = BillpayerMatcher(billpayers)
+    prune_aliases(branch_value, billpayers)
+    # Files get a names-only pre-pass so every prompt comes before the
+    # first post; piped input is matched as rows arrive.
+    with timed("match"):
+        scored = matcher.match_many(unknown_names(branch_value, bill_payer_names(source), journal),
+                                   limit=PROMPT_OPTIONS) \
+            if isinstance(source, str) else {}
+    resolve = make_resolver(matcher, journal, scored, branch_value)
+    for name in list(scored):
+        resolve(name)
+    return resolve
+
+def owner_ids_for(billpayers):
+    return {name: billpayer_id(element_id) for name, element_id in billpayers}
+
+def run_branch(args, source, driver, wait, journal, start_session):
+    branch_value, billpayers = load_branch(args, driver, wait)
+    transport = make_transport(driver, wait, args.transport)
+    resolve = resolver_for(billpayers, branch_value, source, journal)
+    run_jobs(args, match_rows(read_rows(source), resolve), branch_value, owner_ids_for(billpayers),
+             transport, journal, start_session)
+
+def load_index(transport, branch_value):
+    with timed("index_load"):
+        index = AccountIndex(branches={branch_value: branch_name(branch_value)}).load(transport.fetch_index)
+    log_debug(f"📒 Indexed {len(index)} finance accounts")
+    return index
+
+def run_plan(args, plan, driver, wait, journal, start_session):
+    # Posts what the plan lists, to the billpayers and accounts it resolved,
+    # without matching or expanding rows again. Accounts of a stale plan are
+    # checked against the index first.
+    branch_value = plan["branch"]
+    steps = plan_steps(plan)
+    log_debug(f"🗺️ Executing plan for branch {branch_value}: {sum(len(s) for s in steps.values())} steps, "
+              f"{len(plan['accounts']['create'])} accounts to create")
+    transport = make_transport(driver, wait, args.transport)
+    index = load_index(transport, branch_value)
+    known = dict(plan["accounts"]["existing"])
+    if plan_is_stale(plan):
+        log_debug(f"🕰️ Plan from {plan['created_at']} is stale; checking its accounts against the index")
+        for name in plan["accounts"]["existing"]:
+            found = index.find(name, branch_value)
+            if found != known[name]:
+                log_debug(f"⚠️ {name}: plan has account {known[name]}, the index has {found or 'none'}")
+                del known[name]
+    # Rows whose steps were all posted before the plan was made are left out
+    jobs = [(seq, name, row) for seq, name, row in plan_jobs(plan) if not name or seq in steps]
+    run_jobs(args, jobs, branch_value, plan["owner_ids"], transport, journal, start_session, steps, known, index)
+
+def make_plan(args, source, journal, email, password, open_driver):
+    # With --branch in the billpayer cache and the account index reachable
+    # over HTTP, the plan is built before any browser starts.
+    cached = load_cache().get(str(args.branch)) if args.branch and not args.refresh_billpayers else None
+    if cached and cached.get("branch"):
+        branch_value = str(args.branch)
+        billpayers = [tuple(bp) for bp in cached["billpayers"]]
+        log_debug(f"📦 Planning with {len(billpayers)} cached billpayers for branch {branch_value}")
+    else:
+        branch_value, billpayers = load_branch(args, *open_driver())
+    resolve = resolver_for(billpayers, branch_value, source, journal)
+
+    import requests
+    from transport import HttpTransport
+    find_account = None
+    http = HttpTransport(log=log_debug)
     try:
-        switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
-        if "bootstrap-switch-on" in switch_wrapper.get_attribute("class"):
-            switch_wrapper.click()
-    except: pass
-    time.sleep(1)
-
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(1)
-    driver.switch_to.active_element.send_keys(owner_name)
-    time.sleep(1.5)
-    driver.switch_to.active_element.send_keys(Keys.ENTER)
-    time.sleep(1)
-
-    driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Create"]').click()
-    time.sleep(2)
-
-    errors = driver.find_elements(By.CSS_SELECTOR, ".alert-danger li, .alert-warning li")
-    if errors:
-        for e in errors:
-            log_debug("❌ Form error: " + e.text)
-        return False
-    log_debug(f"✅ Account created for {owner_name}")
-    return True
-
-def get_account_id(driver):
-    driver.get("https://app.childpaths.ie/user-finance-account/index")
-    rows = driver.find_elements(By.CSS_SELECTOR, "table.table tbody tr")
-    for row in rows:
-        caption = row.find_elements(By.TAG_NAME, "td")[3].text
-        if "Deposit Account" in caption:
-            return row.get_attribute("id").replace("ufa_", "")
-    return None
-
-def make_transaction(driver, wait, account_id, tx_type, amount, note, date):
+        if http.login(email, password):
+            index = AccountIndex(branches={branch_value: branch_name(branch_value)}).load(http.fetch_index)
+            find_account = index.find
+            log_debug(f"📒 Indexed {len(index)} finance accounts for the plan")
+    except requests.RequestException as e:
+        log_debug(f"⚠️ Planning without server state: {e}")
+    finally:
+        http.quit()
+    return compile_plan(match_rows(read_rows(source), resolve), branch_value, owner_ids_for(billpayers), journal,
+                        find_account, measured_costs(LOG_FILE), args.workers,
+                        source if isinstance(source, str) else None)
+
+def run_branches(args, source, driver, wait, journal, start_session):
+    # Rows are routed by their Branch column or the mapping file. Every
+    # branch gets its own billpayers, matcher and group of worker sessions,
+    # and the groups work through each window concurrently.
+    branches = list_branches(driver)
+    route = branch_router(branches, load_branch_map(args.branch_map) if args.branch_map else None)
+    transport = make_transport(driver, wait, args.transport)
+    stats = BranchStats(branches)
+    groups = {}
+    live = []
+    live_lock = threading.Lock()
+
+    def open_session():
+        # The in-flight ceiling follows the sessions actually opened, so
+        # branches that never get rows add nothing to the shared budget
+        session = start_session()
+        with live_lock:
+            live.append(session)
+            controller.configure(maximum=len(live))
+        return session
+
+    def group(branch_value):
+        if branch_value not in groups:
+            with timed("select_branch", branch=branch_value):
+                open_branch(driver, branch_value)
+            with timed("extract_billpayers", branch=branch_value):
+                billpayers = get_billpayers(driver, branch_value, args.cache_ttl, args.refresh_billpayers,
+                                            log=log_debug)
+            log_debug(f"🏢 {branches[branch_value]}: {len(billpayers)} billpayers")
+            matcher = BillpayerMatcher(billpayers)
+            prune_aliases(branch_value, billpayers)
+            owner_ids = owner_ids_for(billpayers)
+            scored = {}
+            groups[branch_value] = {
+                "matcher": matcher,
+                "scored": scored,
+                "resolve": make_resolver(matcher, journal, scored, branch_value, prefix=f"{branch_value}:"),
+                "executor": ShardedExecutor(args.workers, open_session,
+                                            # index is loaded after the pre-pass creates the group
+                                            lambda t, a, jobs: make_poster(index, journal, branch_value).process_rows(
+                                                t, a, jobs, owner_ids.get(jobs[0][1])),
+                                            grouped=True),
+            }
+        return groups[branch_value]
+
+    def routed(rows):
+        for seq, row in enumerate(rows):
+            branch_value = route(row)
+            matched_name = group(branch_value)["resolve"](row.get('Bill Payer', '')) if branch_value else None
+            yield seq, branch_value, matched_name, row
+
     try:
-        url = f"https://app.childpaths.ie/user-finance-account/{account_id}/transaction/{tx_type}"
-        driver.get(url)
-        wait.until(EC.presence_of_element_located((By.NAME, "value")))
-        driver.find_element(By.NAME, "value").send_keys(str(amount))
-        if note:
-            driver.find_element(By.NAME, "description").send_keys(note)
-        if date:
-            driver.find_element(By.NAME, "received_at").send_keys(date)
-        driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Add"]').click()
-        time.sleep(1.5)
-        log_debug(f"✅ {tx_type.capitalize()} successful for €{amount}")
-        return True
-    except Exception as e:
-        log_debug(f"❌ {tx_type.capitalize()} failed for €{amount}: {str(e)}")
-        return False
+        if isinstance(source, str):
+            names = {}
+            for row in read_rows(source):
+                branch_value = route(row)
+                if branch_value:
+                    # Insertion-ordered set: each name once, prompts in CSV order
+                    names.setdefault(branch_value, {})[row.get('Bill Payer', '')] = None
+            for branch_value, branch_names in names.items():
+                g = group(branch_value)
+                with timed("match", branch=branch_value):
+                    g["scored"].update(g["matcher"].match_many(
+                        unknown_names(branch_value, branch_names, journal, prefix=f"{branch_value}:"),
+                        limit=PROMPT_OPTIONS))
+                for name in list(g["scored"]):
+                    g["resolve"](name)
 
-def main():
+        with timed("index_load"):
+            index = AccountIndex(branches=branches).load(transport.fetch_index)
+        log_debug(f"📒 Indexed {len(index)} finance accounts")
+        log_debug(f"🚀 Running {args.workers} session(s) per branch, {args.window} rows at a time")
+
+        with ReportWriter(REPORT_FILE, header=REPORT_HEADER + ["Branch"]) as report, \
+                ThreadPoolExecutor(max_workers=max(1, len(branches))) as runner:
+            for window in windows(routed(read_rows(source)), args.window):
+                work = {}
+                for seq, branch_value, matched_name, row in window:
+                    if matched_name:
+                        work.setdefault(branch_value, []).append((seq, matched_name, row))
+                futures = [runner.submit(stats.timed, branch_value, groups[branch_value]["executor"].run, jobs)
+                           for branch_value, jobs in work.items()]
+                results = {}
+                for future in futures:
+                    results.update(future.result())
+                for seq, branch_value, matched_name, row in window:
+                    if not branch_value:
+                        rows = unrouted_row(row)
+                        stats.add("", rows=1, failed=1)
+                    elif not matched_name:
+                        rows = unmatched_row(branch_value, row)
+                        stats.add(branch_value, rows=1, failed=1)
+                    else:
+                        rows = results.get(seq, [])
+                    report.write([r + [branches.get(branch_value, "")] for r in rows])
+        log_debug(stats.report())
+    finally:
+        for g in groups.values():
+            g["executor"].close()
+
+def worker_count(value):
+    return AUTO_WORKERS if value == "auto" else int(value)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Post deposits from transactions.csv to ChildPaths.")
+    parser.add_argument("--input", default=CSV_FILE,
+                        help="CSV to import, optionally gzipped; '-' reads stdin (default: transactions.csv)")
+    parser.add_argument("--window", type=int, default=WINDOW, help="rows held in memory per parallel batch")
+    parser.add_argument("--workers", type=worker_count, default=1,
+                        help=f"parallel browser sessions, or 'auto' to open {AUTO_WORKERS} and let the throttle "
+                             "decide how many work at once (default: 1)")
+    parser.add_argument("--max-rps", type=float, default=MAX_RPS,
+                        help=f"ceiling on requests per second to ChildPaths (default: {MAX_RPS:g})")
+    parser.add_argument("--transport", choices=["selenium", "fetch", "http"], default="selenium",
+                        help="post forms through the browser, batched with in-page fetch(), or directly over HTTP "
+                             "(default: selenium)")
+    parser.add_argument("--journal", default=JOURNAL_FILE, help="step journal written during the run")
+    parser.add_argument("--resume", metavar="JOURNAL", help="continue a stopped run from its journal")
+    parser.add_argument("--branch-map", metavar="CSV",
+                        help="'Bill Payer,Branch' file routing rows to branches (enables multi-branch mode)")
+    parser.add_argument("--by-branch", action="store_true",
+                        help="route rows by their Branch column (automatic for files that have one)")
+    parser.add_argument("--branch", help="branch value to use instead of the branch prompt")
+    parser.add_argument("--dry-run", action="store_true", help="print and save the execution plan, then stop")
+    parser.add_argument("--plan-out", metavar="JSON", help=f"where to save the plan (default: {PLAN_FILE})")
+    parser.add_argument("--plan", metavar="JSON", help="execute a plan saved by an earlier --dry-run")
+    parser.add_argument("--refresh-billpayers", action="store_true", help="ignore the billpayer cache")
+    parser.add_argument("--cache-ttl", type=int, default=CACHE_TTL, help="billpayer cache TTL in seconds")
+    parser.add_argument("--aliases", default=ALIAS_FILE,
+                        help=f"remembered match decisions, read and updated (default: {ALIAS_FILE})")
+    parser.add_argument("--no-aliases", action="store_true", help="neither use nor update remembered matches")
+    parser.add_argument("--profile", action="store_true", help=f"run under cProfile and write {PROFILE_FILE}")
+    parser.add_argument("--retries", type=int, default=ATTEMPTS - 1,
+                        help=f"retries per failed step on timeouts and server errors (default: {ATTEMPTS - 1})")
+    parser.add_argument("--dead-letter", default=DEAD_LETTER_FILE,
+                        help=f"CSV of rows that still failed, ready to feed back in (default: {DEAD_LETTER_FILE})")
+    return parser.parse_args()
+
+def run(args):
+    global logger, retry_policy, dead_letter, aliases, prompts_on_tty
     load_dotenv()
     email = os.getenv("EMAIL")
     password = os.getenv("PASSWORD")
-    driver = load_driver()
-    wait = WebDriverWait(driver, 10)
-    report = []
-    with open(LOG_FILE, "w", encoding="utf-8") as f:
-        f.write("--- TRANSACTION DEBUG LOG ---\n")
+    source = args.input
+    if source == "-":
+        # Rows come from the pipe; branch and match prompts go to the terminal
+        source = sys.stdin.buffer
+        prompts_on_tty = True
+    multi = args.branch_map or args.by_branch or (isinstance(source, str) and has_branch_column(source))
+    planning = args.plan or args.dry_run or args.plan_out
+    if multi and planning:
+        sys.exit("❌ Plans cover single-branch runs; drop --dry-run/--plan/--plan-out or the branch routing")
+    logger = RunLogger(LOG_FILE)
+    log_debug("--- TRANSACTION RUN ---", input=str(args.input), workers=args.workers, transport=args.transport)
+    if not args.no_aliases:
+        aliases = AliasStore(args.aliases)
+        log_debug(f"🔖 {len(aliases)} remembered match decisions in {args.aliases}")
+    retry_policy = RetryPolicy(args.retries + 1, log=log_debug)
+    controller.configure(maximum=args.workers, max_rps=args.max_rps)
+    dead_letter_path = args.dead_letter
+    if isinstance(source, str) and os.path.abspath(source) == os.path.abspath(dead_letter_path):
+        # Feeding a dead-letter file back in must not truncate it
+        stem, ext = os.path.splitext(dead_letter_path)
+        dead_letter_path = f"{stem}_again{ext}"
+    dead_letter = DeadLetter(dead_letter_path)
+    if args.dry_run and not args.resume:
+        # A dry run must not truncate the journal of an earlier run
+        journal = Journal(None)
+    else:
+        try:
+            journal = Journal(args.resume or args.journal, resume=bool(args.resume))
+        except UncheckedSteps as e:
+            sys.exit(f"❌ {e}. Run with --resume {e.path} to check them, or move the file aside.")
+    if args.resume:
+        log_debug(f"⏯️ Resuming from {args.resume}: {len(journal.done)} steps finished, "
+                  f"{len(journal.accounts)} accounts known")
+        if not args.dry_run:
+            check_uncertain(journal)
+
+    pool = None
+    driver = wait = None
+
+    def open_driver():
+        # The main session plus one per worker start together in the
+        # background. Selenium is only imported here, so a plan built from
+        # the billpayer cache never loads it.
+        nonlocal pool, driver, wait
+        if pool is None:
+            from drivers import DriverPool
+            from login import signed_in
+            pool = DriverPool(args.workers + 1 if args.workers > 1 else 1)
+            driver = pool.get()
+            with timed("login"):
+                wait = signed_in(driver, email, password, log=log_debug)
+        return driver, wait
+
+    def start_session():
+        from login import signed_in
+        session_driver = pool.get()
+        with timed("login"):
+            session_wait = signed_in(session_driver, email, password, log=log_debug)
+        return make_transport(session_driver, session_wait, args.transport)
 
     try:
-        login(driver, wait, email, password)
-        branch_value = select_branch(driver, wait)
-        billpayers = extract_billpayers(driver)
-        accounts = {}
-
-        matches_by_name = {}
-
-        with open(CSV_FILE, newline='', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            reader.fieldnames = [h.strip() for h in reader.fieldnames]
-            data = [dict((k.strip(), v.strip()) for k, v in row.items()) for row in reader]
-
-        for row in data:
-            name = row.get('Bill Payer', '')
-            if name in matches_by_name:
-                continue
-            matches = fuzzy_match(name, billpayers)
-            if not matches:
-                log_debug(f"❌ Skipped: {name} (no billpayers found)")
-                matches_by_name[name] = None
-                continue
-            if matches[0][0] >= 0.95:
-                matches_by_name[name] = matches[0][1]
-            else:
-                selected = prompt_fuzzy_choice(name, matches)
-                if selected:
-                    matches_by_name[name] = selected
-                else:
-                    log_debug(f"❌ Skipped: {name} (manual skip)")
-                    matches_by_name[name] = None
-
-        for row in data:
-            name = row.get('Bill Payer', '')
-            if not matches_by_name.get(name):
-                report.append([name, "N/A", row.get('Amount', '0'), "FAILED", "Skipped"])
-                continue
-
-            matched_name = matches_by_name[name]
-            date = row.get('Date', '')
-            note = row.get('Note', '')
-            returned = row.get('Is Returned', '').lower() == 'yes'
-            amount_str = row.get('Amount', '0')
-            amount = float(amount_str) if amount_str else 0.0
-            tx_amount = 0.01 if amount == 0 else amount
-
-            if matched_name not in accounts:
-                if not create_account(driver, wait, matched_name, branch_value):
-                    report.append([matched_name, "Account", amount, "FAILED", "Account creation failed"])
-                    continue
-                account_id = get_account_id(driver)
-                accounts[matched_name] = account_id
-            else:
-                account_id = accounts[matched_name]
-
-            status = "OK"
-            if not make_transaction(driver, wait, account_id, "deposit", tx_amount, note, date):
-                status = "FAILED"
-                report.append([matched_name, "Deposit", tx_amount, status, "Error during deposit"])
-                continue
-            report.append([matched_name, "Deposit", tx_amount, "OK", ""])
-
-            if returned or amount == 0:
-                if not make_transaction(driver, wait, account_id, "withdrawal", tx_amount, note, date):
-                    report.append([matched_name, "Withdrawal", tx_amount, "FAILED", "Error during withdrawal"])
-                else:
-                    report.append([matched_name, "Withdrawal", tx_amount, "OK", ""])
-
-        with open(REPORT_FILE, 'w', newline='', encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["Bill Payer", "Type", "Amount", "Status", "Notes"])
-            writer.writerows(report)
+        plan = load_plan(args.plan) if args.plan else None
+        if plan is None and planning:
+            plan = make_plan(args, source, journal, email, password, open_driver)
+            save_plan(plan, args.plan_out or PLAN_FILE)
+            print(plan_summary(plan))
+            log_debug(f"🗺️ Plan saved to {args.plan_out or PLAN_FILE}", estimate=plan["estimate"]["wall_seconds"])
+            if args.dry_run:
+                return
+
+        open_driver()
+        if plan:
+            run_plan(args, plan, driver, wait, journal, start_session)
+        elif multi:
+            run_branches(args, source, driver, wait, journal, start_session)
+        else:
+            run_branch(args, source, driver, wait, journal, start_session)
         print(f"✅ Done. Report saved to {REPORT_FILE}")
         print(f"📝 Debug log saved to {LOG_FILE}")
+        print(f"📓 Journal saved to {journal.path}")
+        from waits import wait_report
+        log_debug(wait_report())
+        log_debug(pool.report())
+        log_debug(controller.report())
 
     finally:
-        driver.quit()
+        journal.close()
+        dead_letter.close()
+        if dead_letter.count:
+            print(f"☠️ {dead_letter.count} rows still failing saved to {dead_letter.path}")
+        if pool:
+            driver.quit()
+            pool.close()
+        log_debug(metrics_summary())
+        for path in export_metrics():
+            print(f"📈 Metrics saved to {path}")
+        logger.close()
+        if terminal:
+            terminal.close()
+
+def main():
+    args = parse_args()
+    if args.profile:
+        try:
+            run_profiled(lambda: run(args), PROFILE_FILE)
+        finally:
+            print(f"🔬 Profile saved to {PROFILE_FILE}")
+    else:
+        run(args)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,178 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from metrics import instrument_driver, observe
+
+# === CONFIG ===
+# CHILDPATHS_HEADLESS=0 brings the browser window back for debugging
+HEADLESS = os.getenv("CHILDPATHS_HEADLESS", "1") != "0"
+POOL_SIZE = 2
+# Nothing the scripts read lives in these; stylesheets stay, select2 needs them
+BLOCKED_URLS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*google-analytics.com*", "*googletagmanager.com*", "*hotjar.com*", "*facebook.net*", "*doubleclick.net*",
+]
+
+
+def chrome_options(headless=HEADLESS):
+    options = Options()
+    options.add_argument("--window-size=1920,1080")
+    if headless:
+        options.add_argument("--headless=new")
+    for arg in ["--disable-extensions", "--disable-gpu", "--no-first-run", "--mute-audio",
+                "--disable-background-networking", "--disable-component-update", "--disable-sync"]:
+        options.add_argument(arg)
+    # Hand control back once the DOM is parsed instead of after every subresource
+    options.page_load_strategy = "eager"
+    return options
+
+
+def tree_rss_bytes(root):
+    # Resident memory of a process and all its descendants (Chrome included)
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+    total, stack = 0, [root]
+    page = os.sysconf("SC_PAGE_SIZE")
+    while stack:
+        pid = stack.pop()
+        try:
+            with open(f"/proc/{pid}/statm") as f:
+                total += int(f.read().split()[1]) * page
+        except (OSError, IndexError, ValueError):
+            pass
+        stack.extend(children.get(pid, []))
+    return total
+
+
+def driver_rss_mb(driver):
+    # chromedriver plus the browser processes it spawned; None off Linux
+    if not os.path.isdir("/proc"):
+        return None
+    return tree_rss_bytes(driver.service.process.pid) / (1024 * 1024)
+
+
+def new_driver(headless=HEADLESS, block=True):
+    started = time.monotonic()
+    driver = instrument_driver(webdriver.Chrome(options=chrome_options(headless)))
+    if block:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URLS})
+    driver.startup_seconds = time.monotonic() - started
+    observe("driver_start", driver.startup_seconds, started=started)
+    driver.rss_mb = driver_rss_mb(driver)
+    return driver
+
+
+class DriverPool:
+    """Chrome drivers started ahead of time and handed out on demand.
+
+    size drivers start in the background as soon as the pool is created;
+    get() returns the oldest one, waiting for it to finish starting if
+    needed, and starts a fresh driver only once the warm ones are used up.
+    With refill=True every get() queues a replacement, so a long-lived
+    pool always has warm drivers for the next run. With limit set, at most
+    limit drivers are handed out at once: get() blocks (or raises
+    TimeoutError after timeout seconds) until someone calls release().
+    """
+
+    def __init__(self, size=POOL_SIZE, headless=HEADLESS, block=True, refill=False, log=print, limit=None):
+        self.size = max(1, size)
+        self.headless = headless
+        self.block = block
+        self.refill = refill
+        self.log = log
+        self.limit = limit
+        self.slots = threading.BoundedSemaphore(limit) if limit else None
+        self.in_use = 0
+        self.stats = []
+        self.lock = threading.Lock()
+        self.starter = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="driver-start")
+        self.warm = deque(self.starter.submit(self._start) for _ in range(self.size))
+
+    def _start(self):
+        driver = new_driver(self.headless, self.block)
+        with self.lock:
+            self.stats.append({"startup": driver.startup_seconds, "rss_mb": driver.rss_mb})
+        return driver
+
+    def get(self, timeout=None):
+        if self.slots and not self.slots.acquire(timeout=timeout):
+            raise TimeoutError(f"All {self.limit} browsers are busy")
+        try:
+            with self.lock:
+                future = self.warm.popleft() if self.warm else None
+                if self.refill:
+                    self.warm.append(self.starter.submit(self._start))
+            driver = future.result() if future else self._start()
+        except BaseException:
+            if self.slots:
+                self.slots.release()
+            raise
+        with self.lock:
+            self.in_use += 1
+        return driver
+
+    def release(self, driver):
+        # Back into the pool if it is still alive and there is room
+        try:
+            self._keep_or_quit(driver)
+        finally:
+            with self.lock:
+                self.in_use = max(0, self.in_use - 1)
+            if self.slots:
+                self.slots.release()
+
+    def _keep_or_quit(self, driver):
+        try:
+            driver.current_url
+        except WebDriverException:
+            return
+        with self.lock:
+            if len(self.warm) < self.size:
+                future = Future()
+                future.set_result(driver)
+                self.warm.appendleft(future)
+                return
+        driver.quit()
+
+    def report(self):
+        with self.lock:
+            stats = list(self.stats)
+        if not stats:
+            return "🚗 No drivers started"
+        startup = sum(s["startup"] for s in stats) / len(stats)
+        rss = [s["rss_mb"] for s in stats if s["rss_mb"] is not None]
+        line = f"🚗 {len(stats)} drivers started, avg startup {startup:.2f}s"
+        if rss:
+            line += f", avg RSS {sum(rss) / len(rss):.0f} MB (max {max(rss):.0f} MB)"
+        return line
+
+    def close(self):
+        with self.lock:
+            warm, self.warm = list(self.warm), deque()
+        self.starter.shutdown(wait=True)
+        for future in warm:
+            try:
+                future.result().quit()
+            except Exception:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
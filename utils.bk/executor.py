@@ -0,0 +1,90 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# create_account + get_account_id must not interleave across sessions: when
+# the owner column does not identify the new account, the lookup falls back
+# to the single row that appeared since the last index refresh.
+ACCOUNT_LOCK = threading.Lock()
+
+
+def group_by_billpayer(jobs):
+    # jobs: (seq, matched_name, row) in CSV order -> one list per billpayer,
+    # ordered by first appearance, rows kept in their original order
+    groups = {}
+    for job in jobs:
+        groups.setdefault(job[1], []).append(job)
+    return list(groups.values())
+
+
+def shard_by_billpayer(jobs, workers):
+    # Every billpayer lands in exactly one shard, with its rows kept in
+    # their original order.
+    groups = group_by_billpayer(jobs)
+    shards = [[] for _ in range(max(1, workers))]
+    loads = [0] * len(shards)
+    for group in sorted(groups, key=len, reverse=True):
+        i = loads.index(min(loads))
+        shards[i].extend(group)
+        loads[i] += len(group)
+    for shard in shards:
+        shard.sort(key=lambda job: job[0])
+    return [shard for shard in shards if shard]
+
+
+class ShardedExecutor:
+    """Runs jobs across a fixed set of logged-in sessions.
+
+    start_session() -> logged-in transport; one is opened per worker slot on
+    first use and kept until close(), so successive windows of a streamed
+    file reuse the same browsers.
+    process_row(transport, accounts, seq, matched_name, row) -> report rows,
+    or with grouped=True process_row(transport, accounts, jobs) -> {seq:
+    report rows} once per billpayer of the shard.
+    """
+
+    def __init__(self, workers, start_session, process_row, initializer=None, grouped=False):
+        self.workers = max(1, workers)
+        self.start_session = start_session
+        self.process_row = process_row
+        self.grouped = grouped
+        self.sessions = [None] * self.workers
+        self.accounts = [{} for _ in range(self.workers)]
+        self.pool = ThreadPoolExecutor(max_workers=self.workers, initializer=initializer)
+
+    def run_shard(self, slot, shard):
+        if self.sessions[slot] is None:
+            self.sessions[slot] = self.start_session()
+        transport = self.sessions[slot]
+        if self.grouped:
+            results = {}
+            for group in group_by_billpayer(shard):
+                results.update(self.process_row(transport, self.accounts[slot], group))
+            return results
+        return {seq: self.process_row(transport, self.accounts[slot], seq, matched_name, row)
+                for seq, matched_name, row in shard}
+
+    def run(self, jobs):
+        # Returns {seq: report rows} so callers can merge back into CSV order
+        shards = shard_by_billpayer(jobs, self.workers)
+        futures = [self.pool.submit(self.run_shard, slot, shard) for slot, shard in enumerate(shards)]
+        results = {}
+        for future in futures:
+            results.update(future.result())
+        return results
+
+    def close(self):
+        self.pool.shutdown()
+        for transport in self.sessions:
+            if transport is not None:
+                transport.quit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def run_sharded(jobs, workers, start_session, process_row, initializer=None, grouped=False):
+    with ShardedExecutor(workers, start_session, process_row, initializer, grouped) as executor:
+        return executor.run(jobs)
@@ -0,0 +1,133 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import Select
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+from config import BASE_URL
+from metrics import count
+from retries import UncertainPost, classify, form_failure
+from waits import submit_and_wait, text_key, wait_select2_highlighted, wait_select2_open, wait_select2_selected
+
+# The ChildPaths forms filled in through the browser. Both return True, or
+# a StepFailure saying why not, as SeleniumTransport expects.
+
+# Selects the owner option with the given billpayer id on the select2
+# widget's underlying <select> and fires change so the widget renders it.
+# An option under another name is left alone. Returns null when the form
+# has no such option.
+SELECT_OWNER_JS = """
+function key(text) { return (text || '').toLowerCase().split(/\\s+/).filter(Boolean).join(' '); }
+var ownerId = String(arguments[0]);
+var select = document.querySelector('form select[multiple]');
+if (!select) return null;
+var option = Array.prototype.find.call(select.options, function (o) { return o.value === ownerId; });
+if (!option) return null;
+if (key(option.text) !== key(arguments[1])) return {selected: [], text: option.text.trim()};
+Array.prototype.forEach.call(select.options, function (o) { o.selected = o === option; });
+if (window.jQuery) {
+    window.jQuery(select).trigger('change');
+} else {
+    select.dispatchEvent(new Event('change', {bubbles: true}));
+}
+return {selected: Array.prototype.map.call(select.selectedOptions, function (o) { return o.value; }),
+        text: option.text.trim()};
+"""
+
+
+def form_errors(driver):
+    return [e.text for e in driver.find_elements(By.CSS_SELECTOR, ".alert-danger li, .alert-warning li")]
+
+
+def select_owner_by_id(driver, owner_name, owner_id, log=print):
+    # One script call instead of typing into select2. Only trusted when
+    # exactly that option ended up selected.
+    result = driver.execute_script(SELECT_OWNER_JS, str(owner_id), owner_name)
+    if result is None:
+        return False
+    if result["selected"] == [str(owner_id)]:
+        return True
+    log(f"⚠️ Owner option {owner_id} ({result['text']!r}) could not be selected for {owner_name!r}; "
+        "typing the name instead")
+    return False
+
+
+def type_owner(driver, owner_name):
+    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
+    wait_select2_open(driver)
+    driver.switch_to.active_element.send_keys(owner_name)
+    wait_select2_highlighted(driver, owner_name, required=True)
+    # A longer name containing this one can come first in the results
+    exact = [o for o in driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
+             if text_key(o.text) == text_key(owner_name)]
+    if len(exact) == 1 and "select2-results__option--highlighted" not in (exact[0].get_attribute("class") or ""):
+        exact[0].click()
+    else:
+        driver.switch_to.active_element.send_keys(Keys.ENTER)
+    wait_select2_selected(driver, required=True)
+    chosen = [c.get_attribute("title") or c.text.lstrip("×").strip()
+              for c in driver.find_elements(By.CSS_SELECTOR, ".select2-selection__choice")]
+    if [text_key(c) for c in chosen] != [text_key(owner_name)]:
+        raise RuntimeError(f"Owner field holds {chosen!r} instead of {owner_name!r}; not submitting")
+
+
+def create_account(driver, wait, owner_name, branch_value, owner_id=None, log=print):
+    try:
+        driver.get(f"{BASE_URL}/user-finance-account/create")
+        Select(driver.find_element(By.NAME, "branch")).select_by_value(branch_value)
+        driver.find_element(By.ID, "display_name").send_keys("Deposit Account")
+        Select(driver.find_element(By.NAME, "currency")).select_by_value("EUR")
+        try:
+            switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
+            if "bootstrap-switch-on" in switch_wrapper.get_attribute("class"):
+                switch_wrapper.click()
+        except NoSuchElementException:
+            pass
+
+        # Typing is left for billpayers whose id is unknown or stale
+        if owner_id is not None and select_owner_by_id(driver, owner_name, owner_id, log):
+            count("owner_selected", by="id")
+        else:
+            type_owner(driver, owner_name)
+            count("owner_selected", by="name")
+
+        submit_and_wait(driver, driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Create"]'))
+    except Exception as e:
+        failure = classify(e)
+        log(f"❌ Account creation failed for {owner_name}: {failure.error}")
+        return failure
+
+    errors = form_errors(driver)
+    if errors:
+        for e in errors:
+            log("❌ Form error: " + e)
+        return form_failure(errors)
+    log(f"✅ Account created for {owner_name}")
+    return True
+
+
+def make_transaction(driver, wait, account_id, tx_type, amount, note, date, log=print):
+    try:
+        url = f"{BASE_URL}/user-finance-account/{account_id}/transaction/{tx_type}"
+        driver.get(url)
+        wait.until(EC.presence_of_element_located((By.NAME, "value")))
+        driver.find_element(By.NAME, "value").send_keys(str(amount))
+        if note:
+            driver.find_element(By.NAME, "description").send_keys(note)
+        if date:
+            driver.find_element(By.NAME, "received_at").send_keys(date)
+        button = driver.find_element(By.CSS_SELECTOR, 'input[type="submit"][value="Add"]')
+        try:
+            submit_and_wait(driver, button)
+        except TimeoutException as e:
+            raise UncertainPost(f"{tx_type.capitalize()} page did not come back after submit") from e
+    except Exception as e:
+        failure = classify(e)
+        log(f"❌ {tx_type.capitalize()} failed for €{amount}: {failure.error}")
+        return failure
+
+    errors = form_errors(driver)
+    if errors:
+        log(f"❌ {tx_type.capitalize()} failed for €{amount}: {'; '.join(errors)}")
+        return form_failure(errors)
+    log(f"✅ {tx_type.capitalize()} successful for €{amount}")
+    return True
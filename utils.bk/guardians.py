@@ -0,0 +1,109 @@
+from selenium.webdriver.common.by import By
+from config import BASE_URL
+from executor import ShardedExecutor
+from throttle import controller
+from waits import submit_and_wait, wait_element, wait_sweetalert
+
+# === CONFIG ===
+REPORT_FILE = "guardian_toggle_report.csv"
+REPORT_HEADER = ["Guardian ID", "Name", "Before", "Target", "Status", "Notes"]
+STATE_CONCURRENCY = 16  # most parallel fetches inside the browser, whatever the throttle allows
+STATE_TIMEOUT = 600  # seconds for one wave of the state pass
+GUARDIAN_REQUESTS = 2  # edit page and its post
+
+# Reads the server-rendered #enabled checkbox of the given guardians' edit
+# pages with fetch() from the logged-in page: one WebDriver round trip per
+# wave instead of one page load per guardian. Unreadable pages map to null
+# so the toggle pass checks them on the page itself.
+STATES_JS = """
+var ids = arguments[0], base = arguments[1], concurrency = arguments[2];
+var done = arguments[arguments.length - 1];
+var states = {}, next = 0;
+function worker() {
+    if (next >= ids.length) return Promise.resolve();
+    var id = ids[next++];
+    return fetch(base + '/guardian/' + id + '/edit', {credentials: 'same-origin'})
+        .then(function (r) { return r.ok ? r.text() : null; })
+        .then(function (html) {
+            var box = html && new DOMParser().parseFromString(html, 'text/html').getElementById('enabled');
+            states[id] = box ? box.hasAttribute('checked') : null;
+        }, function () { states[id] = null; })
+        .then(worker);
+}
+var workers = [];
+for (var i = 0; i < Math.min(concurrency, ids.length); i++) workers.push(worker());
+Promise.all(workers).then(function () { done(states); });
+"""
+
+
+def state_label(enabled):
+    return {True: "ENABLED", False: "DISABLED"}.get(enabled, "UNKNOWN")
+
+
+def fetch_guardian_states(driver, guardian_ids, concurrency=STATE_CONCURRENCY, throttle=controller):
+    # {guardian id: True / False / None}. The fetches go out in waves no
+    # wider than the throttle's current limit, and every wave pays one
+    # request per guardian into its rate ceiling, so the state pass backs
+    # off along with every other session.
+    ids = list(guardian_ids)
+    states = {}
+    if ids:
+        driver.set_script_timeout(STATE_TIMEOUT)
+    while ids:
+        width = max(1, min(concurrency, int(throttle.limit)))
+        wave, ids = ids[:width], ids[width:]
+        with throttle.operation(len(wave)) as op:
+            result = driver.execute_async_script(STATES_JS, wave, BASE_URL, width)
+            op["failed"] = any(state is None for state in result.values())
+        states.update(result)
+    return states
+
+
+def plan_toggles(billpayers, states, enable):
+    # Guardians already in the target state are left alone; unknown ones are
+    # planned and re-checked when their page is opened.
+    changes, unchanged = [], []
+    for bp in billpayers:
+        (unchanged if states.get(bp["id"]) is enable else changes).append(bp)
+    return changes, unchanged
+
+
+def set_guardian_enabled(driver, guardian_id, enable):
+    # Returns True when the switch was flipped and saved, False when the
+    # guardian was already in the target state.
+    with controller.operation(GUARDIAN_REQUESTS):
+        driver.get(f"{BASE_URL}/guardian/{guardian_id}/edit")
+        wait_element(driver, (By.ID, "enabled"), "guardian_edit")
+        switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
+        if ("bootstrap-switch-on" in switch_wrapper.get_attribute("class")) == enable:
+            return False
+        switch_wrapper.click()
+        # Disabling always asks for confirmation; enabling may not
+        confirm_btn = wait_sweetalert(driver, timeout=1 if enable else None, required=not enable)
+        if confirm_btn:
+            confirm_btn.click()
+        submit_and_wait(driver, driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]'))
+        return True
+
+
+def toggle_row(driver, bp, before, enable, log=print):
+    target = state_label(enable)
+    try:
+        changed = set_guardian_enabled(driver, bp["id"], enable)
+    except Exception as e:
+        log(f"❌ {bp['name']}: could not set {target}: {e}")
+        return [bp["id"], bp["name"], state_label(before), target, "FAILED", str(e).splitlines()[0] if str(e) else ""]
+    log(f"{'💾' if changed else '✔️'} {bp['name']}: {target}{'' if changed else ' (already)'}")
+    return [bp["id"], bp["name"], state_label(before), target, "OK" if changed else "UNCHANGED", ""]
+
+
+def toggle_guardians(changes, states, enable, driver, workers=1, start_session=None, log=print):
+    # Report rows in plan order. With workers > 1 every guardian goes to one
+    # of the parallel sessions; start_session() -> logged-in driver.
+    if workers > 1 and start_session:
+        jobs = [(seq, bp["id"], bp) for seq, bp in enumerate(changes)]
+        with ShardedExecutor(workers, start_session,
+                             lambda d, a, seq, gid, bp: toggle_row(d, bp, states.get(gid), enable, log)) as executor:
+            results = executor.run(jobs)
+        return [results[seq] for seq in range(len(changes))]
+    return [toggle_row(driver, bp, states.get(bp["id"]), enable, log) for bp in changes]
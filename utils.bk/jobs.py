@@ -0,0 +1,239 @@
+import itertools
+import json
+import os
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from metrics import observe
+
+# === CONFIG ===
+LOG_LINES = 200
+MEASURE_INTERVAL = 2.0  # seconds between memory samples of running jobs
+WAIT_HISTORY = 200
+
+
+class Job:
+    """One queued run. The worker reports events; the page polls.
+
+    Only the worker thread calls log/start/advance/skip. Each event is
+    folded into the job's fields as it arrives, so nothing piles up while
+    no page is polling and the log keeps only its last LOG_LINES lines.
+    The lock is held just long enough to apply one event.
+    """
+
+    def __init__(self, job_id, name, fn, params, user="", cost=1):
+        self.id = job_id
+        self.name = name
+        self.fn = fn
+        self.params = params
+        self.user = user
+        self.cost = cost
+        self.drivers = []
+        self.lock = threading.Lock()
+        self.status = "queued"
+        self.lines = deque(maxlen=LOG_LINES)
+        self.total = 0
+        self.done = 0
+        self.counts = {"OK": 0, "FAILED": 0, "SKIPPED": 0}
+        self.result = None
+        self.error = None
+        self.rss_mb = None
+        self.peak_rss_mb = None
+        self.queued_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    # --- worker side ---
+    def log(self, msg):
+        self.report("log", msg)
+
+    def start(self, total):
+        self.report("total", total)
+
+    def advance(self, status="OK"):
+        self.report("row", status)
+
+    def skip(self, n=1):
+        self.report("skip", n)
+
+    def track(self, driver):
+        # Browsers this job holds, for memory accounting
+        self.drivers.append(driver)
+
+    def report(self, kind, value):
+        with self.lock:
+            if kind == "log":
+                self.lines.append(value)
+            elif kind == "total":
+                self.total = value
+            elif kind == "row":
+                self.done += 1
+                self.counts[value] = self.counts.get(value, 0) + 1
+            elif kind == "skip":
+                self.counts["SKIPPED"] += value
+            elif kind == "state":
+                self.status, stamp = value
+                if self.status == "running":
+                    self.started_at = stamp
+                else:
+                    self.finished_at = stamp
+            elif kind == "result":
+                self.result = value
+            elif kind == "error":
+                self.error = value
+            elif kind == "rss":
+                self.rss_mb = value
+                self.peak_rss_mb = max(self.peak_rss_mb or 0.0, value)
+
+    # --- page side ---
+    def poll(self):
+        # Events are applied as they come; kept so pages read one snapshot API
+        return self
+
+    @property
+    def fraction(self):
+        return self.done / self.total if self.total else 0.0
+
+    @property
+    def waited(self):
+        return (self.started_at or time.time()) - self.queued_at
+
+    @property
+    def elapsed(self):
+        if not self.started_at:
+            return 0.0
+        return (self.finished_at or time.time()) - self.started_at
+
+    @property
+    def finished(self):
+        return self.status in ("done", "failed")
+
+
+class JobRunner:
+    """Runs submitted jobs on background threads within a browser budget.
+
+    fn(job, **params) runs on a worker thread and reports through job;
+    whatever it returns ends up in job.result, an exception in job.error.
+    Each job declares cost, the browsers it will hold, and starts only
+    once that many of the slots are free. Users take turns: every user
+    has their own queue and the dispatcher serves them round-robin, so
+    one person queueing ten files does not hold everyone else up.
+    measure(job) -> MB, when given, samples each running job's memory.
+    """
+
+    def __init__(self, slots=1, measure=None, stats_file=None, interval=MEASURE_INTERVAL):
+        self.slots = max(1, slots)
+        self.free = self.slots
+        self.measure = measure
+        self.stats_file = stats_file
+        self.interval = interval
+        self.queues = OrderedDict()
+        self.jobs = {}
+        self.running = {}
+        self.waits = deque(maxlen=WAIT_HISTORY)
+        self.cond = threading.Condition()
+        self.ids = itertools.count(1)
+        self.pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="job-runner")
+        threading.Thread(target=self._dispatch, name="job-dispatch", daemon=True).start()
+        if measure or stats_file:
+            threading.Thread(target=self._monitor, name="job-monitor", daemon=True).start()
+
+    def submit(self, name, fn, user="", cost=1, **params):
+        with self.cond:
+            job = Job(next(self.ids), name, fn, params, user, min(max(1, cost), self.slots))
+            self.jobs[job.id] = job
+            self.queues.setdefault(user, deque()).append(job)
+            self.cond.notify_all()
+        return job
+
+    def get(self, job_id):
+        with self.cond:
+            job = self.jobs.get(job_id)
+        return job.poll() if job else None
+
+    def pending(self):
+        with self.cond:
+            return sum(len(q) for q in self.queues.values())
+
+    def stats(self):
+        with self.cond:
+            waits = list(self.waits)
+            queued = {user: len(q) for user, q in self.queues.items() if q}
+            now = time.time()
+            oldest = max((now - q[0].queued_at for q in self.queues.values() if q), default=0.0)
+            running = len(self.running)
+            free = self.free
+        return {
+            "slots": self.slots,
+            "in_use": self.slots - free,
+            "running": running,
+            "queued": sum(queued.values()),
+            "queued_by_user": queued,
+            "oldest_wait": oldest,
+            "mean_wait": sum(waits) / len(waits) if waits else 0.0,
+            "max_wait": max(waits, default=0.0),
+            "started": len(waits),
+        }
+
+    def _next(self):
+        # The user whose turn it is waits until their job fits; skipping
+        # ahead to smaller jobs would starve the big ones.
+        for user, q in self.queues.items():
+            if q:
+                if q[0].cost > self.free:
+                    return None
+                self.queues.move_to_end(user)
+                return q.popleft()
+        return None
+
+    def _dispatch(self):
+        while True:
+            with self.cond:
+                job = self._next()
+                while job is None:
+                    self.cond.wait()
+                    job = self._next()
+                self.free -= job.cost
+                self.running[job.id] = job
+                wait = time.time() - job.queued_at
+                self.waits.append(wait)
+            observe("job_wait", wait, user=job.user)
+            self.pool.submit(self._run, job)
+
+    def _run(self, job):
+        job.report("state", ("running", time.time()))
+        started = time.monotonic()
+        ok = False
+        try:
+            job.report("result", job.fn(job, **job.params))
+            job.report("state", ("done", time.time()))
+            ok = True
+        except Exception as e:
+            job.log(traceback.format_exc())
+            job.report("error", f"{type(e).__name__}: {e}")
+            job.report("state", ("failed", time.time()))
+        finally:
+            observe("job_run", time.monotonic() - started, ok, user=job.user)
+            with self.cond:
+                self.free += job.cost
+                self.running.pop(job.id, None)
+                self.cond.notify_all()
+
+    def _monitor(self):
+        while True:
+            time.sleep(self.interval)
+            if self.measure:
+                with self.cond:
+                    running = list(self.running.values())
+                for job in running:
+                    try:
+                        job.report("rss", self.measure(job))
+                    except Exception:
+                        pass
+            if self.stats_file:
+                tmp = f"{self.stats_file}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(dict(self.stats(), ts=time.time()), f, indent=1)
+                os.replace(tmp, self.stats_file)
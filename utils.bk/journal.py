@@ -0,0 +1,137 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+# === CONFIG ===
+JOURNAL_FILE = "transaction_journal.jsonl"
+UNCERTAIN = "UNCERTAIN"  # the post may or may not have landed
+KEY_FIELDS = ["Bill Payer", "Amount", "Date", "Note", "Is Returned"]
+
+
+class UncheckedSteps(RuntimeError):
+    """A fresh run would overwrite a journal that still has steps to check."""
+
+    def __init__(self, path, count):
+        super().__init__(f"{path} has {count} step(s) that may have posted and were never checked")
+        self.path = path
+        self.count = count
+
+
+def row_key(seq, row):
+    # Position plus content, so an edited CSV never matches old steps
+    content = "\x1f".join(row.get(field, "") for field in KEY_FIELDS)
+    return f"{seq}-{hashlib.sha1(content.encode('utf-8')).hexdigest()[:12]}"
+
+
+class Journal:
+    """Append-only, fsync'd JSONL record of every planned step and its outcome.
+
+    Replaying the file on open gives the finished steps and the accounts
+    created so far, so a resumed run skips them without touching the server.
+    Steps that were in flight when the run stopped, or finished UNCERTAIN,
+    are not posted again until someone has checked them (needs_check).
+    """
+
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = {}
+        self.in_flight = {}
+        self.accounts = {}
+        self.matches = {}
+        if resume:
+            self.replay()
+        elif path and os.path.exists(path):
+            # Starting afresh truncates the file, which may be the only
+            # record of posts that half-happened
+            self.replay(truncate=False)
+            pending = self.unchecked()
+            if pending:
+                raise UncheckedSteps(path, len(pending))
+            self.done, self.in_flight, self.accounts, self.matches = {}, {}, {}, {}
+        # path=None keeps everything in memory (dry runs)
+        self.file = open(path, "a" if resume else "w", encoding="utf-8") if path else None
+
+    @classmethod
+    def read(cls, path):
+        # A journal's recorded state, for tools that only look at it
+        journal = cls(None)
+        journal.path = path
+        journal.replay(truncate=False)
+        return journal
+
+    def replay(self, truncate=True):
+        good = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                if not line.endswith(b"\n"):
+                    break
+                good += len(line)
+                if entry["event"] == "planned":
+                    # A step planned again supersedes its earlier outcome
+                    self.in_flight[entry["key"]] = entry
+                    self.done.pop(entry["key"], None)
+                elif entry["event"] == "finished":
+                    self.done[entry["key"]] = entry["status"]
+                elif entry["event"] == "account":
+                    self.accounts[(entry.get("branch"), entry["billpayer"])] = entry["account_id"]
+                elif entry["event"] == "match":
+                    self.matches[entry["name"]] = entry["billpayer"]
+        # Drop a torn final line from a crash so new entries start cleanly
+        if truncate:
+            os.truncate(self.path, good)
+
+    def append(self, entry):
+        if self.file is None:
+            return
+        entry["at"] = datetime.now().isoformat(timespec="seconds")
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            os.fsync(self.file.fileno())
+
+    def planned(self, key, step, **info):
+        self.append({"event": "planned", "key": key, "step": step, **info})
+
+    def finished(self, key, status):
+        self.done[key] = status
+        self.append({"event": "finished", "key": key, "status": status})
+
+    def is_done(self, key):
+        return self.done.get(key) == "OK"
+
+    def was_in_flight(self, key):
+        # Planned but never finished: the post may or may not have landed
+        return key in self.in_flight and key not in self.done
+
+    def needs_check(self, key):
+        return self.was_in_flight(key) or self.done.get(key) == UNCERTAIN
+
+    def unchecked(self):
+        # -> the planned entries (step, billpayer, account_id, amount) of
+        # every step that needs checking, in journal order
+        return [entry for key, entry in self.in_flight.items() if self.needs_check(key)]
+
+    def record_account(self, billpayer, account_id, branch=None):
+        # Keyed by branch too: namesakes in two branches have two accounts
+        self.accounts[(branch, billpayer)] = account_id
+        self.append({"event": "account", "billpayer": billpayer, "account_id": account_id, "branch": branch})
+
+    def account_for(self, billpayer, branch=None):
+        return self.accounts.get((branch, billpayer))
+
+    def record_match(self, name, billpayer):
+        # Fuzzy decisions (including skips, as None) so a resume never re-prompts
+        self.matches[name] = billpayer
+        self.append({"event": "match", "name": name, "billpayer": billpayer})
+
+    def close(self):
+        if self.file:
+            self.file.close()
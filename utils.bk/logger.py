@@ -0,0 +1,69 @@
+import json
+import os
+import queue
+import threading
+from datetime import datetime
+
+# === CONFIG ===
+QUEUE_SIZE = 10000
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+_STOP = object()
+
+
+class RunLogger:
+    """JSON Lines logger with a background writer thread.
+
+    Callers only enqueue; the writer drains whatever is queued, writes it in
+    one go and flushes when the queue runs dry. The queue is bounded, so a
+    stalled disk slows callers down instead of growing memory. Files rotate
+    to path.1 .. path.N once they pass max_bytes.
+    """
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS, queue_size=QUEUE_SIZE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.file = open(path, "a", encoding="utf-8")
+        self.thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self.thread.start()
+
+    def log(self, msg, level="info", **fields):
+        entry = {"ts": datetime.now().isoformat(timespec="milliseconds"), "level": level, "msg": msg}
+        entry.update((k, v) for k, v in fields.items() if v is not None)
+        self.queue.put(entry)
+
+    def step(self, step, status, duration, row=None, **fields):
+        self.log(f"{step} {status}", step=step, status=status, duration=round(duration, 3), row=row, **fields)
+
+    def _run(self):
+        while True:
+            entries = [self.queue.get()]
+            while True:
+                try:
+                    entries.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(entry is _STOP for entry in entries)
+            lines = "".join(json.dumps(entry, ensure_ascii=False, default=str) + "\n"
+                            for entry in entries if entry is not _STOP)
+            self.file.write(lines)
+            self.file.flush()
+            if self.file.tell() >= self.max_bytes:
+                self._rotate()
+            if stop:
+                return
+
+    def _rotate(self):
+        self.file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        os.replace(self.path, f"{self.path}.1")
+        self.file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self.queue.put(_STOP)
+        self.thread.join()
+        self.file.close()
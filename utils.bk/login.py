@@ -0,0 +1,29 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from config import BASE_URL
+from sessions import SessionStore
+
+# === CONFIG ===
+WAIT_SECONDS = 10
+
+
+def login(driver, wait, email, password, log=print):
+    store = SessionStore(email, password)
+    if store.restore_driver(driver):
+        log("✅ Session restored")
+        return
+    driver.get(f"{BASE_URL}/auth/login")
+    wait.until(EC.presence_of_element_located((By.ID, "email"))).send_keys(email)
+    driver.find_element(By.ID, "password").send_keys(password)
+    driver.find_element(By.CSS_SELECTOR, "#signin-form button").click()
+    wait.until(EC.url_contains("/dashboard"))
+    store.save_driver(driver)
+    log("✅ Logged in")
+
+
+def signed_in(driver, email, password, log=print):
+    # -> the driver's WebDriverWait, once the session is logged in
+    wait = WebDriverWait(driver, WAIT_SECONDS)
+    login(driver, wait, email, password, log)
+    return wait
@@ -0,0 +1,119 @@
+import heapq
+import os
+import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+
+# === CONFIG ===
+NGRAM = 3
+CANDIDATES = 50          # exact-scored candidates per name after blocking
+THRESHOLDS = (0.6, 0.95) # the scripts' skip and auto-accept cut-offs
+MARGIN = 0.05            # blocked best scores this close to a threshold get a full scan
+POOL_THRESHOLD = 2000    # unique names before match_many uses a process pool
+
+
+def normalize(name):
+    name = re.sub(r"[^\w\s]", " ", name.lower())
+    return " ".join(name.split())
+
+
+def ngrams(text, n=NGRAM):
+    padded = f" {text} "
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def near_threshold(score, margin=MARGIN):
+    return any(abs(score - threshold) < margin for threshold in THRESHOLDS)
+
+
+class BillpayerMatcher:
+    """Fuzzy matcher built once from the extract_billpayers output.
+
+    Scores are the same SequenceMatcher ratios the scripts used before, so the
+    0.6 / 0.95 thresholds still apply. A character n-gram index narrows each
+    lookup to the billpayers with the highest n-gram Dice overlap (shared
+    n-grams over both names' n-gram counts, so long names are not favoured)
+    before any exact scoring is done. When the best blocked score lands near
+    a threshold, every billpayer is scored, so blocking never moves a name
+    across the skip / prompt / auto-accept line.
+    """
+
+    def __init__(self, billpayers, candidates=CANDIDATES):
+        self.billpayers = [(name, bp_id) for name, bp_id in billpayers if name.strip()]
+        self.candidates = candidates
+        self.index = {}
+        self.sizes = []
+        self.scorers = []
+        for i, (name, _) in enumerate(self.billpayers):
+            grams = ngrams(normalize(name))
+            self.sizes.append(len(grams))
+            for gram in grams:
+                self.index.setdefault(gram, []).append(i)
+            # SequenceMatcher caches its analysis of seq2, so each billpayer
+            # is prepared once and only the CSV name changes per lookup.
+            scorer = SequenceMatcher(None)
+            scorer.set_seq2(name.lower())
+            self.scorers.append(scorer)
+
+    def __len__(self):
+        return len(self.billpayers)
+
+    def block(self, name):
+        grams = ngrams(normalize(name))
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.index.get(gram, ()))
+        if not hits or len(self.billpayers) <= self.candidates:
+            return range(len(self.billpayers))
+        dice = {i: 2 * n / (len(grams) + self.sizes[i]) for i, n in hits.items()}
+        return heapq.nlargest(self.candidates, dice, key=dice.get)
+
+    def score(self, query, indexes):
+        scores = []
+        for i in indexes:
+            scorer = self.scorers[i]
+            scorer.set_seq1(query)
+            scores.append((scorer.ratio(), *self.billpayers[i]))
+        return scores
+
+    def match(self, name, limit=None):
+        query = name.lower()
+        candidates = self.block(name)
+        scores = self.score(query, candidates)
+        if len(scores) < len(self.billpayers) and near_threshold(max((s[0] for s in scores), default=0)):
+            scores = self.score(query, range(len(self.billpayers)))
+        scores.sort(reverse=True, key=lambda x: x[0])
+        return scores[:limit] if limit else scores
+
+    def best(self, name):
+        scores = self.match(name, limit=1)
+        return scores[0] if scores else (0, None, None)
+
+    def match_many(self, names, workers=None, limit=None):
+        unique = list(dict.fromkeys(names))
+        if len(unique) < POOL_THRESHOLD or workers == 1:
+            return {name: self.match(name, limit) for name in unique}
+        workers = workers or os.cpu_count() or 1
+        chunksize = max(1, len(unique) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.billpayers, self.candidates, limit)) as pool:
+            results = pool.map(_match_worker, unique, chunksize=chunksize)
+            return dict(zip(unique, results))
+
+
+# === PROCESS POOL WORKERS ===
+_worker_matcher = None
+_worker_limit = None
+
+
+def _init_worker(billpayers, candidates, limit):
+    global _worker_matcher, _worker_limit
+    _worker_matcher = BillpayerMatcher(billpayers, candidates)
+    _worker_limit = limit
+
+
+def _match_worker(name):
+    return _worker_matcher.match(name, _worker_limit)
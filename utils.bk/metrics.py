@@ -0,0 +1,213 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# === CONFIG ===
+METRICS_FILE = "run_metrics.json"
+PROMETHEUS_FILE = "run_metrics.prom"
+TRACE_FILE = "run_trace.json"
+PROFILE_FILE = "run_profile.txt"
+BUCKETS = [0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]  # seconds
+MAX_TRACE_EVENTS = 200000
+PROFILE_TOP = 40
+
+_lock = threading.Lock()
+_origin = time.monotonic()
+_steps = {}
+_counters = {}
+_gauges = {}
+_commands = {}
+_events = []
+_threads = {}
+
+
+def _trace(name, cat, started, seconds, args=None):
+    thread = threading.current_thread()
+    with _lock:
+        _threads.setdefault(thread.ident, thread.name)
+        if len(_events) < MAX_TRACE_EVENTS:
+            _events.append({"name": name, "cat": cat, "ph": "X", "pid": os.getpid(), "tid": thread.ident,
+                            "ts": round((started - _origin) * 1e6), "dur": round(seconds * 1e6),
+                            "args": args or {}})
+
+
+def observe(step, seconds, ok=True, started=None, **labels):
+    # One finished step: histogram, failure counter and a trace slice
+    with _lock:
+        stat = _steps.setdefault(step, {"count": 0, "sum": 0.0, "max": 0.0, "failures": 0,
+                                        "buckets": [0] * len(BUCKETS)})
+        stat["count"] += 1
+        stat["sum"] += seconds
+        stat["max"] = max(stat["max"], seconds)
+        stat["failures"] += int(not ok)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                stat["buckets"][i] += 1
+    started = time.monotonic() - seconds if started is None else started
+    _trace(step, "step", started, seconds, dict(labels, ok=ok))
+
+
+def count(name, n=1, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + n
+
+
+def gauge(name, value, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _gauges[key] = value
+
+
+@contextmanager
+def timed(step, **labels):
+    # with timed("login"): ...  An exception counts as a failure and propagates
+    started = time.monotonic()
+    ok = True
+    try:
+        yield
+    except BaseException:
+        ok = False
+        raise
+    finally:
+        observe(step, time.monotonic() - started, ok, started, **labels)
+
+
+def instrument_driver(driver):
+    # Every WebDriver command goes through driver.execute; count and time them
+    execute = driver.execute
+
+    def counted(driver_command, params=None):
+        started = time.monotonic()
+        try:
+            return execute(driver_command, params)
+        finally:
+            seconds = time.monotonic() - started
+            with _lock:
+                stat = _commands.setdefault(driver_command, {"count": 0, "sum": 0.0})
+                stat["count"] += 1
+                stat["sum"] += seconds
+            _trace(driver_command, "webdriver", started, seconds)
+
+    driver.execute = counted
+    return driver
+
+
+def instrument_session(session, kind="http"):
+    # requests.Session: one counter per response status class
+    def hook(response, *args, **kwargs):
+        count("http_requests", method=response.request.method, status=f"{response.status_code // 100}xx")
+        _trace(f"{response.request.method} {response.status_code}", kind,
+               time.monotonic() - response.elapsed.total_seconds(), response.elapsed.total_seconds(),
+               {"url": response.url})
+    session.hooks["response"].append(hook)
+    return session
+
+
+def snapshot():
+    # waits is only loaded once a browser ran; nothing to report otherwise
+    waits = sys.modules.get("waits")
+    with _lock:
+        return {
+            "steps": {step: dict(stat, buckets=dict(zip(map(str, BUCKETS), stat["buckets"])))
+                      for step, stat in _steps.items()},
+            "counters": [{"name": name, "labels": dict(labels), "value": value}
+                         for (name, labels), value in sorted(_counters.items())],
+            "gauges": [{"name": name, "labels": dict(labels), "value": value}
+                       for (name, labels), value in sorted(_gauges.items())],
+            "webdriver_commands": {name: dict(stat) for name, stat in _commands.items()},
+            "waits": waits.stats() if waits else {},
+        }
+
+
+def _labels(labels):
+    return ",".join(f'{k}="{str(v)}"' for k, v in labels.items())
+
+
+def prometheus_text():
+    data = snapshot()
+    lines = ["# HELP childpaths_step_seconds Duration of each run step.",
+             "# TYPE childpaths_step_seconds histogram"]
+    for step, stat in sorted(data["steps"].items()):
+        for bound, n in stat["buckets"].items():
+            lines.append(f'childpaths_step_seconds_bucket{{step="{step}",le="{bound}"}} {n}')
+        lines.append(f'childpaths_step_seconds_bucket{{step="{step}",le="+Inf"}} {stat["count"]}')
+        lines.append(f'childpaths_step_seconds_sum{{step="{step}"}} {stat["sum"]:.6f}')
+        lines.append(f'childpaths_step_seconds_count{{step="{step}"}} {stat["count"]}')
+    lines += ["# HELP childpaths_step_failures_total Failed steps.", "# TYPE childpaths_step_failures_total counter"]
+    for step, stat in sorted(data["steps"].items()):
+        lines.append(f'childpaths_step_failures_total{{step="{step}"}} {stat["failures"]}')
+    lines += ["# HELP childpaths_webdriver_commands_total WebDriver commands sent.",
+              "# TYPE childpaths_webdriver_commands_total counter"]
+    for name, stat in sorted(data["webdriver_commands"].items()):
+        lines.append(f'childpaths_webdriver_commands_total{{command="{name}"}} {stat["count"]}')
+    lines += ["# HELP childpaths_wait_timeouts_total Named waits that ran out of budget.",
+              "# TYPE childpaths_wait_timeouts_total counter"]
+    for name, stat in sorted(data["waits"].items()):
+        lines.append(f'childpaths_wait_timeouts_total{{wait="{name}"}} {stat["timeouts"]}')
+    names = sorted({c["name"] for c in data["counters"]})
+    for name in names:
+        lines.append(f"# TYPE childpaths_{name}_total counter")
+        for c in data["counters"]:
+            if c["name"] == name:
+                lines.append(f"childpaths_{name}_total{{{_labels(c['labels'])}}} {c['value']}")
+    for name in sorted({g["name"] for g in data["gauges"]}):
+        lines.append(f"# TYPE childpaths_{name} gauge")
+        for g in data["gauges"]:
+            if g["name"] == name:
+                lines.append(f"childpaths_{name}{{{_labels(g['labels'])}}} {g['value']}")
+    return "\n".join(lines) + "\n"
+
+
+def trace_events():
+    with _lock:
+        events = list(_events)
+        threads = dict(_threads)
+    meta = [{"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()]
+    return {"traceEvents": meta + events, "displayTimeUnit": "ms"}
+
+
+def export(json_path=METRICS_FILE, prometheus_path=PROMETHEUS_FILE, trace_path=TRACE_FILE):
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=1)
+    with open(prometheus_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    with open(trace_path, "w", encoding="utf-8") as f:
+        json.dump(trace_events(), f)
+    return json_path, prometheus_path, trace_path
+
+
+def summary():
+    lines = ["📈 Step summary:"]
+    for step, stat in sorted(snapshot()["steps"].items(), key=lambda item: -item[1]["sum"]):
+        lines.append(f"  {step}: {stat['count']}x, total {stat['sum']:.1f}s, "
+                     f"mean {stat['sum'] / stat['count']:.2f}s, max {stat['max']:.2f}s, failures {stat['failures']}")
+    commands = snapshot()["webdriver_commands"]
+    if commands:
+        lines.append(f"  WebDriver commands: {sum(c['count'] for c in commands.values())}")
+    return "\n".join(lines)
+
+
+def run_profiled(fn, path=PROFILE_FILE, top=PROFILE_TOP):
+    # Runs fn() under cProfile; the top entries by own and cumulative time
+    # go to path and the raw stats next to it for snakeviz and friends.
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn)
+    finally:
+        profile.dump_stats(os.path.splitext(path)[0] + ".prof")
+        out = io.StringIO()
+        stats = pstats.Stats(profile, stream=out).strip_dirs()
+        out.write("=== By own time ===\n")
+        stats.sort_stats("tottime").print_stats(top)
+        out.write("=== By cumulative time ===\n")
+        stats.sort_stats("cumulative").print_stats(top)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(out.getvalue())
@@ -0,0 +1,93 @@
+import csv
+import gzip
+import io
+import sys
+import time
+from itertools import islice
+
+# === CONFIG ===
+REPORT_HEADER = ["Bill Payer", "Type", "Amount", "Status", "Notes"]
+WINDOW = 200          # rows held in memory at once
+FLUSH_ROWS = 50       # report flush cadence
+FLUSH_SECONDS = 5
+
+
+def open_input(source):
+    # source is a path, "-" for stdin, or an open binary stream. Gzip is
+    # detected from the magic bytes, so transactions.csv.gz and a gzipped
+    # pipe both work.
+    if source == "-":
+        raw = sys.stdin.buffer
+    elif isinstance(source, str):
+        raw = open(source, "rb")
+    else:
+        raw = source
+    if not hasattr(raw, "peek"):
+        raw = io.BufferedReader(raw)
+    if raw.peek(2)[:2] == b"\x1f\x8b":
+        raw = gzip.GzipFile(fileobj=raw)
+    return io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+
+
+def read_rows(source):
+    with open_input(source) as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [h.strip() for h in reader.fieldnames]
+        for row in reader:
+            yield {k.strip(): (v or "").strip() for k, v in row.items() if k is not None}
+
+
+def bill_payer_names(source):
+    for row in read_rows(source):
+        yield row.get('Bill Payer', '')
+
+
+def match_rows(rows, resolve):
+    for seq, row in enumerate(rows):
+        yield seq, resolve(row.get('Bill Payer', '')), row
+
+
+def windows(items, size=WINDOW):
+    items = iter(items)
+    while True:
+        window = list(islice(items, size))
+        if not window:
+            return
+        yield window
+
+
+class ReportWriter:
+    """Appends report rows to transaction_report.csv as they finish."""
+
+    def __init__(self, path, flush_rows=FLUSH_ROWS, flush_seconds=FLUSH_SECONDS, header=REPORT_HEADER):
+        self.file = open(path, "w", newline="", encoding="utf-8")
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(header)
+        self.flush_rows = flush_rows
+        self.flush_seconds = flush_seconds
+        self.pending = 0
+        self.last_flush = time.monotonic()
+        self.count = 0
+
+    def write(self, rows):
+        rows = list(rows)
+        self.writer.writerows(rows)
+        self.pending += len(rows)
+        self.count += len(rows)
+        if self.pending >= self.flush_rows or time.monotonic() - self.last_flush >= self.flush_seconds:
+            self.flush()
+
+    def flush(self):
+        self.file.flush()
+        self.pending = 0
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,199 @@
+import json
+import os
+import statistics
+from datetime import datetime
+from journal import KEY_FIELDS, row_key
+
+# === CONFIG ===
+PLAN_FILE = "transaction_plan.json"
+PLAN_MAX_AGE = 60 * 60  # seconds before a plan's accounts are checked again
+# Seconds per step when no earlier run has been logged
+DEFAULT_COSTS = {
+    "create_account": 6.0,
+    "get_account_id": 1.5,
+    "deposit": 3.0,
+    "withdrawal": 3.0,
+}
+
+
+def measured_costs(log_path, defaults=DEFAULT_COSTS):
+    # Median duration per step from earlier runs' JSON Lines logs
+    durations = {}
+    for path in [log_path] + [f"{log_path}.{i}" for i in range(1, 6)]:
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if entry.get("status") == "OK" and "step" in entry and "duration" in entry:
+                        durations.setdefault(entry["step"], []).append(entry["duration"])
+        except FileNotFoundError:
+            continue
+    costs = dict(defaults)
+    costs.update({step: statistics.median(values) for step, values in durations.items()})
+    return costs
+
+
+def row_steps(row):
+    # The transactions one CSV row expands into, as (type, amount). A Step
+    # column (dead-letter files) limits the row to that one step.
+    amount_str = row.get('Amount', '0')
+    amount = float(amount_str) if amount_str else 0.0
+    tx_amount = 0.01 if amount == 0 else amount
+    steps = [("deposit", tx_amount)]
+    if row.get('Is Returned', '').lower() == 'yes' or amount == 0:
+        steps.append(("withdrawal", tx_amount))
+    only = row.get('Step', '').lower()
+    return [step for step in steps if step[0] == only] if only else steps
+
+
+def row_problems(row):
+    # What would keep a row from posting, found without the server
+    problems = [] if row.get('Bill Payer', '').strip() else ["no Bill Payer"]
+    try:
+        steps = row_steps(row)
+    except ValueError:
+        return problems + [f"Amount {row.get('Amount')!r} is not a number"]
+    if any(amount < 0 for _, amount in steps):
+        problems.append(f"Amount {row.get('Amount')} is negative")
+    if row.get('Is Returned', '').strip().lower() not in ("", "yes", "no"):
+        problems.append(f"Is Returned {row.get('Is Returned')!r} is not Yes or No")
+    if row.get('Date'):
+        try:
+            datetime.strptime(row['Date'].strip(), "%d/%m/%Y")
+        except ValueError:
+            problems.append(f"Date {row['Date']!r} is not dd/mm/yyyy")
+    if row.get('Step') and not steps:
+        problems.append(f"Step {row['Step']!r} is not a step of this row")
+    return problems
+
+
+def compile_plan(jobs, branch_value, owner_ids, journal, find_account=None, costs=DEFAULT_COSTS, workers=1,
+                 source=None):
+    # jobs: (seq, matched_name, row). find_account(name, branch) -> id or None
+    # reflects server state when an account index was available; accounts
+    # the journal already knows count as existing too. Steps the journal
+    # has finished are dropped.
+    plan = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "input": source,
+        "branch": branch_value,
+        "owner_ids": owner_ids,
+        "server_state": find_account is not None,
+        "accounts": {"create": [], "existing": {}},
+        "transactions": {},
+        "skipped": [],
+        "duplicates": [],
+        "dropped": [],
+        "rows": [],
+    }
+    seen = {}
+    for seq, matched_name, row in jobs:
+        plan["rows"].append({"seq": seq, "billpayer": matched_name, "row": row})
+        if not matched_name:
+            plan["skipped"].append({"seq": seq, "name": row.get('Bill Payer', '')})
+            continue
+        content = tuple(row.get(field, "") for field in KEY_FIELDS)
+        seen.setdefault(content, []).append(seq)
+
+        if matched_name not in plan["accounts"]["existing"] and matched_name not in plan["accounts"]["create"]:
+            account_id = journal.account_for(matched_name, branch_value) or \
+                (find_account(matched_name, branch_value) if find_account else None)
+            if account_id:
+                plan["accounts"]["existing"][matched_name] = account_id
+            else:
+                plan["accounts"]["create"].append(matched_name)
+
+        key = row_key(seq, row)
+        for tx_type, amount in row_steps(row):
+            if journal.is_done(f"{key}:{tx_type}"):
+                plan["dropped"].append(f"{key}:{tx_type}")
+                continue
+            plan["transactions"].setdefault(matched_name, []).append({
+                "seq": seq, "type": tx_type, "amount": amount,
+                "date": row.get('Date', ''), "note": row.get('Note', ''),
+            })
+    plan["duplicates"] = [seqs for seqs in seen.values() if len(seqs) > 1]
+    plan["estimate"] = estimate(plan, costs, workers)
+    return plan
+
+
+def estimate(plan, costs, workers=1):
+    counts = {"create_account": len(plan["accounts"]["create"]),
+              "get_account_id": len(plan["accounts"]["create"])}
+    for steps in plan["transactions"].values():
+        for step in steps:
+            counts[step["type"]] = counts.get(step["type"], 0) + 1
+    serial = sum(costs.get(step, 0.0) * count for step, count in counts.items())
+    # Account creation is serialized across sessions (ACCOUNT_LOCK)
+    creates = costs["create_account"] * counts["create_account"] + costs["get_account_id"] * counts["get_account_id"]
+    wall = creates + (serial - creates) / max(1, workers)
+    return {"steps": counts, "costs": costs, "workers": workers, "serial_seconds": serial, "wall_seconds": wall}
+
+
+def plan_jobs(plan):
+    return ((r["seq"], r["billpayer"], r["row"]) for r in plan["rows"])
+
+
+def plan_steps(plan):
+    # {seq: [(type, amount)]}: exactly the steps the plan will post
+    steps = {}
+    for name_steps in plan["transactions"].values():
+        for step in name_steps:
+            steps.setdefault(step["seq"], []).append((step["type"], step["amount"]))
+    return steps
+
+
+def plan_is_stale(plan, max_age=PLAN_MAX_AGE):
+    # Compiled without the account index, or long enough ago that accounts
+    # may have been created or removed since
+    age = (datetime.now() - datetime.fromisoformat(plan["created_at"])).total_seconds()
+    return not plan["server_state"] or age > max_age
+
+
+def save_plan(plan, path=PLAN_FILE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+def load_plan(path=PLAN_FILE):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}h {minutes:02d}m {seconds:02d}s" if hours else f"{minutes}m {seconds:02d}s"
+
+
+def plan_summary(plan, limit=20):
+    est = plan["estimate"]
+    tx_count = sum(len(steps) for steps in plan["transactions"].values())
+    lines = [
+        f"🗺️ Plan for branch {plan['branch']} ({plan['created_at']})",
+        f"  Rows: {len(plan['rows']) - len(plan['skipped'])} matched, {len(plan['skipped'])} skipped",
+        f"  Accounts: {len(plan['accounts']['create'])} to create, {len(plan['accounts']['existing'])} existing"
+        + ("" if plan["server_state"] else " (no server state, journal only)"),
+        f"  Transactions: {tx_count} across {len(plan['transactions'])} accounts, "
+        f"{len(plan['dropped'])} already posted and dropped",
+        f"  Duplicate rows: {len(plan['duplicates'])} groups",
+        f"  Estimate: {format_duration(est['wall_seconds'])} with {est['workers']} session(s) "
+        f"({format_duration(est['serial_seconds'])} serial)",
+    ]
+    for name in plan["accounts"]["create"][:limit]:
+        lines.append(f"  ➕ create account: {name}")
+    for name, steps in list(plan["transactions"].items())[:limit]:
+        lines.append(f"  💶 {name}: " + ", ".join(f"{s['type']} €{s['amount']:.2f}" for s in steps))
+    for seqs in plan["duplicates"][:limit]:
+        lines.append(f"  ⚠️ duplicate CSV lines: {', '.join(str(seq + 2) for seq in seqs)}")
+    for skipped in plan["skipped"][:limit]:
+        lines.append(f"  ❌ skipped: {skipped['name']}")
+    if max(len(plan["accounts"]["create"]), len(plan["transactions"]), len(plan["duplicates"]),
+           len(plan["skipped"])) > limit:
+        lines.append(f"  … lists cut at {limit}; see the saved plan for everything")
+    return "\n".join(lines)
@@ -0,0 +1,161 @@
+import time
+from executor import ACCOUNT_LOCK
+from journal import UNCERTAIN, row_key
+from metrics import observe
+from planner import row_steps
+from retries import DeadLetter, RetryPolicy, StepFailure, classify, is_transient
+
+# === CONFIG ===
+HELD = "held"  # a step left unchecked from an earlier run
+
+
+class RowPoster:
+    """Posts the rows of one branch: depositCSV and the dashboard share it.
+
+    process_rows() takes all rows of one billpayer, resolves the account
+    once and sends every pending step to the transport as one batch. The
+    journal skips steps already posted and holds back the ones nobody
+    checked; failed rows go to the dead-letter file with the step still
+    missing.
+    """
+
+    def __init__(self, index, journal, branch_value, retry_policy=None, dead_letter=None, log=print, logger=None):
+        self.index = index
+        self.journal = journal
+        self.branch_value = branch_value
+        self.retry_policy = retry_policy or RetryPolicy(log=log)
+        self.dead_letter = dead_letter or DeadLetter()
+        self.log = log
+        self.logger = logger
+
+    def log_step(self, step, ok, started, row=None, duration=None, **fields):
+        duration = time.monotonic() - started if duration is None else duration
+        observe(step, duration, ok)
+        if self.logger:
+            self.logger.step(step, "OK" if ok else "FAILED", duration, row=row, **fields)
+
+    def find_created(self, transport, key, matched_name):
+        # -> account id, None when it is not there, or StepFailure. Diffs only
+        # the newest index rows instead of rescanning the whole table.
+        started = time.monotonic()
+        try:
+            account_id = self.index.account_id_after_create(transport.fetch_index, matched_name, self.branch_value)
+        except Exception as e:
+            account_id = classify(e)
+        self.log_step("get_account_id", bool(account_id), started, row=key, billpayer=matched_name)
+        return account_id
+
+    def create_and_find(self, transport, key, matched_name, owner_id=None):
+        # -> account id or StepFailure
+        started = time.monotonic()
+        created = transport.create_account(matched_name, self.branch_value, owner_id)
+        self.log_step("create_account", created, started, row=key, billpayer=matched_name)
+        if not created and not is_transient(created) and not getattr(created, "uncertain", False):
+            return created
+        # Also after a failure in transit: the account may have been created anyway
+        found = self.retry_policy.call(lambda: self.find_created(transport, key, matched_name), "get_account_id")
+        if found:
+            return found
+        if found is None:
+            return StepFailure("Account created but not found in the index") if created else created
+        # Creating again without knowing could leave a duplicate account
+        return StepFailure(f"Account lookup failed: {found.error}", uncertain=True)
+
+    def ensure_account(self, transport, accounts, key, matched_name, owner_id=None, known=None):
+        # (ok, account id): the known account, or a newly created one. known
+        # holds accounts a plan already resolved.
+        if matched_name in accounts:
+            return True, accounts[matched_name]
+        account_id = self.journal.account_for(matched_name, self.branch_value) or \
+            (known or {}).get(matched_name) or self.index.find(matched_name, self.branch_value)
+        if account_id:
+            self.log(f"♻️ Reusing account {account_id} for {matched_name}")
+        else:
+            with ACCOUNT_LOCK:
+                result = self.retry_policy.call(
+                    lambda: self.create_and_find(transport, key, matched_name, owner_id), "create_account")
+            if not result:
+                return result, None
+            account_id = result
+            self.journal.record_account(matched_name, account_id, self.branch_value)
+        accounts[matched_name] = account_id
+        return True, account_id
+
+    def dead_letter_step(self, row, tx_type, error):
+        # Only the missing part goes back: the whole row if its first step failed
+        first = row_steps(row)[0][0]
+        self.dead_letter.write(row, error, row.get('Step', '') if tx_type == first else tx_type)
+
+    def process_rows(self, transport, accounts, jobs, owner_id=None, planned=None, known=None):
+        # jobs: (seq, matched_name, row) of one billpayer -> {seq: report
+        # rows}. A row's withdrawal only posts after its deposit succeeded.
+        # A step the journal still has as unchecked is held back with the
+        # rest of its row. planned ({seq: [(type, amount)]}) replaces the
+        # steps worked out from each row.
+        journal = self.journal
+        matched_name = jobs[0][1]
+        seq, _, row = jobs[0]
+        ok, account_id = self.ensure_account(transport, accounts, row_key(seq, row), matched_name, owner_id, known)
+        if not ok:
+            error = getattr(ok, "error", "")
+            for seq, _, row in jobs:
+                self.dead_letter.write(row, f"Account creation failed: {error}", row.get('Step', ''))
+            return {seq: [[matched_name, "Account", row.get('Amount', '0'), "FAILED",
+                           f"Account creation failed: {error}"]] for seq, _, row in jobs}
+
+        steps, items = [], []
+        for seq, _, row in jobs:
+            key = row_key(seq, row)
+            deposit = None
+            held = False
+            for tx_type, amount in (planned.get(seq, []) if planned is not None else row_steps(row)):
+                step_key = f"{key}:{tx_type}"
+                if journal.is_done(step_key):
+                    steps.append((seq, step_key, tx_type, amount, None))
+                    continue
+                if held or journal.needs_check(step_key):
+                    held = True
+                    steps.append((seq, step_key, tx_type, amount, HELD))
+                    continue
+                journal.planned(step_key, tx_type, billpayer=matched_name, account_id=account_id, amount=amount)
+                steps.append((seq, step_key, tx_type, amount, len(items)))
+                items.append((tx_type, amount, row.get('Note', ''), row.get('Date', ''),
+                              deposit if tx_type == "withdrawal" else None))
+                if tx_type == "deposit":
+                    deposit = len(items) - 1
+
+        started = time.monotonic()
+        oks = self.retry_policy.post(lambda batch: transport.make_transactions(account_id, batch), items) \
+            if items else []
+        per_item = (time.monotonic() - started) / max(1, len(items))
+
+        rows = {seq: row for seq, _, row in jobs}
+        report = {seq: [] for seq, _, _ in jobs}
+        failed = set()
+        for seq, step_key, tx_type, amount, i in steps:
+            if i == HELD:
+                # Its journal entry stays as it is, so it is still held next time
+                if seq not in failed:
+                    error = (f"Uncertain: {tx_type} may have posted before the last run stopped; "
+                             f"check account {account_id} before re-feeding")
+                    self.log(f"⏸️ {tx_type.capitalize()} of €{amount} for {matched_name} held back: not checked")
+                    report[seq].append([matched_name, tx_type.capitalize(), amount, "FAILED", error])
+                    failed.add(seq)
+                    self.dead_letter_step(rows[seq], tx_type, error)
+                continue
+            if seq in failed:
+                journal.finished(step_key, "SKIPPED")
+                continue
+            if i is None:
+                report[seq].append([matched_name, tx_type.capitalize(), amount, "OK", "Resumed: already posted"])
+                continue
+            ok = oks[i]
+            self.log_step(tx_type, ok, started, row=step_key.rsplit(":", 1)[0], duration=per_item,
+                          billpayer=matched_name, amount=amount)
+            journal.finished(step_key, "OK" if ok else UNCERTAIN if getattr(ok, "uncertain", False) else "FAILED")
+            error = "" if ok else f"Error during {tx_type}: {getattr(ok, 'error', '')}"
+            report[seq].append([matched_name, tx_type.capitalize(), amount, "OK" if ok else "FAILED", error])
+            if not ok:
+                failed.add(seq)
+                self.dead_letter_step(rows[seq], tx_type, error)
+        return report
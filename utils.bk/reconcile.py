@@ -0,0 +1,221 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from dotenv import load_dotenv
+from accounts import DEPOSIT_CAPTION, AccountIndex, fetch_rows_selenium, owner_key
+from aliases import ALIAS_FILE, AliasStore
+from branches import BRANCH_COLUMN, branch_router, list_branches, load_branch_map
+from journal import JOURNAL_FILE, Journal
+from matcher import BillpayerMatcher
+from pipeline import ReportWriter, read_rows
+from planner import row_steps
+from transport import HttpTransport
+
+# === CONFIG ===
+CSV_FILE = "transactions.csv"
+REPORT_FILE = "reconciliation_report.csv"
+REPORT_HEADER = ["Bill Payer", "Account ID", "Rows", "Expected", "Balance", "Available Funds", "Difference", "Status",
+                 "Branch"]
+AUTO_ACCEPT = 0.95  # fuzzy owner matches below this are reported, never credited
+TOLERANCE = 0.005  # euro
+SHOW_LIMIT = 20
+
+def parse_money(text):
+    # "€1,234.56", "-€5.00", "(5.00)" -> float; None when there is no number
+    cleaned = re.sub(r"[^\d.,()\-]", "", text or "")
+    negative = cleaned.startswith("-") or cleaned.startswith("(")
+    digits = cleaned.strip("-()").replace(",", "")
+    try:
+        value = float(digits)
+    except ValueError:
+        return None
+    return -value if negative else value
+
+def expected_nets(rows, route):
+    # One pass over the CSV: net effect and row count per (branch value,
+    # Bill Payer) as written. A returned payment deposits and withdraws the
+    # same amount. route(row) -> branch value or None.
+    nets = {}
+    for row in rows:
+        net = sum(amount if tx_type == "deposit" else -amount for tx_type, amount in row_steps(row))
+        total = nets.setdefault((route(row), row.get('Bill Payer', '')), [0.0, 0])
+        total[0] += net
+        total[1] += 1
+    return nets
+
+def deposit_accounts(index, caption=DEPOSIT_CAPTION):
+    return [a for a in index.by_id.values() if caption in a["caption"]]
+
+def decided_match(branch_value, name, aliases=None, journal=None):
+    # (True, billpayer or None for a skip) when an operator or an earlier
+    # run already decided what the CSV name is; (False, None) otherwise
+    entry = aliases.lookup(branch_value, name) if aliases else None
+    if entry:
+        return True, entry["billpayer"]
+    if journal:
+        # Multi-branch runs journal matches under "branch:name"
+        for key in (f"{branch_value}:{name}", name):
+            if key in journal.matches:
+                return True, journal.matches[key]
+    return False, None
+
+def resolve_names(keys, index, aliases=None, journal=None):
+    # (branch value, CSV name) -> deposit account or None, each distinct
+    # key once. Decisions already taken come first, then exact owners in
+    # the branch; a fuzzy owner match only counts at AUTO_ACCEPT or above,
+    # so a doubtful name is reported rather than credited to someone else.
+    resolved, rest = {}, {}
+    for branch_value, name in keys:
+        if branch_value is None:
+            resolved[(branch_value, name)] = None
+            continue
+        decided, billpayer = decided_match(branch_value, name, aliases, journal)
+        if decided:
+            account_id = index.find(billpayer, branch_value) if billpayer else None
+        else:
+            account_id = index.find(name, branch_value)
+            if not account_id:
+                rest.setdefault(branch_value, []).append(name)
+                continue
+        resolved[(branch_value, name)] = index.get(account_id) if account_id else None
+    for branch_value, names in rest.items():
+        branch = index.branch_key(branch_value)
+        accounts = [a for a in deposit_accounts(index) if owner_key(a["branch"]) == branch]
+        scored = BillpayerMatcher([(a["owner"], a["id"]) for a in accounts]).match_many(names, limit=1) \
+            if accounts else {}
+        for name in names:
+            scores = scored.get(name)
+            resolved[(branch_value, name)] = index.get(scores[0][2]) if scores and scores[0][0] >= AUTO_ACCEPT \
+                else None
+    return resolved
+
+def reconcile(nets, index, baseline=None, tolerance=TOLERANCE, aliases=None, journal=None):
+    # -> report rows and a {status: count} summary. With a baseline
+    # ({account id: balance} from before the batch) only the change since
+    # then has to match the CSV.
+    baseline = baseline or {}
+    resolved = resolve_names(list(nets), index, aliases, journal)
+    grouped = {}
+    report, summary = [], {}
+    for (branch_value, name), (net, rows) in nets.items():
+        account = resolved.get((branch_value, name))
+        if account is None:
+            report.append([name, "", rows, f"{net:.2f}", "", "", "", "UNMATCHED",
+                           index.branches.get(str(branch_value), "")])
+            summary["UNMATCHED"] = summary.get("UNMATCHED", 0) + 1
+            continue
+        total = grouped.setdefault(account["id"], [account, 0.0, 0])
+        total[1] += net
+        total[2] += rows
+
+    for account, expected, rows in grouped.values():
+        balance = parse_money(account["balance"])
+        if balance is None:
+            status, difference = "NO BALANCE", ""
+        else:
+            actual = balance - baseline.get(account["id"], 0.0)
+            status = "OK" if abs(actual - expected) <= tolerance else "MISMATCH"
+            difference = f"{actual - expected:.2f}"
+        report.append([account["owner"], account["id"], rows, f"{expected:.2f}", account["balance"],
+                       account["available"], difference, status, account["branch"]])
+        summary[status] = summary.get(status, 0) + 1
+    # Mismatches first, then alphabetical
+    report.sort(key=lambda r: (r[7] == "OK", r[0].lower()))
+    return report, summary
+
+def snapshot_balances(index):
+    return {a["id"]: parse_money(a["balance"]) or 0.0 for a in deposit_accounts(index)}
+
+def load_index(args, email, password):
+    # -> (AccountIndex, {branch value: branch name})
+    if args.transport == "http":
+        transport = HttpTransport()
+        try:
+            if not transport.login(email, password):
+                sys.exit("❌ Login failed")
+            print("✅ Logged in")
+            branches = transport.list_branches()
+            return AccountIndex(branches=branches).load(transport.fetch_index), branches
+        finally:
+            transport.quit()
+    # Only the browser transport needs Selenium
+    from drivers import new_driver
+    from login import signed_in
+    driver = new_driver()
+    try:
+        signed_in(driver, email, password)
+        branches = list_branches(driver)
+        return AccountIndex(branches=branches).load(lambda url: fetch_rows_selenium(driver, url)), branches
+    finally:
+        driver.quit()
+
+def row_router(args, branches):
+    # row -> branch value: the Branch column or mapping file when they name
+    # one, else --branch, else the only branch there is
+    route = branch_router(branches, load_branch_map(args.branch_map) if args.branch_map else None)
+    default = next(iter(branches)) if len(branches) == 1 else None
+    if args.branch:
+        default = route({BRANCH_COLUMN: args.branch})
+        if default is None:
+            sys.exit(f"❌ No branch {args.branch!r}; known: {', '.join(branches.values())}")
+    return lambda row: route(row) if row.get(BRANCH_COLUMN) else route(row) or default
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare finance-account balances with a transactions CSV.")
+    parser.add_argument("input", nargs="?", default=CSV_FILE, help=f"transactions CSV, .gz or - (default: {CSV_FILE})")
+    parser.add_argument("--report", default=REPORT_FILE, help="mismatch report CSV")
+    parser.add_argument("--transport", choices=["http", "selenium"], default="http",
+                        help="how to read the account index (default: http, no browser)")
+    parser.add_argument("--baseline", help="balances saved with --snapshot before the batch ran")
+    parser.add_argument("--snapshot", help="save current balances here and exit, to use as --baseline later")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE, help="allowed difference in euro")
+    parser.add_argument("--branch", help="branch value or name of rows without a Branch column")
+    parser.add_argument("--branch-map", metavar="CSV",
+                        help="Bill Payer,Branch mapping for rows without a Branch column")
+    parser.add_argument("--aliases", default=ALIAS_FILE, help=f"remembered match decisions (default: {ALIAS_FILE})")
+    parser.add_argument("--no-aliases", action="store_true", help="ignore remembered match decisions")
+    parser.add_argument("--journal", default=JOURNAL_FILE,
+                        help=f"journal of the depositCSV run, for its match decisions (default: {JOURNAL_FILE})")
+    args = parser.parse_args()
+    load_dotenv()
+    email = os.getenv("EMAIL") or input("Email: ")
+    password = os.getenv("PASSWORD") or input("Password: ")
+
+    started = time.monotonic()
+    index, branches = load_index(args, email, password)
+    print(f"📒 Indexed {len(index)} finance accounts in {time.monotonic() - started:.1f}s")
+
+    if args.snapshot:
+        balances = snapshot_balances(index)
+        with open(args.snapshot, "w", encoding="utf-8") as f:
+            json.dump(balances, f, indent=1)
+        print(f"✅ Saved {len(balances)} balances to {args.snapshot}")
+        return
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    aliases = None if args.no_aliases else AliasStore(args.aliases)
+    journal = Journal.read(args.journal) if os.path.exists(args.journal) else None
+    nets = expected_nets(read_rows(args.input), row_router(args, branches))
+    report, summary = reconcile(nets, index, baseline, args.tolerance, aliases, journal)
+    with ReportWriter(args.report, header=REPORT_HEADER) as writer:
+        writer.write(report)
+
+    print(f"\n🧮 {sum(summary.values())} billpayers reconciled in {time.monotonic() - started:.1f}s: "
+          + ", ".join(f"{count} {status}" for status, count in sorted(summary.items())))
+    problems = [row for row in report if row[7] != "OK"]
+    for row in problems[:SHOW_LIMIT]:
+        print(f"  ⚠️ {row[0]}: expected €{row[3]}, balance {row[4] or '-'} ({row[7]})")
+    if len(problems) > SHOW_LIMIT:
+        print(f"  … {len(problems) - SHOW_LIMIT} more in the report")
+    print(f"✅ Report saved to {args.report}")
+    if summary.get("MISMATCH") or summary.get("UNMATCHED"):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+import csv
+import random
+import sys
+import threading
+import time
+from metrics import count
+
+# === CONFIG ===
+ATTEMPTS = 4  # first try included
+BASE_DELAY = 1.0  # seconds; doubles per attempt
+MAX_DELAY = 30.0
+DEAD_LETTER_FILE = "dead_letter.csv"
+STEP_COLUMN = "Step"
+ERROR_COLUMN = "Error"
+
+
+class UncertainPost(Exception):
+    """The form was sent but no answer came back; it may have gone through."""
+
+
+class StepFailure:
+    """Why a step failed. Falsy, so callers that only test success still work.
+
+    transient failures (timeouts, stale elements, 5xx) are worth retrying;
+    form validation errors are not. uncertain means the request may have
+    been applied, so it must not be repeated blindly.
+    """
+
+    def __init__(self, error, transient=False, uncertain=False, retry_after=None):
+        self.error = error
+        self.transient = transient
+        self.uncertain = uncertain
+        self.retry_after = retry_after
+
+    def __bool__(self):
+        return False
+
+    def __repr__(self):
+        kind = "uncertain" if self.uncertain else "transient" if self.transient else "permanent"
+        return f"StepFailure({self.error!r}, {kind})"
+
+
+SKIPPED = StepFailure("skipped: an earlier step of the row failed", transient=True)
+
+
+def form_failure(errors):
+    return StepFailure("; ".join(errors) or "form rejected")
+
+
+def classify(exc):
+    message = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+    if isinstance(exc, UncertainPost):
+        return StepFailure(f"{message} (may have posted; check before re-feeding)", uncertain=True)
+    # An exception can only come from a library that is already loaded, so
+    # classifying never imports requests or Selenium itself
+    requests = sys.modules.get("requests")
+    selenium = sys.modules.get("selenium.common.exceptions")
+    if requests and isinstance(exc, requests.HTTPError) and exc.response is not None:
+        status = exc.response.status_code
+        retry_after = exc.response.headers.get("Retry-After")
+        return StepFailure(f"HTTP {status}", transient=status >= 500 or status == 429,
+                           retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+    if requests and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return StepFailure(message, transient=True)
+    if selenium and isinstance(exc, (selenium.TimeoutException, selenium.StaleElementReferenceException)):
+        return StepFailure(f"{type(exc).__name__}: {message}", transient=True)
+    if selenium and isinstance(exc, selenium.WebDriverException):
+        # Navigation errors (net::ERR_*) and the like; a dead browser keeps
+        # failing and simply runs out of attempts
+        return StepFailure(message, transient=True)
+    return StepFailure(f"{type(exc).__name__}: {message}")
+
+
+def is_transient(result):
+    return not result and getattr(result, "transient", False)
+
+
+def retryable(items, oks):
+    # Failed items worth another go, in order. A dependent item (a
+    # withdrawal after its deposit) is only retried along with, or after,
+    # the item it depends on.
+    todo = []
+    for i, ok in enumerate(oks):
+        after = items[i][4]
+        if ok or not is_transient(ok):
+            continue
+        if after is not None and not oks[after] and after not in todo:
+            continue
+        todo.append(i)
+    return todo
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter, shared by every session of a run.
+
+    A Retry-After header from the server overrides the computed delay.
+    """
+
+    def __init__(self, attempts=ATTEMPTS, base=BASE_DELAY, cap=MAX_DELAY, log=print, rng=None, sleep=time.sleep):
+        self.attempts = max(1, attempts)
+        self.base = base
+        self.cap = cap
+        self.log = log
+        self.rng = rng or random.Random()
+        self.sleep = sleep
+
+    def delay(self, attempt, failures=()):
+        hinted = [f.retry_after for f in failures if getattr(f, "retry_after", None)]
+        if hinted:
+            return min(self.cap, max(hinted))
+        return self.rng.uniform(0, min(self.cap, self.base * 2 ** (attempt - 1)))
+
+    def call(self, fn, step):
+        # fn() -> truthy result or StepFailure
+        result = fn()
+        for attempt in range(1, self.attempts):
+            if not is_transient(result):
+                break
+            wait = self.delay(attempt, [result])
+            count("retries", kind=step)
+            self.log(f"🔁 {step} failed ({result.error}); retry {attempt}/{self.attempts - 1} in {wait:.1f}s")
+            self.sleep(wait)
+            result = fn()
+        return result
+
+    def post(self, post, items):
+        # post(items) -> one result per item, as Transport.make_transactions.
+        # Only the failed items go round again.
+        oks = list(post(items))
+        for attempt in range(1, self.attempts):
+            todo = retryable(items, oks)
+            if not todo:
+                break
+            wait = self.delay(attempt, [oks[i] for i in todo])
+            count("retries", kind="transaction", n=len(todo))
+            self.log(f"🔁 {len(todo)} transaction(s) failed ({oks[todo[0]].error}); "
+                     f"retry {attempt}/{self.attempts - 1} in {wait:.1f}s")
+            self.sleep(wait)
+            position = {i: n for n, i in enumerate(todo)}
+            retry = [items[i][:4] + (position.get(items[i][4]),) for i in todo]
+            for i, ok in zip(todo, post(retry)):
+                oks[i] = ok
+        return oks
+
+
+class DeadLetter:
+    """CSV of rows that did not make it, in the input's own columns.
+
+    Step names the one step still missing when the rest of the row went
+    through (a withdrawal after its deposit posted); blank means the whole
+    row. The file can be fed straight back to depositCSV. It is only
+    created once there is something to write.
+    """
+
+    def __init__(self, path=DEAD_LETTER_FILE):
+        self.path = path
+        self.file = None
+        self.writer = None
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def write(self, row, error, step=""):
+        with self.lock:
+            if self.writer is None:
+                fields = [k for k in row if k not in (STEP_COLUMN, ERROR_COLUMN)] + [STEP_COLUMN, ERROR_COLUMN]
+                self.file = open(self.path, "w", newline="", encoding="utf-8")
+                self.writer = csv.DictWriter(self.file, fields, extrasaction="ignore")
+                self.writer.writeheader()
+            self.writer.writerow({**row, STEP_COLUMN: step, ERROR_COLUMN: error})
+            self.file.flush()
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            if self.file:
+                self.file.close()
@@ -0,0 +1,105 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from cryptography.fernet import Fernet, InvalidToken
+from cache import load_cache, save_cache
+from config import BASE_URL
+
+# === CONFIG ===
+SESSION_FILE = os.path.join("data", "sessions.json")
+CHECK_PATH = "/dashboard"
+CHECK_TIMEOUT = 30  # seconds; HttpTransport passes its own request timeout
+KDF_ROUNDS = 200000
+COOKIE_FIELDS = ["name", "value", "path", "secure", "httpOnly", "expiry", "sameSite"]
+_LOCK = threading.Lock()
+
+
+def account_key(email):
+    return hashlib.sha256(email.strip().lower().encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    """Login cookies per account, encrypted on disk with a key derived from
+    the account password.
+
+    restore_*() puts the saved cookies on a driver or requests.Session and
+    checks them with a single request to the dashboard; an expired or
+    undecryptable entry is dropped so the caller logs in and saves again.
+    """
+
+    def __init__(self, email, password, path=SESSION_FILE):
+        self.email = email
+        self.password = password
+        self.path = path
+        self.key = account_key(email)
+
+    def _fernet(self, salt):
+        key = hashlib.pbkdf2_hmac("sha256", self.password.encode("utf-8"), salt, KDF_ROUNDS)
+        return Fernet(base64.urlsafe_b64encode(key))
+
+    def load(self):
+        with _LOCK:
+            entry = load_cache(self.path).get(self.key)
+        if not entry:
+            return None
+        try:
+            fernet = self._fernet(base64.b64decode(entry["salt"]))
+            return json.loads(fernet.decrypt(entry["token"].encode("ascii")))
+        except (InvalidToken, KeyError, ValueError):
+            # Password changed or file tampered with
+            return None
+
+    def save(self, cookies):
+        salt = os.urandom(16)
+        token = self._fernet(salt).encrypt(json.dumps(cookies).encode("utf-8")).decode("ascii")
+        with _LOCK:
+            store = load_cache(self.path)
+            store[self.key] = {"salt": base64.b64encode(salt).decode("ascii"), "token": token,
+                               "saved_at": time.time()}
+            save_cache(store, self.path)
+            os.chmod(self.path, 0o600)
+
+    def clear(self):
+        with _LOCK:
+            store = load_cache(self.path)
+            if store.pop(self.key, None) is not None:
+                save_cache(store, self.path)
+
+    def restore_driver(self, driver, base_url=BASE_URL):
+        cookies = self.load()
+        if not cookies:
+            return False
+        # Cookies can only be added for the page currently loaded
+        driver.get(f"{base_url}/auth/login")
+        for cookie in cookies:
+            driver.add_cookie({k: cookie[k] for k in COOKIE_FIELDS if cookie.get(k) is not None})
+        driver.get(f"{base_url}{CHECK_PATH}")
+        if CHECK_PATH in driver.current_url:
+            return True
+        driver.delete_all_cookies()
+        self.clear()
+        return False
+
+    def save_driver(self, driver):
+        self.save(driver.get_cookies())
+
+    def restore_session(self, session, base_url=BASE_URL, timeout=CHECK_TIMEOUT):
+        cookies = self.load()
+        if not cookies:
+            return False
+        for cookie in cookies:
+            session.cookies.set(cookie["name"], cookie["value"], path=cookie.get("path", "/"))
+        response = session.get(f"{base_url}{CHECK_PATH}", allow_redirects=False, timeout=timeout)
+        if response.status_code == 200:
+            return True
+        session.cookies.clear()
+        self.clear()
+        return False
+
+    def save_session(self, session):
+        self.save([{"name": c.name, "value": c.value, "path": c.path, "secure": bool(c.secure),
+                    "expiry": c.expires} for c in session.cookies])
+
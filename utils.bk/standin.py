@@ -0,0 +1,446 @@
+import argparse
+import csv
+import html
+import random
+import re
+import secrets
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# === CONFIG ===
+EMAIL = "bench@example.com"
+PASSWORD = "bench"
+PAGE_SIZE = 50
+COOKIE = "standin_session"
+FIRST_NAMES = ["Emma", "Tommy", "Fiona", "Rosemary", "Leszek", "Ewelina", "Alana", "Eugene", "Liza", "Andrew",
+               "Celeste", "Michael", "Andrea", "Aoife", "Ciara", "Sean", "Niamh", "Conor", "Saoirse", "Darragh",
+               "Orla", "Cian", "Roisin", "Eoin", "Grainne", "Padraig", "Siobhan", "Declan", "Maeve", "Ronan"]
+LAST_NAMES = ["Ryan", "Hogan", "O Brien", "Wynne", "Wasko", "Davis", "Reilly", "Mernagh", "Venter", "Jones",
+              "Tully", "Murphy", "Kelly", "Byrne", "Walsh", "O Sullivan", "Doyle", "McCarthy", "Gallagher", "Doherty",
+              "Kennedy", "Lynch", "Murray", "Quinn", "Moore", "McLoughlin", "Carroll", "Connolly", "Daly", "Connell"]
+
+
+# === SYNTHETIC DATA ===
+def synthetic_billpayers(count, seed=0):
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        if rng.random() < 0.4 or len(names) > len(FIRST_NAMES) * len(LAST_NAMES) // 2:
+            name += f" and {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+        names.add(name)
+    return [(str(1000 + i), name) for i, name in enumerate(sorted(names))]
+
+
+def write_synthetic_csv(path, rows, billpayers, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Bill Payer", "Amount", "Date", "Note", "Is Returned"])
+        for _ in range(rows):
+            _, name = rng.choice(billpayers)
+            amount = rng.choice([0, 208, 300, 416, 460, 500, 570, 960])
+            date = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(2019, 2025)}"
+            writer.writerow([name, amount, date, "", "Yes" if rng.random() < 0.1 else "No"])
+
+
+# === PAGES ===
+LAYOUT = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{csrf}"><title>ChildPaths stand-in</title>
+<style>
+.bootstrap-switch-wrapper {{ display: inline-block; width: 60px; height: 24px; border: 1px solid #888; cursor: pointer; }}
+.bootstrap-switch-on {{ background: #5cb85c; }}
+.select2-selection--multiple {{ display: block; min-height: 28px; width: 400px; border: 1px solid #888; cursor: text; }}
+.select2-dropdown {{ display: block; width: 400px; border: 1px solid #888; }}
+.select2-results__option--highlighted {{ background: #5897fb; }}
+.swal-overlay {{ position: fixed; top: 0; left: 0; right: 0; bottom: 0; background: rgba(0,0,0,.4); }}
+.swal-modal {{ margin: 100px auto; width: 300px; background: #fff; padding: 20px; }}
+</style></head>
+<body>{errors}{body}</body></html>"""
+
+SWITCH_JS = """
+<script>
+document.querySelectorAll('.bootstrap-switch-wrapper').forEach(function (wrapper) {
+    var box = document.getElementById(wrapper.dataset.for);
+    function set(on) {
+        wrapper.classList.toggle('bootstrap-switch-on', on);
+        wrapper.classList.toggle('bootstrap-switch-off', !on);
+        box.checked = on;
+    }
+    wrapper.addEventListener('click', function () {
+        if (!box.checked || wrapper.dataset.confirm !== '1') { set(!box.checked); return; }
+        var overlay = document.createElement('div');
+        overlay.className = 'swal-overlay swal-overlay--show-modal';
+        overlay.innerHTML = '<div class="swal-modal"><p>Are you sure?</p>' +
+            '<button type="button" class="swal-button swal-button--cancel">Cancel</button>' +
+            '<button type="button" class="swal-button swal-button--confirm">OK</button></div>';
+        document.body.appendChild(overlay);
+        overlay.querySelector('.swal-button--confirm').addEventListener('click', function () {
+            set(false); overlay.remove();
+        });
+        overlay.querySelector('.swal-button--cancel').addEventListener('click', function () { overlay.remove(); });
+    });
+});
+</script>"""
+
+SELECT2_JS = """
+<script>
+(function () {
+    var select = document.getElementById('owners');
+    var container = document.querySelector('.select2-container');
+    var selection = container.querySelector('.select2-selection--multiple');
+    var rendered = container.querySelector('.select2-selection__rendered');
+    var branch = document.querySelector('select[name=branch]');
+    var dropdown = null, token = Math.random().toString(36).slice(2, 6);
+
+    function options(term) {
+        term = (term || '').toLowerCase();
+        return Array.prototype.filter.call(select.options, function (o) {
+            return o.dataset.branch === branch.value && !o.selected && o.text.toLowerCase().indexOf(term) !== -1;
+        });
+    }
+    function renderChoices() {
+        rendered.innerHTML = '';
+        Array.prototype.forEach.call(select.selectedOptions, function (o) {
+            var li = document.createElement('li');
+            li.className = 'select2-selection__choice';
+            li.title = o.text;
+            li.textContent = o.text;
+            rendered.appendChild(li);
+        });
+    }
+    function close() {
+        if (!dropdown) return;
+        dropdown.remove();
+        dropdown = null;
+        container.classList.remove('select2-container--open');
+    }
+    function choose(value) {
+        Array.prototype.forEach.call(select.options, function (o) { if (o.value === value) o.selected = true; });
+        select.dispatchEvent(new Event('change'));
+        close();
+    }
+    function render(term) {
+        var ul = dropdown.querySelector('.select2-results__options');
+        ul.innerHTML = '<li class="select2-results__option loading-results">Searching…</li>';
+        setTimeout(function () {
+            if (!dropdown) return;
+            ul.innerHTML = '';
+            options(term).forEach(function (o, i) {
+                var li = document.createElement('li');
+                li.className = 'select2-results__option' + (i === 0 ? ' select2-results__option--highlighted' : '');
+                li.id = 'select2--result-' + token + '-' + o.value;
+                li.dataset.value = o.value;
+                li.textContent = o.text;
+                li.addEventListener('click', function () { choose(o.value); });
+                ul.appendChild(li);
+            });
+        }, RESULTS_DELAY);
+    }
+    function open() {
+        container.classList.add('select2-container--open');
+        dropdown = document.createElement('span');
+        dropdown.className = 'select2-dropdown';
+        dropdown.innerHTML = '<input class="select2-search__field" type="search">' +
+            '<ul class="select2-results__options"></ul>';
+        container.parentNode.insertBefore(dropdown, container.nextSibling);
+        var search = dropdown.querySelector('input');
+        search.addEventListener('input', function () { render(search.value); });
+        search.addEventListener('keydown', function (e) {
+            if (e.key !== 'Enter') return;
+            e.preventDefault();
+            var highlighted = dropdown.querySelector('.select2-results__option--highlighted');
+            if (highlighted) choose(highlighted.dataset.value);
+        });
+        render('');
+        search.focus();
+    }
+    selection.addEventListener('click', function () { dropdown ? close() : open(); });
+    select.addEventListener('change', renderChoices);
+    branch.addEventListener('change', function () {
+        Array.prototype.forEach.call(select.options, function (o) { o.selected = false; });
+        renderChoices();
+    });
+})();
+</script>"""
+
+
+def esc(value):
+    return html.escape(str(value), quote=True)
+
+
+class StandinState:
+    """In-memory ChildPaths: branches, billpayers/guardians and finance accounts."""
+
+    def __init__(self, billpayers_by_branch, latency=0.0, jitter=0.5, failure_rate=0.0, seed=0):
+        self.branches = {value: name for value, (name, _) in billpayers_by_branch.items()}
+        self.billpayers = {value: bps for value, (_, bps) in billpayers_by_branch.items()}
+        self.names = {bp_id: name for bps in self.billpayers.values() for bp_id, name in bps}
+        self.guardians = {bp_id: True for bp_id in self.names}
+        self.accounts = []
+        self.sessions = {}
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+
+    def delay(self):
+        with self.lock:
+            self.requests += 1
+            spread = self.rng.uniform(1 - self.jitter, 1 + self.jitter)
+            fail = self.rng.random() < self.failure_rate
+        if self.latency:
+            time.sleep(self.latency * spread)
+        return fail
+
+    def create_account(self, branch, owners, caption, currency, is_default):
+        with self.lock:
+            account = {
+                "id": str(len(self.accounts) + 1),
+                "branch": self.branches[branch],
+                "owner": ", ".join(self.names[o] for o in owners),
+                "caption": caption,
+                "currency": currency,
+                "default": "Yes" if is_default else "No",
+                "balance": 0.0,
+            }
+            self.accounts.append(account)
+            return account
+
+    def account(self, account_id):
+        return next((a for a in self.accounts if a["id"] == account_id), None)
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    # --- plumbing ---
+    def session(self):
+        for part in self.headers.get("Cookie", "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == COOKIE and value in self.state.sessions:
+                return value
+        return None
+
+    def send(self, status, body="", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def redirect(self, location, headers=None):
+        self.send(302, "", {"Location": location, **(headers or {})})
+
+    def page(self, body, errors=(), status=200, script=""):
+        session = self.session()
+        csrf = self.state.sessions.get(session, "")
+        alert = ""
+        if errors:
+            items = "".join(f"<li>{esc(e)}</li>" for e in errors)
+            alert = f'<div class="alert alert-danger"><ul>{items}</ul></div>'
+        self.send(status, LAYOUT.format(csrf=esc(csrf), errors=alert, body=body) + script)
+
+    def form_data(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return parse_qs(self.rfile.read(length).decode("utf-8"), keep_blank_values=True)
+
+    def csrf_field(self):
+        return f'<input type="hidden" name="_csrf" value="{esc(self.state.sessions[self.session()])}">'
+
+    def handle_request(self, method):
+        path = urlsplit(self.path).path
+        data = self.form_data() if method == "POST" else {}
+        if self.state.delay():
+            return self.send(500, "<h1>Internal Server Error</h1>")
+        if path == "/auth/login":
+            return self.login(method, data)
+        if not self.session():
+            return self.redirect("/auth/login")
+        if method == "POST" and data.get("_csrf", [""])[0] != self.state.sessions[self.session()]:
+            return self.send(419, "<h1>Page Expired</h1>")
+        for pattern, handler in ROUTES:
+            match = re.fullmatch(pattern, path)
+            if match:
+                return handler(self, method, data, *match.groups())
+        self.send(404, "<h1>Not Found</h1>")
+
+    def do_GET(self):
+        self.handle_request("GET")
+
+    def do_POST(self):
+        self.handle_request("POST")
+
+    # --- pages ---
+    def login(self, method, data):
+        errors = []
+        if method == "POST":
+            if data.get("email", [""])[0] == EMAIL and data.get("password", [""])[0] == PASSWORD:
+                session = secrets.token_hex(16)
+                self.state.sessions[session] = secrets.token_hex(16)
+                return self.redirect("/dashboard", {"Set-Cookie": f"{COOKIE}={session}; Path=/; HttpOnly"})
+            errors = ["These credentials do not match our records."]
+        self.page('<form id="signin-form" method="post" action="/auth/login">'
+                  '<input id="email" name="email" type="email"><input id="password" name="password" type="password">'
+                  '<button type="submit">Sign in</button></form>', errors)
+
+    def dashboard(self, method, data):
+        self.page("<h1>Dashboard</h1>")
+
+    def account_create(self, method, data):
+        errors = []
+        if method == "POST":
+            branch = data.get("branch", [""])[0]
+            owners = [o for o in data.get("owners[]", []) if o in self.state.names]
+            caption = data.get("display_name", [""])[0].strip()
+            currency = data.get("currency", [""])[0]
+            if branch not in self.state.branches:
+                errors.append("Branch is invalid.")
+            if not caption:
+                errors.append("Display Name cannot be blank.")
+            if currency != "EUR":
+                errors.append("Currency cannot be blank.")
+            if not owners:
+                errors.append("Owners cannot be blank.")
+            if not errors:
+                self.state.create_account(branch, owners, caption, currency, "is_default" in data)
+                return self.redirect("/user-finance-account/index")
+        branches = "".join(f'<option value="{esc(v)}">{esc(n)}</option>' for v, n in self.state.branches.items())
+        owners = "".join(f'<option value="{esc(bp_id)}" data-branch="{esc(branch)}">{esc(name)}</option>'
+                         for branch, bps in self.state.billpayers.items() for bp_id, name in bps)
+        body = (f'<form method="post" action="/user-finance-account/create">{self.csrf_field()}'
+                f'<select name="branch">{branches}</select>'
+                '<input id="display_name" name="display_name" type="text">'
+                '<select name="currency"><option value="">Select…</option><option value="EUR">EUR</option></select>'
+                '<input id="is_default" name="is_default" type="checkbox" value="1" checked style="display:none">'
+                '<div class="bootstrap-switch-wrapper bootstrap-switch-on" data-for="is_default"></div>'
+                f'<select id="owners" name="owners[]" multiple style="display:none">{owners}</select>'
+                '<span class="select2 select2-container"><span class="select2-selection select2-selection--multiple">'
+                '<ul class="select2-selection__rendered"></ul></span></span>'
+                '<input type="submit" value="Create"></form>')
+        delay = int(self.state.latency * 1000)
+        self.page(body, errors, script=SWITCH_JS + SELECT2_JS.replace("RESULTS_DELAY", str(delay)))
+
+    def account_index(self, method, data):
+        query = parse_qs(urlsplit(self.path).query)
+        page = max(1, int(query.get("page", ["1"])[0]))
+        accounts = list(reversed(self.state.accounts))
+        rows = "".join(
+            f'<tr id="ufa_{a["id"]}"><td>{a["id"]}</td><td>{esc(a["branch"])}</td><td>{esc(a["owner"])}</td>'
+            f'<td>{esc(a["caption"])}</td><td>{a["currency"]}</td><td>{a["default"]}</td>'
+            f'<td>€{a["balance"]:.2f}</td><td>€{a["balance"]:.2f}</td></tr>'
+            for a in accounts[(page - 1) * PAGE_SIZE:page * PAGE_SIZE])
+        pager = ""
+        if page * PAGE_SIZE < len(accounts):
+            pager = f'<ul class="pagination"><li class="next"><a href="/user-finance-account/index?page={page + 1}">»</a></li></ul>'
+        self.page('<table class="table"><thead><tr><th>#</th><th>Branch</th><th>Owners</th><th>Caption</th>'
+                  '<th>Currency</th><th>Default</th><th>Balance</th><th>Available Funds</th></tr></thead>'
+                  f'<tbody>{rows}</tbody></table>{pager}')
+
+    def account_view(self, method, data, account_id):
+        account = self.state.account(account_id)
+        if not account:
+            return self.send(404, "<h1>Not Found</h1>")
+        self.page(f'<h1>{esc(account["caption"])}</h1><p class="balance">€{account["balance"]:.2f}</p>')
+
+    def transaction(self, method, data, account_id, tx_type):
+        account = self.state.account(account_id)
+        if not account:
+            return self.send(404, "<h1>Not Found</h1>")
+        errors = []
+        if method == "POST":
+            try:
+                value = float(data.get("value", [""])[0])
+                if value <= 0:
+                    raise ValueError
+            except ValueError:
+                errors.append("Value must be a number greater than 0.")
+            if not errors:
+                with self.state.lock:
+                    account["balance"] += value if tx_type == "deposit" else -value
+                return self.redirect(f"/user-finance-account/{account_id}")
+        self.page(f'<form method="post" action="/user-finance-account/{account_id}/transaction/{tx_type}">'
+                  f'{self.csrf_field()}<input name="value" type="text"><textarea name="description"></textarea>'
+                  '<input name="received_at" type="text"><input type="submit" value="Add"></form>', errors)
+
+    def guardian_edit(self, method, data, guardian_id):
+        if guardian_id not in self.state.guardians:
+            return self.send(404, "<h1>Not Found</h1>")
+        if method == "POST":
+            self.state.guardians[guardian_id] = "enabled" in data
+            return self.redirect(f"/guardian/{guardian_id}")
+        on = self.state.guardians[guardian_id]
+        self.page(f'<form method="post" action="/guardian/{guardian_id}/edit">{self.csrf_field()}'
+                  f'<input id="enabled" name="enabled" type="checkbox" value="1" {"checked" if on else ""} style="display:none">'
+                  f'<div class="bootstrap-switch-wrapper bootstrap-switch-{"on" if on else "off"}" data-for="enabled" data-confirm="1"></div>'
+                  '<button type="submit">Save</button></form>', script=SWITCH_JS)
+
+    def guardian_view(self, method, data, guardian_id):
+        enabled = self.state.guardians.get(guardian_id)
+        self.page(f'<h1>{esc(self.state.names.get(guardian_id, ""))}</h1><p>{"Enabled" if enabled else "Disabled"}</p>')
+
+
+ROUTES = [
+    (r"/dashboard", StandinHandler.dashboard),
+    (r"/user-finance-account/create", StandinHandler.account_create),
+    (r"/user-finance-account/index", StandinHandler.account_index),
+    (r"/user-finance-account/(\d+)", StandinHandler.account_view),
+    (r"/user-finance-account/(\d+)/transaction/(deposit|withdrawal)", StandinHandler.transaction),
+    (r"/guardian/(\d+)/edit", StandinHandler.guardian_edit),
+    (r"/guardian/(\d+)", StandinHandler.guardian_view),
+]
+
+
+def start_server(state, host="127.0.0.1", port=0):
+    server = ThreadingHTTPServer((host, port), StandinHandler)
+    server.daemon_threads = True
+    server.state = state
+    thread = threading.Thread(target=server.serve_forever, name="standin", daemon=True)
+    thread.start()
+    return server
+
+
+def build_state(branches=1, billpayers=100, latency=0.0, failure_rate=0.0, seed=0):
+    pool = synthetic_billpayers(branches * billpayers, seed)
+    by_branch = {}
+    for b in range(branches):
+        by_branch[str(b + 1)] = (f"Branch {b + 1}", pool[b * billpayers:(b + 1) * billpayers])
+    return StandinState(by_branch, latency=latency, failure_rate=failure_rate, seed=seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the ChildPaths pages the scripts use.")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--branches", type=int, default=1)
+    parser.add_argument("--billpayers", type=int, default=100, help="billpayers per branch")
+    parser.add_argument("--latency", type=float, default=0.0, help="mean seconds added to every request")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of requests answered with a 500")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    state = build_state(args.branches, args.billpayers, args.latency, args.failure_rate, args.seed)
+    server = start_server(state, port=args.port)
+    print(f"🧪 Stand-in ChildPaths on http://127.0.0.1:{server.server_port} ({EMAIL} / {PASSWORD})")
+    print(f"   export CHILDPATHS_URL=http://127.0.0.1:{server.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import csv
+from aliases import CONFIRMED, EXPORT_HEADER, SKIPPED, AliasStore
+
+# Remembered decisions must follow the branch's billpayer list: gone ids are
+# dropped, renamed billpayers are followed, and imports never bring in a
+# confirmed name prune() could not check.
+
+
+def test_lookup_is_per_branch_and_normalized(tmp_path):
+    store = AliasStore(str(tmp_path / "aliases.json"))
+    store.record("1", "Ann  Lee", "Ann Lee", "select2-owners-result-ab12-1001")
+    store.record("1", "Mystery", None)
+    assert store.lookup(1, "ann lee")["id"] == "1001"
+    assert store.lookup("1", "Mystery")["decision"] == SKIPPED
+    assert store.lookup("2", "Ann Lee") is None
+    # Written through: a second store sees the same decisions
+    assert len(AliasStore(str(tmp_path / "aliases.json"))) == 2
+
+
+def test_prune_drops_gone_ids_and_follows_renames(tmp_path):
+    store = AliasStore(str(tmp_path / "aliases.json"))
+    store.record("1", "Ann Lee", "Ann Lee", "select2-x-1001")
+    store.record("1", "Bob", "Bob Stone", "select2-x-1002")
+    store.record("1", "Mystery", None)
+    store.record("2", "Cy", "Cy Moss", "select2-x-2001")
+    current = [("Ann Lee-Smith", "select2-owners-result-zz99-1001")]
+    assert store.prune("1", current) == 1
+    assert store.lookup("1", "Ann Lee")["billpayer"] == "Ann Lee-Smith"
+    assert store.lookup("1", "Bob") is None
+    # Skips and other branches are left alone
+    assert store.lookup("1", "Mystery")["decision"] == SKIPPED
+    assert store.lookup("2", "Cy")["decision"] == CONFIRMED
+    assert AliasStore(str(tmp_path / "aliases.json")).lookup("1", "Ann Lee")["billpayer"] == "Ann Lee-Smith"
+
+
+def test_export_import_round_trip(tmp_path):
+    store = AliasStore(str(tmp_path / "aliases.json"))
+    store.record("1", "Ann Lee", "Ann Lee", "select2-x-1001")
+    store.record("2", "Mystery", None)
+    path = tmp_path / "aliases.csv"
+    assert store.export_csv(str(path)) == 2
+
+    copy = AliasStore(str(tmp_path / "copy.json"))
+    assert copy.import_csv(str(path)) == 2
+    assert copy.entries == store.entries
+
+
+def test_import_skips_confirmed_rows_without_id(tmp_path):
+    path = tmp_path / "aliases.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(EXPORT_HEADER)
+        writer.writerow(["1", "Ann Lee", "Ann Lee", "", CONFIRMED, ""])
+        writer.writerow(["1", "Bob", "Bob Stone", "1002", CONFIRMED, ""])
+        writer.writerow(["1", "Mystery", "", "", SKIPPED, ""])
+        writer.writerow(["", "Nobody", "", "", SKIPPED, ""])
+    store = AliasStore(str(tmp_path / "aliases.json"))
+    assert store.import_csv(str(path)) == 2
+    assert store.lookup("1", "Ann Lee") is None
+    assert store.lookup("1", "Bob")["id"] == "1002"
+    assert store.lookup("1", "Mystery")["decision"] == SKIPPED
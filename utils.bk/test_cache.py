@@ -0,0 +1,118 @@
+import json
+import shutil
+import subprocess
+import time
+import pytest
+import cache
+from cache import SCRAPE_JS, get_billpayers, load_cache
+
+# A fresh entry never touches the page, a stale one is probed and kept when
+# the checksum still matches, and the checksum ignores the per-page token in
+# select2 option ids.
+
+OPTIONS = [["Ann Lee", "select2-owners-result-ab12-1001"], ["Bob Stone", "select2-owners-result-ab12-1002"]]
+
+
+def scraped(options=OPTIONS, checksum="111", branch="Branch 1", full=True):
+    return {"count": len(options), "checksum": checksum, "options": options if full else None, "branch": branch}
+
+
+class FakeDriver:
+    # Answers the full scrape a stale probe falls back to
+    def __init__(self, result=None):
+        self.result = result
+        self.scripts = 0
+
+    def execute_script(self, script, full):
+        self.scripts += 1
+        return self.result
+
+
+@pytest.fixture
+def probes(monkeypatch):
+    # scrape() opens the select2 dropdown first, which needs a real page
+    calls = []
+
+    def fake_scrape(driver, full=True):
+        calls.append(full)
+        return driver.result if full else driver.probe
+
+    monkeypatch.setattr(cache, "scrape", fake_scrape)
+    return calls
+
+
+def seed_cache(path, age, **entry):
+    entry = {"fetched_at": time.time() - age, "count": 2, "checksum": "111", "branch": "Branch 1",
+             "billpayers": OPTIONS, **entry}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"1": entry}, f)
+
+
+def quiet(message):
+    pass
+
+
+def test_fresh_entry_skips_the_page(tmp_path, probes):
+    path = str(tmp_path / "cache.json")
+    seed_cache(path, age=10)
+    driver = FakeDriver()
+    assert get_billpayers(driver, 1, path=path, log=quiet) == [tuple(bp) for bp in OPTIONS]
+    assert probes == [] and driver.scripts == 0
+
+
+def test_unchanged_probe_renews_the_entry(tmp_path, probes):
+    path = str(tmp_path / "cache.json")
+    seed_cache(path, age=120)
+    driver = FakeDriver()
+    driver.probe = scraped(full=False)
+    assert get_billpayers(driver, "1", ttl=60, path=path, log=quiet) == [tuple(bp) for bp in OPTIONS]
+    assert probes == [False] and driver.scripts == 0
+    assert time.time() - load_cache(path)["1"]["fetched_at"] < 60
+
+
+def test_changed_probe_scrapes_again(tmp_path, probes):
+    path = str(tmp_path / "cache.json")
+    seed_cache(path, age=120)
+    options = OPTIONS + [["Cy Moss", "select2-owners-result-ab12-1003"]]
+    driver = FakeDriver(scraped(options, checksum="222"))
+    driver.probe = scraped(options, checksum="222", full=False)
+    assert get_billpayers(driver, "1", ttl=60, path=path, log=quiet) == [tuple(bp) for bp in options]
+    assert probes == [False] and driver.scripts == 1
+    assert load_cache(path)["1"]["checksum"] == "222"
+
+
+def test_entry_without_branch_scrapes_again(tmp_path, probes):
+    path = str(tmp_path / "cache.json")
+    seed_cache(path, age=10, branch=None)
+    driver = FakeDriver(scraped())
+    get_billpayers(driver, "1", path=path, log=quiet)
+    assert probes == [True]
+    assert load_cache(path)["1"]["branch"] == "Branch 1"
+
+
+# Runs SCRAPE_JS under node against a stub document of select2 options
+NODE_HARNESS = """
+const options = JSON.parse(process.argv[1]);
+global.document = {
+    querySelector: () => ({selectedIndex: 0, options: [{text: ' Branch 1 '}]}),
+    querySelectorAll: () => options.map(([name, id]) => ({innerText: name, id: id})),
+};
+console.log(JSON.stringify(new Function(SCRAPE_JS)()));
+"""
+
+
+def run_scrape_js(options):
+    script = f"const SCRAPE_JS = {json.dumps(SCRAPE_JS.replace('arguments[0]', 'false'))};" + NODE_HARNESS
+    output = subprocess.run(["node", "-e", script, json.dumps(options)], capture_output=True, text=True,
+                            check=True, timeout=30).stdout
+    return json.loads(output)
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node")
+def test_checksum_ignores_the_per_page_token():
+    first = run_scrape_js(OPTIONS)
+    reloaded = run_scrape_js([[name, element_id.replace("ab12", "cd34")] for name, element_id in OPTIONS])
+    renamed = run_scrape_js([["Ann Lee-Smith", OPTIONS[0][1]], OPTIONS[1]])
+    assert first["count"] == 2 and first["options"] is None and first["branch"] == "Branch 1"
+    assert reloaded["checksum"] == first["checksum"]
+    assert renamed["checksum"] != first["checksum"]
@@ -0,0 +1,41 @@
+import random
+from executor import group_by_billpayer, shard_by_billpayer
+
+# Rows of one billpayer share an account, so they must never be split across
+# sessions, and each session posts them in CSV order.
+
+
+def csv_jobs(count, names, seed):
+    rng = random.Random(seed)
+    return [(seq, rng.choice(names), {"Amount": str(seq)}) for seq in range(count)]
+
+
+def test_group_by_billpayer_keeps_first_appearance_order():
+    jobs = [(0, "B", {}), (1, "A", {}), (2, "B", {})]
+    assert group_by_billpayer(jobs) == [[(0, "B", {}), (2, "B", {})], [(1, "A", {})]]
+
+
+def test_every_billpayer_lands_in_one_shard():
+    names = [f"Billpayer {i}" for i in range(25)]
+    jobs = csv_jobs(300, names, seed=3)
+    for workers in (1, 2, 4, 7):
+        shards = shard_by_billpayer(jobs, workers)
+        assert len(shards) <= workers
+        assert sorted(job for shard in shards for job in shard) == jobs
+        owners = {}
+        for i, shard in enumerate(shards):
+            assert [job[0] for job in shard] == sorted(job[0] for job in shard)
+            for _, name, _ in shard:
+                assert owners.setdefault(name, i) == i
+
+
+def test_shards_are_balanced_by_rows():
+    jobs = [(seq, f"Billpayer {seq % 8}", {}) for seq in range(80)]
+    assert [len(shard) for shard in shard_by_billpayer(jobs, 4)] == [20] * 4
+
+
+def test_empty_shards_are_dropped():
+    jobs = [(0, "A", {}), (1, "A", {}), (2, "B", {})]
+    assert shard_by_billpayer(jobs, 5) == [[(0, "A", {}), (1, "A", {})], [(2, "B", {})]]
+    assert shard_by_billpayer([], 3) == []
+    assert shard_by_billpayer(jobs, 0) == [jobs]
@@ -0,0 +1,113 @@
+import json
+import pytest
+from journal import UNCERTAIN, Journal, UncheckedSteps
+
+# Replaying the journal is what lets a resumed run skip posted steps and hold
+# back the ones that may have posted, so it is checked against hand-written
+# files, torn last line included.
+
+
+def write_journal(path, entries, tail=""):
+    with open(path, "w", encoding="utf-8") as f:
+        for entry in entries:
+            f.write(json.dumps(entry) + "\n")
+        f.write(tail)
+
+
+def test_replay_restores_steps_accounts_and_matches(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_journal(path, [
+        {"event": "planned", "key": "0-a:deposit", "step": "deposit"},
+        {"event": "finished", "key": "0-a:deposit", "status": "OK"},
+        {"event": "planned", "key": "0-a:withdrawal", "step": "withdrawal"},
+        {"event": "planned", "key": "1-b:deposit", "step": "deposit"},
+        {"event": "finished", "key": "1-b:deposit", "status": UNCERTAIN},
+        {"event": "account", "billpayer": "Ann Lee", "account_id": "7", "branch": "1"},
+        {"event": "account", "billpayer": "Ann Lee", "account_id": "9", "branch": "2"},
+        {"event": "match", "name": "Ann Le", "billpayer": "Ann Lee"},
+    ])
+    journal = Journal(str(path), resume=True)
+    assert journal.is_done("0-a:deposit")
+    assert journal.needs_check("0-a:withdrawal")
+    assert journal.needs_check("1-b:deposit")
+    assert [entry["key"] for entry in journal.unchecked()] == ["0-a:withdrawal", "1-b:deposit"]
+    assert journal.account_for("Ann Lee", "1") == "7"
+    assert journal.account_for("Ann Lee", "2") == "9"
+    assert journal.matches == {"Ann Le": "Ann Lee"}
+    journal.close()
+
+
+def test_planned_again_supersedes_earlier_outcome(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_journal(path, [
+        {"event": "planned", "key": "0-a:deposit", "step": "deposit"},
+        {"event": "finished", "key": "0-a:deposit", "status": "OK"},
+        {"event": "planned", "key": "0-a:deposit", "step": "deposit"},
+    ])
+    journal = Journal.read(str(path))
+    assert not journal.is_done("0-a:deposit")
+    assert journal.needs_check("0-a:deposit")
+
+
+def test_torn_last_line_is_dropped_and_truncated(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    entries = [
+        {"event": "planned", "key": "0-a:deposit", "step": "deposit"},
+        {"event": "finished", "key": "0-a:deposit", "status": "OK"},
+    ]
+    write_journal(path, entries, tail='{"event": "finished", "key": "1-b:dep')
+    intact = sum(len(json.dumps(entry)) + 1 for entry in entries)
+
+    # Reading only looks; it leaves the file as it is
+    assert Journal.read(str(path)).is_done("0-a:deposit")
+    assert path.stat().st_size > intact
+
+    journal = Journal(str(path), resume=True)
+    assert journal.is_done("0-a:deposit")
+    assert "1-b:deposit" not in journal.done
+    journal.finished("1-b:deposit", "OK")
+    journal.close()
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 3
+    assert json.loads(lines[-1])["key"] == "1-b:deposit"
+
+
+def test_complete_line_without_newline_counts_as_torn(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_journal(path, [], tail=json.dumps({"event": "finished", "key": "0-a:deposit", "status": "OK"}))
+    journal = Journal(str(path), resume=True)
+    assert not journal.is_done("0-a:deposit")
+    assert path.stat().st_size == 0
+    journal.close()
+
+
+def test_fresh_run_refuses_to_overwrite_unchecked_steps(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_journal(path, [{"event": "planned", "key": "0-a:deposit", "step": "deposit"}])
+    with pytest.raises(UncheckedSteps) as e:
+        Journal(str(path))
+    assert e.value.count == 1
+    assert path.read_text(encoding="utf-8")
+
+
+def test_fresh_run_starts_over_a_checked_journal(tmp_path):
+    path = tmp_path / "journal.jsonl"
+    write_journal(path, [
+        {"event": "planned", "key": "0-a:deposit", "step": "deposit"},
+        {"event": "finished", "key": "0-a:deposit", "status": "OK"},
+    ])
+    journal = Journal(str(path))
+    assert not journal.done
+    journal.close()
+    assert path.read_text(encoding="utf-8") == ""
+
+
+def test_in_memory_journal_writes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    journal = Journal(None)
+    journal.record_account("Ann Lee", "7", "1")
+    journal.finished("0-a:deposit", "OK")
+    assert journal.account_for("Ann Lee", "1") == "7"
+    assert journal.account_for("Ann Lee") is None
+    assert journal.is_done("0-a:deposit")
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,46 @@
+import random
+from difflib import SequenceMatcher
+from matcher import THRESHOLDS, BillpayerMatcher
+from standin import FIRST_NAMES, LAST_NAMES, synthetic_billpayers
+
+# Blocking must never change what the scripts do with a name: skip it,
+# prompt for it, or accept it automatically. Checked against scoring every
+# billpayer, on more billpayers than the matcher keeps as candidates.
+
+
+def brute_force(billpayers, name):
+    return max((SequenceMatcher(None, name.lower(), bp.lower()).ratio(), bp) for bp, _ in billpayers)
+
+
+def decision(score):
+    return sum(score >= threshold for threshold in THRESHOLDS)
+
+
+def csv_names(billpayers, seed):
+    rng = random.Random(seed)
+    names = [bp for bp, _ in rng.sample(billpayers, 60)]
+    for name in list(names[:40]):
+        i = rng.randrange(len(name))
+        names.append(name[:i] + name[i + 1:])          # dropped letter
+        names.append(name.upper())
+    for _ in range(80):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        names += [f"{first} {last}", f"{last} {first}", f"{first[:3]} {last}"]
+    names += ["Tommy Davis", "Ann Smith", "Jo", "Zzzz Qqqq"]
+    return list(dict.fromkeys(names))
+
+
+def test_blocked_decisions_match_full_scan():
+    billpayers = [(name, f"select2--result-test-{bp_id}") for bp_id, name in synthetic_billpayers(300, seed=1)]
+    matcher = BillpayerMatcher(billpayers)
+    assert len(matcher) > matcher.candidates
+    for name in csv_names(billpayers, seed=2):
+        score, best = brute_force(billpayers, name)
+        matches = matcher.match(name)
+        assert decision(matches[0][0]) == decision(score), name
+        if decision(score) == 2:
+            assert matches[0][1] == best, name
+        elif decision(score) == 1:
+            # The prompt shows the top five; the best billpayer must be there
+            # with its full-scan score
+            assert (score, best) in [(s, bp) for s, bp, _ in matches[:5]], name
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+from journal import Journal, row_key
+from planner import DEFAULT_COSTS, compile_plan, plan_is_stale, plan_jobs, plan_steps, row_problems, row_steps
+
+# The plan is what a dry run prints and a --plan run posts, so it must agree
+# with what RowPoster would have worked out from the rows themselves.
+
+
+def test_row_steps():
+    assert row_steps({"Amount": "12.5"}) == [("deposit", 12.5)]
+    assert row_steps({"Amount": "12.5", "Is Returned": "Yes"}) == [("deposit", 12.5), ("withdrawal", 12.5)]
+    assert row_steps({"Amount": "0"}) == [("deposit", 0.01), ("withdrawal", 0.01)]
+    assert row_steps({"Amount": ""}) == [("deposit", 0.01), ("withdrawal", 0.01)]
+    assert row_steps({"Amount": "3", "Is Returned": "yes", "Step": "withdrawal"}) == [("withdrawal", 3.0)]
+
+
+def test_row_problems():
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "5", "Date": "01/02/2024"}) == []
+    assert row_problems({"Bill Payer": " ", "Amount": "5"}) == ["no Bill Payer"]
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "five"}) == ["Amount 'five' is not a number"]
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "-5"}) == ["Amount -5 is negative"]
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "5", "Is Returned": "maybe"}) == \
+        ["Is Returned 'maybe' is not Yes or No"]
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "5", "Date": "2024-02-01"}) == \
+        ["Date '2024-02-01' is not dd/mm/yyyy"]
+    assert row_problems({"Bill Payer": "Ann Lee", "Amount": "5", "Step": "withdrawal"}) == \
+        ["Step 'withdrawal' is not a step of this row"]
+
+
+def jobs():
+    return [
+        (0, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "10", "Is Returned": "Yes"}),
+        (1, "Bob Stone", {"Bill Payer": "Bob Stone", "Amount": "4"}),
+        (2, None, {"Bill Payer": "Nobody", "Amount": "1"}),
+        (3, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "10", "Is Returned": "Yes"}),
+    ]
+
+
+def test_compile_plan():
+    journal = Journal(None)
+    journal.record_account("Bob Stone", "8", "1")
+    journal.finished(f"{row_key(0, jobs()[0][2])}:deposit", "OK")
+    lookups = []
+
+    def find_account(name, branch):
+        lookups.append((name, branch))
+        return "5" if name == "Ann Lee" else None
+
+    plan = compile_plan(jobs(), "1", {"Ann Lee": "1001"}, journal, find_account)
+    assert plan["server_state"]
+    # The journal's account is used without asking the index
+    assert plan["accounts"] == {"create": [], "existing": {"Ann Lee": "5", "Bob Stone": "8"}}
+    assert lookups == [("Ann Lee", "1")]
+    assert plan["dropped"] == [f"{row_key(0, jobs()[0][2])}:deposit"]
+    assert plan["skipped"] == [{"seq": 2, "name": "Nobody"}]
+    assert plan["duplicates"] == [[0, 3]]
+    assert plan_steps(plan) == {0: [("withdrawal", 10.0)], 1: [("deposit", 4.0)],
+                                3: [("deposit", 10.0), ("withdrawal", 10.0)]}
+    assert list(plan_jobs(plan)) == jobs()
+    assert plan["estimate"]["steps"] == {"create_account": 0, "get_account_id": 0, "deposit": 2, "withdrawal": 2}
+
+
+def test_compile_plan_without_server_state():
+    plan = compile_plan(jobs(), "1", {}, Journal(None), workers=2)
+    assert not plan["server_state"]
+    assert plan["accounts"]["create"] == ["Ann Lee", "Bob Stone"]
+    estimate = plan["estimate"]
+    creates = 2 * (DEFAULT_COSTS["create_account"] + DEFAULT_COSTS["get_account_id"])
+    assert estimate["wall_seconds"] == creates + (estimate["serial_seconds"] - creates) / 2
+    assert plan_is_stale(plan)
+
+
+def test_plan_is_stale():
+    plan = compile_plan(jobs(), "1", {}, Journal(None), lambda name, branch: None)
+    assert not plan_is_stale(plan)
+    plan["created_at"] = (datetime.now() - timedelta(hours=2)).isoformat(timespec="seconds")
+    assert plan_is_stale(plan)
+    assert not plan_is_stale(plan, max_age=3 * 60 * 60)
@@ -0,0 +1,116 @@
+import csv
+import requests
+from retries import SKIPPED, DeadLetter, RetryPolicy, StepFailure, UncertainPost, classify, retryable
+
+# What gets retried, what is given up on and what must never be sent twice.
+
+
+def http_error(status, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response.headers.update(headers or {})
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def policy(attempts=4):
+    waits = []
+    return RetryPolicy(attempts=attempts, log=lambda message: None, sleep=waits.append), waits
+
+
+def test_classify():
+    assert classify(http_error(503)).transient
+    limited = classify(http_error(429, {"Retry-After": "7"}))
+    assert limited.transient and limited.retry_after == 7.0
+    assert classify(http_error(429, {"Retry-After": "soon"})).retry_after is None
+    assert not classify(http_error(404)).transient
+    assert classify(requests.ConnectionError("refused")).transient
+    assert classify(requests.Timeout("slow")).transient
+    uncertain = classify(UncertainPost("no answer"))
+    assert uncertain.uncertain and not uncertain.transient
+    permanent = classify(ValueError("bad amount"))
+    assert not permanent.transient and not permanent.uncertain
+    assert permanent.error == "ValueError: bad amount"
+
+
+def test_call_retries_transient_failures_only():
+    retry_policy, waits = policy()
+    results = [StepFailure("503", transient=True), StepFailure("503", transient=True), "42"]
+    assert retry_policy.call(lambda: results.pop(0), "create_account") == "42"
+    assert len(waits) == 2
+
+    retry_policy, waits = policy()
+    calls = []
+    result = retry_policy.call(lambda: calls.append(1) or StepFailure("rejected"), "create_account")
+    assert not result and calls == [1] and waits == []
+
+    retry_policy, waits = policy()
+    calls = []
+    retry_policy.call(lambda: calls.append(1) or StepFailure("lost", uncertain=True), "create_account")
+    assert calls == [1]
+
+
+def test_call_gives_up_after_attempts():
+    retry_policy, waits = policy(attempts=3)
+    calls = []
+    result = retry_policy.call(lambda: calls.append(1) or StepFailure("503", transient=True), "deposit")
+    assert not result and len(calls) == 3 and len(waits) == 2
+
+
+def test_delay_honours_retry_after_and_cap():
+    retry_policy, _ = policy()
+    assert retry_policy.delay(1, [StepFailure("429", transient=True, retry_after=5)]) == 5
+    assert retry_policy.delay(1, [StepFailure("429", transient=True, retry_after=999)]) == retry_policy.cap
+    assert all(0 <= retry_policy.delay(attempt) <= retry_policy.cap for attempt in range(1, 10))
+
+
+def test_post_resends_only_failed_items():
+    retry_policy, waits = policy()
+    items = [
+        ("deposit", 10.0, "", "", None),
+        ("withdrawal", 10.0, "", "", 0),
+        ("deposit", 5.0, "", "", None),
+    ]
+    batches = []
+    answers = [[True, StepFailure("503", transient=True), StepFailure("503", transient=True)], [True, True]]
+
+    def post(batch):
+        batches.append(batch)
+        return answers.pop(0)
+
+    # The withdrawal's deposit already went through, so it is resent on its own
+    assert retry_policy.post(post, items) == [True, True, True]
+    assert batches[1] == [("withdrawal", 10.0, "", "", None), ("deposit", 5.0, "", "", None)]
+    assert len(waits) == 1
+
+
+def test_post_keeps_dependents_with_their_deposit():
+    retry_policy, _ = policy()
+    items = [("deposit", 10.0, "", "", None), ("withdrawal", 10.0, "", "", 0)]
+    batches = []
+    answers = [[StepFailure("503", transient=True), SKIPPED], [True, True]]
+
+    def post(batch):
+        batches.append(batch)
+        return answers.pop(0)
+
+    assert retry_policy.post(post, items) == [True, True]
+    # The resent withdrawal points at the deposit's new position
+    assert batches[1] == [("deposit", 10.0, "", "", None), ("withdrawal", 10.0, "", "", 0)]
+
+
+def test_retryable_skips_dependents_of_permanent_failures():
+    items = [("deposit", 10.0, "", "", None), ("withdrawal", 10.0, "", "", 0)]
+    assert retryable(items, [StepFailure("rejected"), SKIPPED]) == []
+    assert retryable(items, [True, StepFailure("lost", uncertain=True)]) == []
+
+
+def test_dead_letter_writes_input_columns(tmp_path):
+    path = tmp_path / "dead_letter.csv"
+    dead_letter = DeadLetter(str(path))
+    assert not path.exists()
+    dead_letter.write({"Bill Payer": "Ann Lee", "Amount": "5", "Step": "old"}, "HTTP 503", "withdrawal")
+    dead_letter.close()
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert rows == [{"Bill Payer": "Ann Lee", "Amount": "5", "Step": "withdrawal", "Error": "HTTP 503"}]
+    assert dead_letter.count == 1
@@ -0,0 +1,118 @@
+import threading
+import time
+import pytest
+import requests
+from throttle import Throttle
+
+# The token bucket caps requests per second; the AIMD limit on operations in
+# flight halves on errors or slow windows and grows only when it was used.
+
+
+def aimd(**kwargs):
+    # No rate ceiling, and windows that only close on their operation count
+    return Throttle(max_rps=0, window=4, window_seconds=60, **kwargs)
+
+
+def test_bucket_passes_a_burst_then_waits_for_tokens():
+    throttle = Throttle(max_rps=50, maximum=1)
+    started = time.monotonic()
+    throttle._take(50)
+    assert time.monotonic() - started < 0.1
+    throttle._take(25)
+    assert time.monotonic() - started == pytest.approx(0.5, abs=0.2)
+
+
+def test_batch_larger_than_bucket_waits_for_a_full_bucket():
+    throttle = Throttle(max_rps=50, maximum=1)
+    throttle._take(50)
+    started = time.monotonic()
+    throttle._take(100)
+    assert time.monotonic() - started == pytest.approx(1.0, abs=0.3)
+    assert throttle.tokens < 0
+
+
+def test_limit_grows_when_the_window_used_it():
+    throttle = aimd(maximum=4, initial=2)
+    for _ in range(2):
+        with throttle.operation():
+            with throttle.operation():
+                pass
+    assert throttle.limit == 3
+
+
+def test_limit_stays_when_the_window_did_not_use_it():
+    throttle = aimd(maximum=4, initial=2)
+    for _ in range(4):
+        with throttle.operation():
+            pass
+    assert throttle.limit == 2
+
+
+def test_limit_halves_on_errors():
+    throttle = aimd(maximum=8, initial=8)
+    for _ in range(4):
+        with throttle.operation() as op:
+            op["failed"] = True
+    assert throttle.limit == 4
+    for _ in range(4):
+        with pytest.raises(requests.ConnectionError):
+            with throttle.operation():
+                raise requests.ConnectionError("refused")
+    assert throttle.limit == 2
+    assert throttle.ops == throttle.errors == 0
+
+
+def test_permanent_errors_do_not_count():
+    throttle = aimd(maximum=8, initial=8)
+    for _ in range(4):
+        with pytest.raises(ValueError):
+            with throttle.operation():
+                raise ValueError("form rejected")
+    assert throttle.limit == 8
+
+
+def test_limit_halves_when_latency_climbs():
+    throttle = aimd(maximum=4, initial=4)
+    for _ in range(4):
+        with throttle.operation():
+            pass
+    for _ in range(4):
+        with throttle.operation():
+            time.sleep(0.02)
+    assert throttle.limit == 2
+
+
+def test_operations_wait_for_a_free_slot():
+    throttle = aimd(maximum=1)
+    entered, release = threading.Event(), threading.Event()
+    order = []
+
+    def first():
+        with throttle.operation():
+            entered.set()
+            release.wait(5)
+            order.append("first")
+
+    def second():
+        entered.wait(5)
+        with throttle.operation():
+            order.append("second")
+
+    threads = [threading.Thread(target=first), threading.Thread(target=second)]
+    for thread in threads:
+        thread.start()
+    entered.wait(5)
+    time.sleep(0.05)
+    assert order == []
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert order == ["first", "second"]
+
+
+def test_configure_caps_the_limit():
+    throttle = aimd(maximum=8, initial=6)
+    throttle.configure(maximum=3)
+    assert throttle.limit == 3
+    throttle.configure(initial=10)
+    assert throttle.limit == 3
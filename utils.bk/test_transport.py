@@ -0,0 +1,93 @@
+import pytest
+from accounts import AccountIndex
+from journal import Journal
+from posting import RowPoster
+from retries import DeadLetter, RetryPolicy
+from standin import EMAIL, PASSWORD, StandinState, start_server
+from transport import HttpTransport
+
+# HttpTransport and RowPoster against the stand-in server: the same forms,
+# CSRF tokens and index pages the scripts see, without a browser.
+
+
+def quiet(message):
+    pass
+
+
+@pytest.fixture
+def standin(tmp_path, monkeypatch):
+    # The session store writes under data/ in the working directory
+    monkeypatch.chdir(tmp_path)
+    state = StandinState({
+        "1": ("Branch 1", [("1001", "Ann Lee"), ("1002", "Bob Stone")]),
+        "2": ("Branch 2", [("2001", "Ann Lee")]),
+    })
+    server = start_server(state)
+    yield state, f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
+
+
+def logged_in(base_url):
+    transport = HttpTransport(base_url, log=quiet)
+    assert transport.login(EMAIL, PASSWORD)
+    return transport
+
+
+def poster(transport, branch_value, tmp_path, journal=None):
+    index = AccountIndex(branches=transport.list_branches()).load(transport.fetch_index)
+    return RowPoster(index, journal or Journal(None), branch_value,
+                     RetryPolicy(log=quiet, sleep=lambda s: None),
+                     DeadLetter(str(tmp_path / "dead_letter.csv")), log=quiet)
+
+
+def test_login_rejects_wrong_password(standin):
+    _, base_url = standin
+    assert not HttpTransport(base_url, log=quiet).login(EMAIL, "wrong")
+
+
+def test_list_branches(standin):
+    _, base_url = standin
+    assert logged_in(base_url).list_branches() == {"1": "Branch 1", "2": "Branch 2"}
+
+
+def test_rows_post_to_one_new_account(standin, tmp_path):
+    state, base_url = standin
+    transport = logged_in(base_url)
+    jobs = [
+        (0, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "10", "Is Returned": "No"}),
+        (1, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "5", "Is Returned": "Yes"}),
+        (2, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "0"}),
+    ]
+    report = poster(transport, "1", tmp_path).process_rows(transport, {}, jobs, owner_id="1001")
+    assert [r[3] for seq in (0, 1, 2) for r in report[seq]] == ["OK"] * 5
+    assert len(state.accounts) == 1
+    account = state.accounts[0]
+    assert (account["branch"], account["owner"]) == ("Branch 1", "Ann Lee")
+    assert account["balance"] == pytest.approx(10.0)
+
+
+def test_existing_account_is_reused_per_branch(standin, tmp_path):
+    state, base_url = standin
+    transport = logged_in(base_url)
+    job = [(0, "Ann Lee", {"Bill Payer": "Ann Lee", "Amount": "7"})]
+    poster(transport, "1", tmp_path).process_rows(transport, {}, job, owner_id="1001")
+    # A fresh index finds it again; the namesake in branch 2 gets its own
+    poster(transport, "1", tmp_path).process_rows(transport, {}, job, owner_id="1001")
+    poster(transport, "2", tmp_path).process_rows(transport, {}, job, owner_id="2001")
+    assert [(a["branch"], a["balance"]) for a in state.accounts] == [("Branch 1", 14.0), ("Branch 2", 7.0)]
+
+
+def test_rejected_row_goes_to_dead_letter(standin, tmp_path):
+    state, base_url = standin
+    transport = logged_in(base_url)
+    journal = Journal(None)
+    row_poster = poster(transport, "1", tmp_path, journal)
+    jobs = [(0, "Bob Stone", {"Bill Payer": "Bob Stone", "Amount": "-3", "Is Returned": "Yes"})]
+    report = row_poster.process_rows(transport, {}, jobs, owner_id="1002")
+    # The form refuses the deposit, so the withdrawal is never sent
+    assert [r[3] for r in report[0]] == ["FAILED"]
+    assert row_poster.dead_letter.count == 1
+    assert state.accounts[0]["balance"] == 0.0
+    assert journal.account_for("Bob Stone", "1") == state.accounts[0]["id"]
+    row_poster.dead_letter.close()
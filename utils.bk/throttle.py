@@ -0,0 +1,148 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from metrics import count, gauge
+from retries import classify, is_transient
+
+# === CONFIG ===
+# Ceiling for every request this process sends to ChildPaths
+MAX_RPS = float(os.getenv("CHILDPATHS_MAX_RPS", "5"))
+MAX_IN_FLIGHT = int(os.getenv("CHILDPATHS_MAX_IN_FLIGHT", "8"))
+WINDOW = 10  # operations per AIMD decision
+WINDOW_SECONDS = 5.0  # ... or this long, whichever comes first
+BACKOFF = 0.5  # multiplicative decrease
+ERROR_THRESHOLD = 0.1  # transient failures per operation that count as overload
+LATENCY_FACTOR = 2.0  # mean latency this far above the best seen counts as overload
+BASELINE_DRIFT = 1.05  # lets the best-seen latency creep up as the server's normal changes
+
+
+class Throttle:
+    """Request-rate ceiling plus an AIMD limit on operations in flight.
+
+    operation(requests) blocks until one of limit slots is free and the
+    token bucket holds requests tokens, then times the block it guards.
+    Every WINDOW operations the limit moves: halved when transient errors
+    or latency say the server is struggling, otherwise raised by one if
+    the window actually used all of it. Shared by every session of the
+    process, so adding sessions never adds load beyond what it allows.
+    """
+
+    def __init__(self, max_rps=MAX_RPS, maximum=MAX_IN_FLIGHT, initial=1, minimum=1, window=WINDOW,
+                 window_seconds=WINDOW_SECONDS, backoff=BACKOFF, error_threshold=ERROR_THRESHOLD,
+                 latency_factor=LATENCY_FACTOR):
+        self.max_rps = max_rps
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.limit = float(max(minimum, min(initial, self.maximum)))
+        self.window = window
+        self.window_seconds = window_seconds
+        self.backoff = backoff
+        self.error_threshold = error_threshold
+        self.latency_factor = latency_factor
+        self.cond = threading.Condition()
+        self.rate_lock = threading.Lock()
+        self.tokens = max_rps
+        self.refilled = time.monotonic()
+        self.in_flight = 0
+        self.baseline = None
+        self._reset_window()
+        self._publish()
+
+    def configure(self, maximum=None, initial=None, max_rps=None):
+        # Scripts cap the limit at the sessions they actually opened
+        with self.cond:
+            if max_rps is not None:
+                with self.rate_lock:
+                    self.max_rps = max_rps
+                    self.tokens = min(self.tokens, max_rps)
+            if maximum is not None:
+                self.maximum = max(self.minimum, maximum)
+            if initial is not None:
+                self.limit = float(initial)
+            self.limit = max(self.minimum, min(self.limit, self.maximum))
+            self._publish()
+            self.cond.notify_all()
+
+    def _reset_window(self):
+        self.ops = 0
+        self.errors = 0
+        self.latency = 0.0
+        self.peak = self.in_flight
+        self.window_started = time.monotonic()
+
+    def _publish(self):
+        gauge("throttle_limit", round(self.limit, 2))
+        gauge("throttle_in_flight", self.in_flight)
+        gauge("throttle_max_rps", self.max_rps)
+
+    def _take(self, n):
+        # Token bucket of one second's worth; a batch larger than that
+        # waits for a full bucket and drives it negative.
+        if not self.max_rps:
+            return
+        while True:
+            with self.rate_lock:
+                now = time.monotonic()
+                self.tokens = min(self.max_rps, self.tokens + (now - self.refilled) * self.max_rps)
+                self.refilled = now
+                if self.tokens >= min(n, self.max_rps):
+                    self.tokens -= n
+                    return
+                wait = (min(n, self.max_rps) - self.tokens) / self.max_rps
+            time.sleep(wait)
+
+    def _record(self, seconds, failed):
+        self.ops += 1
+        self.errors += int(failed)
+        self.latency += seconds
+        if self.ops < self.window and time.monotonic() - self.window_started < self.window_seconds:
+            return
+        mean = self.latency / self.ops
+        error_rate = self.errors / self.ops
+        self.baseline = mean if self.baseline is None else min(mean, self.baseline * BASELINE_DRIFT)
+        if error_rate > self.error_threshold or mean > self.baseline * self.latency_factor:
+            self.limit = max(self.minimum, self.limit * self.backoff)
+            count("throttle_decreases")
+        elif self.peak >= int(self.limit):
+            self.limit = min(self.maximum, self.limit + 1)
+        gauge("throttle_latency_seconds", round(mean, 3))
+        gauge("throttle_error_rate", round(error_rate, 3))
+        self._reset_window()
+
+    @contextmanager
+    def operation(self, requests=1):
+        # with throttle.operation(2) as op: ...; op["failed"] = True marks a
+        # transient failure that was returned rather than raised
+        with self.cond:
+            while self.in_flight >= int(self.limit):
+                self.cond.wait()
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+            self._publish()
+        op = {"failed": False}
+        started = None
+        try:
+            self._take(requests)
+            started = time.monotonic()
+            yield op
+        except Exception as e:
+            op["failed"] = is_transient(classify(e))
+            raise
+        finally:
+            with self.cond:
+                self.in_flight -= 1
+                if started is not None:
+                    # Per request, so batches of any size compare with single steps
+                    self._record((time.monotonic() - started) / max(1, requests), op["failed"])
+                self._publish()
+                self.cond.notify_all()
+
+    def report(self):
+        with self.cond:
+            return (f"🚦 Concurrency limit {self.limit:.1f}/{self.maximum}, ceiling {self.max_rps:g} req/s"
+                    + (f", best window latency {self.baseline:.2f}s" if self.baseline else ""))
+
+
+# One per process: every script and session shares the same budget
+controller = Throttle()
@@ -1,107 +1,75 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait, Select
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.chrome.options import Options
-import time
-
-def login(driver, wait, email, password):
-    driver.get("https://app.childpaths.ie/auth/login")
-    wait.until(EC.presence_of_element_located((By.ID, "email"))).send_keys(email)
-    driver.find_element(By.ID, "password").send_keys(password)
-    driver.find_element(By.CSS_SELECTOR, "#signin-form button").click()
-    wait.until(EC.url_contains("/dashboard"))
-    print("✅ Logged in")
-
-def select_branch(driver, wait):
-    driver.get("https://app.childpaths.ie/user-finance-account/create")
-    wait.until(EC.presence_of_element_located((By.NAME, "branch")))
-    branches = driver.find_elements(By.CSS_SELECTOR, "select[name='branch'] option")
-
-    print("\nSelect a branch:")
-    for i, b in enumerate(branches):
-        print(f"{i}: {b.text.strip()} [{b.get_attribute('value')}]")
-
-    index = int(input("Branch number: "))
-    selected = branches[index]
-    Select(driver.find_element(By.NAME, "branch")).select_by_value(selected.get_attribute("value"))
-
-    print(f"\n✅ Branch selected: {selected.text.strip()}")
-    time.sleep(1)
-
-def extract_billpayers(driver):
-    driver.find_element(By.CSS_SELECTOR, ".select2-selection--multiple").click()
-    time.sleep(2)
-
-    options = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
-    billpayers = []
-
-    print("\n📋 Billpayers loaded:")
-    for i, option in enumerate(options):
-        name = option.text.strip()
-        element_id = option.get_attribute("id")
-        if name and element_id and "select2--result" in element_id:
-            billpayer_id = element_id.split('-')[-1]
-            billpayers.append({"name": name, "id": billpayer_id})
-            print(f"{i}: {name} [ID: {billpayer_id}]")
-
-    return billpayers
-
-def toggle_guardian_enabled(driver, wait, guardian_id, name):
-    url = f"https://app.childpaths.ie/guardian/{guardian_id}/edit"
-    driver.get(url)
-    try:
-        wait.until(EC.presence_of_element_located((By.ID, "enabled")))
-        switch_wrapper = driver.find_element(By.CSS_SELECTOR, ".bootstrap-switch-wrapper")
-        is_on = "bootstrap-switch-on" in switch_wrapper.get_attribute("class")
-
-        if is_on:
-            print(f"🟢 {name}: ENABLED → Disabling...")
-            switch_wrapper.click()
-            time.sleep(1)
-            try:
-                confirm_btn = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.CSS_SELECTOR, ".swal-button--confirm"))
-                )
-                confirm_btn.click()
-                print("☑️ Confirmed SweetAlert.")
-            except:
-                print("⚠️ SweetAlert not confirmed.")
-        else:
-            print(f"🔴 {name}: already DISABLED.")
-
-        # Save changes
-        try:
-            save_button = driver.find_element(By.CSS_SELECTOR, 'button[type="submit"]')
-            save_button.click()
-            print("💾 Saved.")
-            time.sleep(2)
-        except:
-            print("❌ Could not click Save.")
-    except:
-        print(f"❌ {name}: Guardian edit page or toggle not found.")
+import argparse
+from waits import wait_report
+from branches import extract_billpayers, select_branch
+from cache import CACHE_TTL
+from drivers import DriverPool
+from login import signed_in
+from guardians import REPORT_FILE, REPORT_HEADER, fetch_guardian_states, plan_toggles, state_label, toggle_guardians
+from pipeline import ReportWriter
+from throttle import MAX_RPS, controller
+
+# === CONFIG ===
+AUTO_WORKERS = 4  # sessions opened by --workers auto
+
+def worker_count(value):
+    return AUTO_WORKERS if value == "auto" else int(value)
 
 def main():
+    parser = argparse.ArgumentParser(description="Enable or disable every billpayer of a branch.")
+    parser.add_argument("--target", choices=["disable", "enable"], default="disable",
+                        help="state every guardian should end up in (default: disable)")
+    parser.add_argument("--workers", type=worker_count, default=1,
+                        help=f"parallel browser sessions, or 'auto' to open {AUTO_WORKERS} and let the throttle "
+                             "decide how many work at once (default: 1)")
+    parser.add_argument("--max-rps", type=float, default=MAX_RPS,
+                        help=f"ceiling on requests per second to ChildPaths (default: {MAX_RPS:g})")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would change")
+    parser.add_argument("--report", default=REPORT_FILE, help="per-guardian result CSV")
+    parser.add_argument("--refresh-billpayers", action="store_true", help="ignore the billpayer cache")
+    parser.add_argument("--cache-ttl", type=int, default=CACHE_TTL, help="billpayer cache TTL in seconds")
+    args = parser.parse_args()
+    enable = args.target == "enable"
+    controller.configure(maximum=args.workers, max_rps=args.max_rps)
     email = input("Email: ")
     password = input("Password: ")
 
-    options = Options()
-    options.add_argument("--window-size=1920,1080")
-    driver = webdriver.Chrome(options=options)
-    wait = WebDriverWait(driver, 10)
+    pool = DriverPool(args.workers + 1 if args.workers > 1 and not args.dry_run else 1)
+    driver = pool.get()
 
-    try:
-        login(driver, wait, email, password)
-        select_branch(driver, wait)
-        billpayers = extract_billpayers(driver)
+    def start_session():
+        session_driver = pool.get()
+        signed_in(session_driver, email, password)
+        return session_driver
 
-        print(f"\n⚙️ Processing {len(billpayers)} billpayers...\n")
-        for i, bp in enumerate(billpayers, 1):
-            print(f"--- [{i}/{len(billpayers)}] {bp['name']} ---")
-            toggle_guardian_enabled(driver, wait, bp['id'], bp['name'])
+    try:
+        signed_in(driver, email, password)
+        branch_value = select_branch(driver)
+        billpayers = [{"name": name, "id": billpayer_id} for name, billpayer_id in
+                      extract_billpayers(driver, branch_value, args.cache_ttl, args.refresh_billpayers)]
+
+        states = fetch_guardian_states(driver, [bp["id"] for bp in billpayers])
+        changes, unchanged = plan_toggles(billpayers, states, enable)
+        target = state_label(enable)
+        print(f"\n📋 {len(billpayers)} billpayers: {len(changes)} to set {target}, {len(unchanged)} already {target}")
+
+        with ReportWriter(args.report, header=REPORT_HEADER) as report:
+            report.write([[bp["id"], bp["name"], target, target, "UNCHANGED", ""] for bp in unchanged])
+            if args.dry_run:
+                for bp in changes:
+                    print(f"🔸 {bp['name']} [ID: {bp['id']}]: {state_label(states.get(bp['id']))} → {target}")
+                report.write([[bp["id"], bp["name"], state_label(states.get(bp["id"])), target, "PLANNED", ""]
+                              for bp in changes])
+            else:
+                print(f"⚙️ Processing {len(changes)} billpayers...\n")
+                report.write(toggle_guardians(changes, states, enable, driver, args.workers, start_session))
+        print(f"✅ Report saved to {args.report}")
+        print(wait_report())
+        print(pool.report())
+        print(controller.report())
 
     finally:
         driver.quit()
+        pool.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,538 @@
+from html.parser import HTMLParser
+from urllib.parse import urljoin, urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from accounts import fetch_rows_selenium
+from config import BASE_URL
+from sessions import SessionStore
+from metrics import count, instrument_session
+from retries import SKIPPED, UncertainPost, classify, form_failure, is_transient
+from throttle import controller
+
+# === CONFIG ===
+POOL_SIZE = 10
+HTTP_TIMEOUT = 30  # seconds per request
+# Server requests behind one step: the form page and its post
+REQUESTS_PER_STEP = 2
+BATCH_TIMEOUT = 30  # seconds for one in-page batch, plus per item
+BATCH_ITEM_TIMEOUT = 10
+
+
+# === HTML SCRAPING ===
+class FormParser(HTMLParser):
+    # Collects every <form> with its action, default field values and select
+    # options as [value, label], plus the error list items the app renders
+    # in .alert-danger / .alert-warning.
+    def __init__(self):
+        super().__init__()
+        self.forms = []
+        self.errors = []
+        self.meta_csrf = None
+        self._form = None
+        self._select = None
+        self._option = None
+        self._alert_depth = 0
+        self._in_error = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = attrs.get("class", "").split()
+        if tag == "meta" and attrs.get("name") == "csrf-token":
+            self.meta_csrf = attrs.get("content")
+        elif tag == "form":
+            self._form = {"action": attrs.get("action", ""), "fields": {}, "selects": {}, "options": {}}
+            self.forms.append(self._form)
+        elif tag == "input" and self._form is not None and attrs.get("name"):
+            if attrs.get("type") in ("submit", "button", "checkbox") and "checked" not in attrs:
+                return
+            self._form["fields"].setdefault(attrs["name"], attrs.get("value", ""))
+        elif tag == "select" and self._form is not None and attrs.get("name"):
+            self._select = attrs["name"]
+            self._form["selects"][self._select] = "multiple" in attrs
+        elif tag == "option" and self._select:
+            self._close_option()
+            self._option = [attrs.get("value", ""), ""]
+            self._form["options"].setdefault(self._select, []).append(self._option)
+            if "selected" in attrs:
+                self._form["fields"].setdefault(self._select, attrs.get("value", ""))
+        elif tag == "div" and ("alert-danger" in classes or "alert-warning" in classes):
+            self._alert_depth = 1
+        elif tag == "div" and self._alert_depth:
+            self._alert_depth += 1
+        elif tag == "li" and self._alert_depth:
+            self._in_error = True
+            self.errors.append("")
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag == "select":
+            self._close_option()
+            self._select = None
+        elif tag == "option":
+            self._close_option()
+        elif tag == "li":
+            self._in_error = False
+        elif tag == "div" and self._alert_depth:
+            self._alert_depth -= 1
+
+    def handle_data(self, data):
+        if self._in_error:
+            self.errors[-1] += data.strip()
+        elif self._option is not None:
+            self._option[1] += data
+
+    def _close_option(self):
+        # </option> is optional, so the next option or </select> closes it too
+        if self._option is not None:
+            self._option[1] = " ".join(self._option[1].split())
+            self._option = None
+
+
+class TableParser(HTMLParser):
+    # Rows of the first table.table body as (row id, [cell text, ...]), its
+    # <thead> header texts, plus the pagination "next" link.
+    def __init__(self):
+        super().__init__()
+        self.rows = []
+        self.header = []
+        self.next = None
+        self._in_table = False
+        self._in_head = False
+        self._in_body = False
+        self._in_next = False
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        classes = attrs.get("class", "").split()
+        if tag == "li" and "next" in classes and "disabled" not in classes:
+            self._in_next = True
+        elif tag == "a" and attrs.get("href") and (self._in_next or attrs.get("rel") == "next"):
+            self.next = self.next or attrs["href"]
+        elif tag == "table" and "table" in classes:
+            self._in_table = True
+        elif tag == "thead" and self._in_table and not self.header:
+            self._in_head = True
+        elif tag == "th" and self._in_head:
+            self._cell = []
+        elif tag == "tbody" and self._in_table:
+            self._in_body = True
+        elif tag == "tr" and self._in_body:
+            self.rows.append((attrs.get("id") or "", []))
+        elif tag == "td" and self._in_body and self.rows:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag == "td" and self._cell is not None:
+            self.rows[-1][1].append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "th" and self._cell is not None:
+            self.header.append(" ".join("".join(self._cell).split()))
+            self._cell = None
+        elif tag == "thead":
+            self._in_head = False
+        elif tag == "li":
+            self._in_next = False
+        elif tag == "tbody":
+            self._in_body = False
+        elif tag == "table":
+            self._in_table = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_forms(html):
+    parser = FormParser()
+    parser.feed(html)
+    return parser
+
+
+def parse_table(html):
+    parser = TableParser()
+    parser.feed(html)
+    return parser.rows, parser.next, parser.header
+
+
+def post_in_order(make_transaction, account_id, items):
+    # items: (tx_type, amount, note, date, after) where after is the index
+    # of an earlier item that must have succeeded, e.g. a row's deposit
+    # before its withdrawal. Returns True or a StepFailure per item.
+    oks = []
+    for tx_type, amount, note, date, after in items:
+        if after is not None and not oks[after]:
+            oks.append(SKIPPED)
+        else:
+            oks.append(make_transaction(account_id, tx_type, amount, note, date))
+    return oks
+
+
+# Posts a batch of transactions with fetch() from inside the logged-in page.
+# Each transaction form is fetched once for its action and hidden fields
+# (the CSRF token); items then post in order and one whose "after" item
+# failed is skipped. Errors come from the .alert-danger list of the response.
+# sent tells whether the POST was issued, so a failure before it is the only
+# kind that is safe to post again.
+BATCH_JS = """
+var items = arguments[0], done = arguments[arguments.length - 1];
+var forms = {}, results = [];
+function parse(html) { return new DOMParser().parseFromString(html, 'text/html'); }
+function loadForm(url) {
+    if (!forms[url]) forms[url] = fetch(url, {credentials: 'same-origin'}).then(function (r) {
+        if (!r.ok) throw new Error('form HTTP ' + r.status);
+        return r.text();
+    }).then(function (html) {
+        var field = parse(html).querySelector('form [name=value]');
+        if (!field) throw new Error('no transaction form');
+        var hidden = {};
+        field.form.querySelectorAll('input[type=hidden]').forEach(function (i) { hidden[i.name] = i.value; });
+        return {action: new URL(field.form.getAttribute('action') || url, url).href, hidden: hidden};
+    });
+    return forms[url];
+}
+function post(i) {
+    if (i >= items.length) return done(results);
+    var item = items[i], sent = false;
+    if (item.after !== null && !results[item.after].ok) {
+        results.push({ok: false, skipped: true, error: 'skipped'});
+        return post(i + 1);
+    }
+    loadForm(item.url).then(function (form) {
+        var body = new URLSearchParams(form.hidden);
+        Object.keys(item.fields).forEach(function (k) { body.set(k, item.fields[k]); });
+        sent = true;
+        return fetch(form.action, {method: 'POST', body: body, credentials: 'same-origin'});
+    }).then(function (r) {
+        return r.text().then(function (html) {
+            var errors = Array.prototype.map.call(parse(html).querySelectorAll('.alert-danger li, .alert-warning li'),
+                                                  function (li) { return li.textContent.trim(); });
+            results.push({ok: r.ok && !errors.length, status: r.status, form: errors.length > 0, sent: true,
+                          error: errors.join('; ') || (r.ok ? '' : 'HTTP ' + r.status)});
+        });
+    }).catch(function (e) {
+        results.push({ok: false, sent: sent, error: String(e)});
+    }).then(function () { post(i + 1); });
+}
+post(0);
+"""
+
+
+# === TRANSPORTS ===
+class NotPosted(requests.RequestException):
+    """The form was never sent (form scrape failed, no connection, logged out).
+
+    Only this kind of failure may be posted again another way.
+    """
+
+
+class SeleniumTransport:
+    """Page-driven backend: every step navigates and fills the form in Chrome.
+
+    release(driver), when given, replaces driver.quit() on quit() so a
+    pooled browser goes back to its pool instead of shutting down.
+    """
+
+    def __init__(self, driver, wait, create_account, make_transaction, release=None):
+        self.driver = driver
+        self.wait = wait
+        self.release = release
+        self._create_account = create_account
+        self._make_transaction = make_transaction
+
+    def create_account(self, owner_name, branch_value, owner_id=None):
+        return self._create_account(self.driver, self.wait, owner_name, branch_value, owner_id)
+
+    def fetch_index(self, url):
+        return fetch_rows_selenium(self.driver, url)
+
+    def make_transaction(self, account_id, tx_type, amount, note, date):
+        return self._make_transaction(self.driver, self.wait, account_id, tx_type, amount, note, date)
+
+    def make_transactions(self, account_id, items):
+        return post_in_order(self.make_transaction, account_id, items)
+
+    def quit(self):
+        if self.release:
+            self.release(self.driver)
+        else:
+            self.driver.quit()
+
+
+class FetchTransport:
+    """Batches an account's transactions into one in-page fetch() call.
+
+    Account creation and the index stay on the Selenium transport, which
+    also re-posts a batched item whose POST was never sent. An item that
+    failed after its POST went out may have been booked, so it is reported
+    as uncertain instead.
+    """
+
+    def __init__(self, fallback, base_url=BASE_URL, log=print):
+        self.fallback = fallback
+        self.driver = fallback.driver
+        self.base_url = base_url.rstrip("/")
+        self.log = log
+
+    def create_account(self, owner_name, branch_value, owner_id=None):
+        return self.fallback.create_account(owner_name, branch_value, owner_id)
+
+    def fetch_index(self, url):
+        return self.fallback.fetch_index(url)
+
+    def make_transaction(self, account_id, tx_type, amount, note, date):
+        return self.make_transactions(account_id, [(tx_type, amount, note, date, None)])[0]
+
+    def make_transactions(self, account_id, items):
+        from selenium.common.exceptions import WebDriverException  # a browser is running by now
+        payload = [{"url": f"{self.base_url}/user-finance-account/{account_id}/transaction/{tx_type}",
+                    "fields": {"value": str(amount), "description": note or "", "received_at": date or ""},
+                    "after": after}
+                   for tx_type, amount, note, date, after in items]
+        try:
+            self.driver.set_script_timeout(BATCH_TIMEOUT + BATCH_ITEM_TIMEOUT * len(items))
+            results = self.driver.execute_async_script(BATCH_JS, payload)
+        except WebDriverException as e:
+            # The script may have posted some items before it was cut off, so
+            # none of them is re-posted from here
+            self.log(f"⚠️ Batched submit failed: {str(e).splitlines()[0] if str(e) else e}")
+            return [classify(UncertainPost(f"batch of {len(items)} cut off"))] * len(items)
+        oks = []
+        for (tx_type, amount, note, date, after), result in zip(items, results):
+            if result["ok"]:
+                self.log(f"✅ {tx_type.capitalize()} successful for €{amount}")
+                oks.append(True)
+            elif after is not None and not oks[after]:
+                oks.append(SKIPPED)
+            elif result.get("form"):
+                self.log(f"❌ {tx_type.capitalize()} failed for €{amount}: {result['error']}")
+                oks.append(form_failure([result["error"]]))
+            elif result.get("sent"):
+                self.log(f"⚠️ Batched {tx_type} for €{amount} failed after posting ({result['error']})")
+                oks.append(classify(UncertainPost(f"batched {tx_type} failed after posting: {result['error']}")))
+            else:
+                self.log(f"⚠️ Batched {tx_type} for €{amount} was not sent ({result['error']}); "
+                         "retrying in the page")
+                count("retries", kind="fetch_fallback")
+                oks.append(self.fallback.make_transaction(account_id, tx_type, amount, note, date))
+        return oks
+
+    def quit(self):
+        self.fallback.quit()
+
+
+class HttpTransport:
+    """Posts the ChildPaths forms directly over a pooled requests.Session.
+
+    Login cookies are copied from a Selenium driver (or obtained with login()),
+    and hidden form fields such as the CSRF token are scraped once per form.
+    Steps that cannot be done over HTTP go to the fallback transport, and so
+    do steps whose post was never sent; once it may have been, a failure is
+    reported as uncertain rather than posted twice.
+    """
+
+    def __init__(self, base_url=BASE_URL, fallback=None, log=print):
+        self.base_url = base_url.rstrip("/")
+        self.fallback = fallback
+        self.driver = fallback.driver if fallback else None
+        self.log = log
+        self.forms = {}
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        instrument_session(self.session)
+
+    @classmethod
+    def from_transport(cls, fallback, base_url=BASE_URL, log=print):
+        transport = cls(base_url, fallback, log)
+        driver = fallback.driver
+        transport.session.headers["User-Agent"] = driver.execute_script("return navigator.userAgent")
+        for cookie in driver.get_cookies():
+            transport.session.cookies.set(cookie["name"], cookie["value"],
+                                          domain=cookie.get("domain"), path=cookie.get("path", "/"))
+        return transport
+
+    def url(self, path):
+        return urljoin(self.base_url + "/", path.lstrip("/"))
+
+    def load_form(self, key, path, field, refresh=False):
+        # The CSRF token is per session, so one scrape serves every account
+        if refresh or key not in self.forms:
+            response = self.session.get(self.url(path), timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+            page = parse_forms(response.text)
+            form = next((f for f in page.forms if field in f["fields"] or field in f["selects"]), None)
+            if form is None:
+                raise RuntimeError(f"No form with '{field}' at {path}")
+            if page.meta_csrf:
+                self.session.headers["X-CSRF-TOKEN"] = page.meta_csrf
+            self.forms[key] = form
+        return self.forms[key]
+
+    def submit(self, key, path, field, values, action=None):
+        # Failures before the post raise NotPosted; once the body may have
+        # reached the server they raise UncertainPost. A 4xx answer means the
+        # server refused it and raises HTTPError.
+        for attempt in (0, 1):
+            try:
+                form = self.load_form(key, path, field, refresh=attempt > 0)
+            except (requests.RequestException, RuntimeError) as e:
+                raise NotPosted(f"{key} form unavailable: {e}") from e
+            data = {**form["fields"], **values}
+            try:
+                response = self.session.post(self.url(action or form["action"] or path), data=data,
+                                             timeout=HTTP_TIMEOUT)
+            except requests.ConnectTimeout as e:
+                raise NotPosted(f"No connection for the {key} post") from e
+            except requests.ReadTimeout as e:
+                raise UncertainPost(f"No answer to the {key} post within {HTTP_TIMEOUT}s") from e
+            except requests.RequestException as e:
+                raise UncertainPost(f"{key} post failed in transit: {e}") from e
+            if "/auth/login" in response.url and key != "login":
+                # Bounced to the login page without the form being handled
+                raise NotPosted("Session expired")
+            # 419 / 400: stale CSRF token, scrape the form again and retry once
+            if response.status_code in (400, 419) and attempt == 0:
+                count("retries", kind="csrf")
+                continue
+            if response.history and not response.ok:
+                # The post was answered with a redirect; only the page after it failed
+                raise UncertainPost(f"{key} post redirected to an HTTP {response.status_code} page")
+            if response.status_code >= 500:
+                raise UncertainPost(f"{key} post answered HTTP {response.status_code}")
+            response.raise_for_status()
+            return parse_forms(response.text).errors
+        return []
+
+    def login(self, email, password):
+        store = SessionStore(email, password)
+        if store.restore_session(self.session, self.base_url, timeout=HTTP_TIMEOUT):
+            return True
+        try:
+            errors = self.submit("login", "/auth/login", "email", {"email": email, "password": password})
+        except UncertainPost as e:
+            # Nothing is booked by a login, it just did not work
+            self.log(f"⚠️ HTTP login failed: {e}")
+            return False
+        if errors or "/dashboard" not in self.session.get(self.url("/dashboard"), timeout=HTTP_TIMEOUT).url:
+            return False
+        store.save_session(self.session)
+        return True
+
+    def list_branches(self):
+        # {branch value: branch name} from the create form's branch picker
+        form = self.load_form("create", "/user-finance-account/create", "display_name")
+        return {value: name for value, name in form["options"].get("branch", []) if value}
+
+    def create_account(self, owner_name, branch_value, owner_id=None):
+        if owner_id is None:
+            return self.fallback.create_account(owner_name, branch_value) if self.fallback else False
+        try:
+            form = self.load_form("create", "/user-finance-account/create", "display_name")
+            owner_field = next((name for name, multiple in form["selects"].items() if multiple), "owners[]")
+            values = {"branch": branch_value, "display_name": "Deposit Account", "currency": "EUR",
+                      owner_field: owner_id}
+            errors = self.submit("create", "/user-finance-account/create", "display_name", values)
+        except UncertainPost as e:
+            # Creating again through the browser could leave a duplicate account
+            self.log(f"⚠️ HTTP create for {owner_name} may have gone through: {e}")
+            return classify(e)
+        except NotPosted as e:
+            self.log(f"⚠️ HTTP create failed for {owner_name}: {e}")
+            if self.fallback:
+                return self.fallback.create_account(owner_name, branch_value, owner_id)
+            return classify(e.__cause__ or e)
+        except requests.RequestException as e:
+            self.log(f"❌ HTTP create refused for {owner_name}: {e}")
+            return classify(e)
+        if errors:
+            for e in errors:
+                self.log("❌ Form error: " + e)
+            return form_failure(errors)
+        self.log(f"✅ Account created for {owner_name}")
+        return True
+
+    def fetch_index(self, url):
+        # Index paths are requested against this transport's base_url
+        parts = urlsplit(url)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+        response = self.session.get(self.url(path), timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        rows, next_url, header = parse_table(response.text)
+        return rows, urljoin(response.url, next_url) if next_url else None, header
+
+    def make_transaction(self, account_id, tx_type, amount, note, date):
+        path = f"/user-finance-account/{account_id}/transaction/{tx_type}"
+        values = {"value": str(amount)}
+        if note:
+            values["description"] = note
+        if date:
+            values["received_at"] = date
+        try:
+            # Token and hidden fields come from the first form of this type;
+            # the post always goes to this account's own URL.
+            errors = self.submit(f"transaction:{tx_type}", path, "value", values, action=path)
+        except UncertainPost as e:
+            # Re-posting through the browser could book it twice
+            self.log(f"⚠️ HTTP {tx_type} for €{amount} may have gone through: {e}")
+            return classify(e)
+        except NotPosted as e:
+            self.log(f"⚠️ HTTP {tx_type} failed for €{amount}: {e}")
+            if self.fallback:
+                return self.fallback.make_transaction(account_id, tx_type, amount, note, date)
+            return classify(e.__cause__ or e)
+        except requests.RequestException as e:
+            self.log(f"❌ HTTP {tx_type} refused for €{amount}: {e}")
+            return classify(e)
+        if errors:
+            self.log(f"❌ {tx_type.capitalize()} failed for €{amount}: {'; '.join(errors)}")
+            return form_failure(errors)
+        self.log(f"✅ {tx_type.capitalize()} successful for €{amount}")
+        return True
+
+    def make_transactions(self, account_id, items):
+        return post_in_order(self.make_transaction, account_id, items)
+
+    def quit(self):
+        self.session.close()
+        if self.fallback:
+            self.fallback.quit()
+
+
+class ThrottledTransport:
+    """Runs another transport's server steps through the shared Throttle.
+
+    Transient failures that come back as results, not exceptions, count
+    against the concurrency limit just like raised ones; SKIPPED steps do
+    not.
+    """
+
+    def __init__(self, transport, throttle=controller):
+        self.transport = transport
+        self.throttle = throttle
+        self.driver = getattr(transport, "driver", None)
+
+    def _run(self, n_requests, fn, *args):
+        with self.throttle.operation(n_requests) as op:
+            result = fn(*args)
+            results = result if isinstance(result, list) else [result]
+            # Steps skipped after an earlier failure never reached the server
+            op["failed"] = any(is_transient(r) for r in results if r is not SKIPPED)
+            return result
+
+    def create_account(self, owner_name, branch_value, owner_id=None):
+        return self._run(REQUESTS_PER_STEP, self.transport.create_account, owner_name, branch_value, owner_id)
+
+    def fetch_index(self, url):
+        return self._run(1, self.transport.fetch_index, url)
+
+    def make_transaction(self, account_id, tx_type, amount, note, date):
+        return self._run(REQUESTS_PER_STEP, self.transport.make_transaction, account_id, tx_type, amount, note, date)
+
+    def make_transactions(self, account_id, items):
+        return self._run(REQUESTS_PER_STEP * len(items), self.transport.make_transactions, account_id, items)
+
+    def quit(self):
+        self.transport.quit()
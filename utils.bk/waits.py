@@ -0,0 +1,157 @@
+import threading
+import time
+from selenium.common.exceptions import StaleElementReferenceException, TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+
+# === CONFIG ===
+# Timeout budget in seconds per named wait
+BUDGETS = {
+    "page_ready": 10,
+    "select2_open": 3,
+    "select2_results": 5,
+    "select2_highlighted": 3,
+    "select2_selected": 3,
+    "submit": 10,
+    "sweetalert": 5,
+    "element": 10,
+}
+POLL = 0.1
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def record(name, seconds, timed_out=False):
+    with _lock:
+        stat = _stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0, "timeouts": 0})
+        stat["count"] += 1
+        stat["total"] += seconds
+        stat["max"] = max(stat["max"], seconds)
+        stat["timeouts"] += int(timed_out)
+
+
+def stats():
+    with _lock:
+        return {name: dict(stat) for name, stat in _stats.items()}
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
+
+
+def wait_report():
+    lines = ["⏱️ Wait summary:"]
+    for name, stat in sorted(stats().items(), key=lambda item: -item[1]["total"]):
+        mean = stat["total"] / stat["count"]
+        lines.append(f"  {name}: {stat['count']}x, total {stat['total']:.1f}s, "
+                     f"mean {mean:.2f}s, max {stat['max']:.2f}s, timeouts {stat['timeouts']}")
+    return "\n".join(lines)
+
+
+def wait_for(driver, name, condition, timeout=None, required=True):
+    # Polls condition(driver) until it returns something truthy. The time
+    # spent is recorded under name; on timeout it either raises or, for
+    # best-effort waits, returns None once the budget has been used up.
+    budget = timeout if timeout is not None else BUDGETS.get(name, BUDGETS["element"])
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, budget, poll_frequency=POLL).until(condition)
+    except TimeoutException:
+        record(name, time.monotonic() - start, timed_out=True)
+        if required:
+            raise
+        return None
+    record(name, time.monotonic() - start)
+    return result
+
+
+# === CONDITIONS ===
+def page_ready(driver):
+    return driver.execute_script("return document.readyState") == "complete"
+
+
+def select2_results_rendered(driver):
+    options = driver.find_elements(By.CSS_SELECTOR, ".select2-results__option")
+    if not options:
+        return False
+    classes = options[0].get_attribute("class") or ""
+    if "loading-results" in classes:
+        return False
+    return options
+
+
+def text_key(text):
+    return " ".join((text or "").lower().split())
+
+
+def select2_filtered(query):
+    # The dropdown highlights its first option as soon as it opens, before
+    # the typed filter has run; only a highlighted option that contains the
+    # query, with no loading row left, means the results are for this query.
+    wanted = text_key(query)
+
+    def condition(driver):
+        try:
+            if driver.find_elements(By.CSS_SELECTOR, ".select2-results__option.loading-results"):
+                return False
+            for option in driver.find_elements(By.CSS_SELECTOR, ".select2-results__option--highlighted"):
+                if wanted in text_key(option.text):
+                    return option
+        except StaleElementReferenceException:
+            pass
+        return False
+    return condition
+
+
+# === NAMED WAITS ===
+def wait_page_ready(driver, timeout=None):
+    return wait_for(driver, "page_ready", page_ready, timeout)
+
+
+def wait_element(driver, locator, name="element", timeout=None, required=True):
+    return wait_for(driver, name, EC.presence_of_element_located(locator), timeout, required)
+
+
+def wait_select2_open(driver, timeout=None, required=False):
+    return wait_for(driver, "select2_open",
+                    EC.visibility_of_element_located((By.CSS_SELECTOR, ".select2-container--open")),
+                    timeout, required)
+
+
+def wait_select2_results(driver, timeout=None, required=False):
+    return wait_for(driver, "select2_results", select2_results_rendered, timeout, required) or []
+
+
+def wait_select2_highlighted(driver, query, timeout=None, required=False):
+    return wait_for(driver, "select2_highlighted", select2_filtered(query), timeout, required)
+
+
+def wait_select2_selected(driver, timeout=None, required=False):
+    return wait_for(driver, "select2_selected",
+                    EC.presence_of_element_located((By.CSS_SELECTOR, ".select2-selection__choice")),
+                    timeout, required)
+
+
+def wait_sweetalert(driver, timeout=None, required=True):
+    return wait_for(driver, "sweetalert",
+                    EC.element_to_be_clickable((By.CSS_SELECTOR, ".swal-button--confirm")),
+                    timeout, required)
+
+
+def submit_and_wait(driver, button, timeout=None):
+    # Click and wait for the round trip: the old document goes stale and the
+    # next one finishes loading.
+    old_page = driver.find_element(By.TAG_NAME, "html")
+    button.click()
+    start = time.monotonic()
+    budget = timeout if timeout is not None else BUDGETS["submit"]
+    try:
+        WebDriverWait(driver, budget, poll_frequency=POLL).until(EC.staleness_of(old_page))
+        WebDriverWait(driver, budget, poll_frequency=POLL).until(page_ready)
+    except TimeoutException:
+        record("submit", time.monotonic() - start, timed_out=True)
+        raise
+    record("submit", time.monotonic() - start)